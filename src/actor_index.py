@@ -0,0 +1,88 @@
+"""Exact, constant time lookups of followed and blocked actor IDs."""
+from urllib.parse import urlparse
+
+from lem_types import MyUserInfo
+
+# Index kinds, named after the MyUserInfo lists they come from.
+FOLLOWS = 'follows'
+COMMUNITY_BLOCKS = 'community_blocks'
+PERSON_BLOCKS = 'person_blocks'
+KINDS = (FOLLOWS, COMMUNITY_BLOCKS, PERSON_BLOCKS)
+
+
+def normalize_actor_id(actor_id: str) -> str:
+    """Normalizes an actor ID so the same actor always compares equal.
+
+    The scheme and host are lower cased, a missing scheme becomes https
+    and trailing slashes are dropped.
+
+    Args:
+        actor_id (str): Actor ID URL of a community or person
+
+    Returns:
+        str: Normalized actor ID
+    """
+    parsed = urlparse(actor_id.strip())
+    if not parsed.netloc:
+        parsed = urlparse(f'https://{actor_id.strip()}')
+    return parsed._replace(scheme=parsed.scheme.lower(),
+                           netloc=parsed.netloc.lower(),
+                           path=parsed.path.rstrip('/'),
+                           params='', query='', fragment='').geturl()
+
+
+class ActorIndex:
+    """Normalized actor ID -> local ID for one account's follows and blocks.
+
+    Built once from MyUserInfo and kept up to date as actions succeed.
+    """
+
+    def __init__(self) -> None:
+        self.follows: dict[str, int] = dict()
+        self.community_blocks: dict[str, int] = dict()
+        self.person_blocks: dict[str, int] = dict()
+
+    @classmethod
+    def from_myuserinfo(cls, myuserinfo: MyUserInfo) -> 'ActorIndex':
+        """Builds the index from an account's MyUserInfo.
+
+        Args:
+            myuserinfo (MyUserInfo): Account info from the site response
+
+        Returns:
+            ActorIndex: Index of the account's follows and blocks
+        """
+        index = cls()
+        for view in myuserinfo.follows:
+            index.add(FOLLOWS, view.community.actor_id, view.community.id)
+        for view in myuserinfo.community_blocks:
+            index.add(COMMUNITY_BLOCKS, view.community.actor_id,
+                      view.community.id)
+        for view in myuserinfo.person_blocks:
+            index.add(PERSON_BLOCKS, view.target.actor_id, view.target.id)
+        return index
+
+    def get(self, kind: str) -> dict[str, int]:
+        """Gets the mapping for one kind of entry.
+
+        Args:
+            kind (str): FOLLOWS, COMMUNITY_BLOCKS or PERSON_BLOCKS
+
+        Returns:
+            dict[str, int]: Normalized actor ID -> local ID
+        """
+        if kind not in KINDS:
+            raise ValueError(f'Unknown index kind "{kind}"')
+        return getattr(self, kind)
+
+    def has(self, kind: str, actor_id: str) -> bool:
+        """True if the actor ID is in the index."""
+        return normalize_actor_id(actor_id) in self.get(kind)
+
+    def add(self, kind: str, actor_id: str, local_id: int) -> None:
+        """Adds an actor ID, e.g. after a follow or block succeeded."""
+        self.get(kind)[normalize_actor_id(actor_id)] = local_id
+
+    def remove(self, kind: str, actor_id: str) -> None:
+        """Removes an actor ID, e.g. after an unfollow or unblock."""
+        self.get(kind).pop(normalize_actor_id(actor_id), None)
@@ -0,0 +1,161 @@
+"""Keeps syncing on a schedule and reports its status over HTTP."""
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time
+from typing import Callable
+
+from log_config import configure_logging
+
+
+class SyncDaemon:
+    """Runs a sync over and over with a jittered interval in between.
+
+    The sync function is given by the caller, so the logins, sessions and
+    caches it uses stay warm between runs. It returns the number of
+    actions it planned, including any it left for a later run.
+    """
+
+    def __init__(self, sync: Callable[[], int], interval: float = 300,
+                 jitter: float = 0.1) -> None:
+        self.logger = configure_logging('daemon')
+        self.sync = sync
+        self.interval = interval
+        self.jitter = jitter
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._status = {'started': time(),
+                        'runs': 0,
+                        'failures': 0,
+                        'running': False,
+                        'last_started': None,
+                        'last_finished': None,
+                        'last_duration': None,
+                        'last_actions': None,
+                        'last_error': None,
+                        'next_run': None}
+
+    def status(self) -> dict:
+        """Copy of the current status."""
+        with self._lock:
+            return dict(self._status)
+
+    @property
+    def healthy(self) -> bool:
+        """False if the last run failed."""
+        with self._lock:
+            return self._status['last_error'] is None
+
+    def next_delay(self) -> float:
+        """Seconds to wait before the next run, with jitter.
+
+        Spreading the runs out keeps several daemons from all hitting the
+        same instances at the same moment.
+        """
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+    def run_once(self) -> None:
+        """Runs one sync and records how it went."""
+        started = time()
+        with self._lock:
+            self._status.update(running=True, last_started=started,
+                                next_run=None)
+        actions = None
+        error = None
+        try:
+            actions = self.sync()
+        except Exception as exception:
+            error = repr(exception)
+            self.logger.error('Sync failed.')
+            self.logger.error(f'{exception = }')
+        finished = time()
+        with self._lock:
+            self._status['runs'] += 1
+            if error:
+                self._status['failures'] += 1
+            self._status.update(running=False, last_finished=finished,
+                                last_duration=round(finished - started, 3),
+                                last_actions=actions, last_error=error)
+
+    def run(self, max_runs: int | None = None) -> None:
+        """Syncs until stop() is called.
+
+        Args:
+            max_runs (int | None): Stop after this many runs, None to keep
+                going
+        """
+        runs = 0
+        while not self._stop.is_set():
+            self.run_once()
+            runs += 1
+            if max_runs is not None and runs >= max_runs:
+                break
+            delay = self.next_delay()
+            with self._lock:
+                self._status['next_run'] = time() + delay
+            self.logger.info(f'Next sync in {delay:.0f} seconds.')
+            self._stop.wait(delay)
+
+    def stop(self) -> None:
+        """Stops after the current run."""
+        self._stop.set()
+
+
+class StatusServer:
+    """Serves the daemon's status as JSON on a local port.
+
+    GET /status returns the full status and GET /health returns HTTP 200,
+    or HTTP 503 if the last run failed.
+    """
+
+    def __init__(self, daemon: SyncDaemon, port: int,
+                 host: str = '127.0.0.1') -> None:
+        self.daemon = daemon
+        self._server = ThreadingHTTPServer((host, port), _StatusHandler)
+        self._server.daemon_threads = True
+        self._server.sync_daemon = daemon
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='status', daemon=True)
+
+    @property
+    def port(self) -> int:
+        """Port the server listens on."""
+        return self._server.server_port
+
+    def start(self) -> 'StatusServer':
+        """Starts serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        daemon = self.server.sync_daemon
+        if self.path == '/health':
+            status = 200 if daemon.healthy else 503
+            body = {'healthy': daemon.healthy}
+        elif self.path == '/status':
+            status = 200
+            body = daemon.status()
+        else:
+            status = 404
+            body = {'error': 'not found'}
+        encoded = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *_args) -> None:
+        # Health checks would flood the log otherwise.
+        pass
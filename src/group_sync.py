@@ -0,0 +1,145 @@
+"""Sync of one group of accounts that share follows, blocks and settings."""
+from pathlib import Path
+
+from instance import Instance
+from lem_types import SaveUserSettings
+from log_config import configure_logging
+from scheduler import action_key, plan_actions
+from state_store import SyncState, settings_hash
+from sync_config import SyncGroup
+from sync_plan import (InstancePlan, SyncPlan, build_plan, compute_changes,
+                       compute_target)
+
+
+class GroupSync:
+    """Plans and records the sync of one SyncGroup.
+
+    Logging in and executing the plans is left to the caller, so the
+    instances of every group can share one worker pool.
+    """
+
+    def __init__(self, group: SyncGroup, instances: list[Instance],
+                 state_path: Path) -> None:
+        self.logger = configure_logging(f'{group.name} group')
+        self.group = group
+        self.instances = instances
+        self.state_path = state_path
+
+        self.state = SyncState()
+        self.settings_source: SaveUserSettings | None = None
+        self.target: dict[str, set[str]] = dict()
+        self.remove: dict[str, set[str]] = dict()
+        self.plan = SyncPlan()
+        self._planned: list[Instance] = list()
+        # Site responses of the accounts the last time nothing was left
+        # to do, so planning can be skipped while none of them change.
+        self._in_sync_with: tuple[str | None, ...] | None = None
+
+    def _fingerprint(self) -> tuple[str | None, ...]:
+        return tuple(instance.my_user_hash if instance.is_ready else None
+                     for instance in self.instances)
+
+    @property
+    def ready_instances(self) -> list[Instance]:
+        """Instances that are logged in and have a site response."""
+        return [instance for instance in self.instances if instance.is_ready]
+
+    def plan_sync(self, full: bool = False, max_removals: int = 50,
+                  tombstone_ttl: float = 30 * 24 * 60 * 60) -> SyncPlan:
+        """Works out what each ready instance in the group needs.
+
+        Args:
+            full (bool): Ignore the snapshot from the last sync
+            max_removals (int): Don't propagate removals above this many
+            tombstone_ttl (float): Seconds to keep removal tombstones
+
+        Returns:
+            SyncPlan: Plan for the group's ready instances
+        """
+        if not full and self._in_sync_with == self._fingerprint():
+            self.logger.info('No account changed since the group was last'
+                             ' in sync.')
+            self._planned = list()
+            self.plan = SyncPlan()
+            return self.plan
+
+        ready_instances = self.ready_instances
+
+        # Settings are copied from the group's source account since we
+        # don't know which account was updated last.
+        self.settings_source = None
+        for instance in ready_instances:
+            if instance.account.account == self.group.source:
+                self.settings_source = instance.get_user_settings()
+
+        # Compare each account with the snapshot from the last sync so
+        # only what changed since then gets synced.
+        self.state = SyncState() if full else SyncState.load(self.state_path)
+        changes = compute_changes(ready_instances, self.state,
+                                  self.settings_source)
+        self.logger.info('Changes since the last sync:')
+        for line in changes.summary():
+            self.logger.info(line)
+
+        # Deliberate removals get a tombstone and are removed from every
+        # account, unless there are suspiciously many of them at once.
+        removed = changes.removed
+        removed_count = sum(len(ids) for ids in removed.values())
+        if removed_count > max_removals:
+            self.logger.warning(f'{removed_count} removals since the last'
+                                f' sync is more than {max_removals}. Not'
+                                ' removing them from the other accounts.')
+            removed = {kind: set() for kind in removed}
+        self.state.update_tombstones(changes.added, removed,
+                                     ttl=tombstone_ttl)
+        self.target = compute_target(self.state, changes)
+        self.remove = self.state.removals()
+
+        return self.replan()
+
+    def replan(self) -> SyncPlan:
+        """Plans again against the same target, e.g. after re-reading.
+
+        Returns:
+            SyncPlan: Plan for the group's ready instances
+        """
+        self._planned = self.ready_instances
+        self.plan = build_plan(self._planned, self.settings_source,
+                               self.target, self.remove)
+        self._in_sync_with = (None if self.plan.actions
+                              else self._fingerprint())
+        return self.plan
+
+    def plans_by_instance(self) -> dict[Instance, InstancePlan]:
+        """Pairs each planned instance with its part of the current plan."""
+        return dict(zip(self._planned, self.plan.instances))
+
+    def waiting(self) -> dict[Instance, dict[str, float]]:
+        """Pending queue of each instance from the last run."""
+        return {instance: self.state.pending.get(instance.account.account,
+                                                 {})
+                for instance in self.instances}
+
+    def save_state(self) -> None:
+        """Remembers what was synced and what is still missing."""
+        self.state.synced = self.target
+        if self.settings_source:
+            self.state.settings_hash = settings_hash(self.settings_source)
+        for instance in self.ready_instances:
+            self.state.record(instance.account.account, instance.actor_index,
+                              instance.user_settings)
+
+        # Whatever the planned instances still lack, e.g. because the run
+        # ran out of budget, waits for the next run.
+        missing = build_plan(self._planned, self.settings_source,
+                             self.target, self.remove)
+        for instance, plan in zip(self._planned, missing.instances):
+            self.state.update_pending(
+                instance.account.account,
+                [action_key(name, url) for name, url in plan_actions(plan)])
+        names = {account.account for account in self.group.accounts}
+        for name in list(self.state.pending):
+            if name not in names:
+                del self.state.pending[name]
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state.save(self.state_path)
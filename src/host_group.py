@@ -0,0 +1,142 @@
+"""Groups accounts by host so they share lookups within a run."""
+import threading
+from typing import Callable
+
+
+def normalize_host(netloc: str) -> str:
+    """Normalizes a host so every spelling of the same site matches.
+
+    The host is lower cased and a trailing dot or default https port is
+    dropped.
+
+    Args:
+        netloc (str): Network location from a site URL
+
+    Returns:
+        str: Normalized host
+    """
+    host = netloc.strip().lower().rstrip('/')
+    if host.endswith(':443'):
+        host = host[:-len(':443')]
+    return host.rstrip('.')
+
+
+class HostGroup:
+    """Accounts on one host and the IDs resolved for them this run.
+
+    Local IDs belong to the instance, not the account, so an ID resolved
+    by one account is right for every other account on the host. Each
+    distinct lookup is only sent once. Accounts asking for something that
+    is already being resolved wait for that answer instead of sending
+    their own.
+    """
+
+    def __init__(self, host: str) -> None:
+        self.host = host
+        self.accounts: list[str] = list()
+        self.lookups = 0
+        self.shared = 0
+
+        self._resolved: dict[tuple[str, str], int] = dict()
+        self._pending: dict[tuple[str, str], threading.Event] = dict()
+        self._lock = threading.Lock()
+
+    def resolve(self, kind: str, actor_id: str,
+                lookup: Callable[[], int | None]) -> int | None:
+        """Gets a local ID, calling lookup only if no one else has yet.
+
+        Failed lookups aren't remembered, so a later call, or one that was
+        waiting for the failed lookup, tries again.
+
+        Args:
+            kind (str): Either "community" or "person"
+            actor_id (str): Normalized actor ID to resolve
+            lookup (Callable[[], int | None]): Resolves the ID on the host
+
+        Returns:
+            int | None: Local ID, or None if it couldn't be resolved
+        """
+        key = (kind, actor_id)
+        while True:
+            with self._lock:
+                if key in self._resolved:
+                    self.shared += 1
+                    return self._resolved[key]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    self.lookups += 1
+                    break
+            # Someone else is resolving it. Take their answer, or try
+            # again ourselves if theirs failed.
+            pending.wait()
+
+        local_id = None
+        try:
+            local_id = lookup()
+        finally:
+            with self._lock:
+                if local_id is not None:
+                    self._resolved[key] = local_id
+                del self._pending[key]
+            pending.set()
+        return local_id
+
+    def forget(self, kind: str, actor_id: str) -> None:
+        """Drops one resolved ID so the next call looks it up again.
+
+        Args:
+            kind (str): Either "community" or "person"
+            actor_id (str): Normalized actor ID that was resolved
+        """
+        with self._lock:
+            self._resolved.pop((kind, actor_id), None)
+
+    def reset(self) -> None:
+        """Forgets the resolved IDs and counts, e.g. for a new run."""
+        with self._lock:
+            self._resolved.clear()
+            self.lookups = 0
+            self.shared = 0
+
+    def stats(self) -> str:
+        """Short summary of the lookups for the log."""
+        return (f'{len(self.accounts)} accounts, {self.lookups} lookups,'
+                f' {self.shared} shared')
+
+
+class HostGroups:
+    """Every HostGroup in a run, made as accounts join them."""
+
+    def __init__(self) -> None:
+        self._groups: dict[str, HostGroup] = dict()
+        self._lock = threading.Lock()
+
+    def join(self, host: str, account: str) -> HostGroup:
+        """Adds an account to its host's group, making the group if needed.
+
+        Args:
+            host (str): Normalized host of the account's instance
+            account (str): Account name from the config
+
+        Returns:
+            HostGroup: Group for the host
+        """
+        with self._lock:
+            if host not in self._groups:
+                self._groups[host] = HostGroup(host)
+            group = self._groups[host]
+            group.accounts.append(account)
+            return group
+
+    def reset(self) -> None:
+        """Starts a new run in every group. The accounts stay."""
+        for group in self:
+            group.reset()
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._groups.values()))
+
+    def __len__(self) -> int:
+        return len(self._groups)
@@ -0,0 +1,76 @@
+"""Pooled HTTP sessions for talking to Lemmy instances."""
+import threading
+from dataclasses import dataclass
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class HttpOptions:
+    """Connection pool and timeout options for an instance's session."""
+    pool_size: int = 10
+    keep_alive: bool = True
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        """(connect, read) timeout tuple in the format requests expects."""
+        return (self.connect_timeout, self.read_timeout)
+
+
+def make_session(options: HttpOptions) -> requests.Session:
+    """Makes a session that keeps a pool of warm connections.
+
+    Requests made through the same session reuse open TCP/TLS connections
+    instead of doing a new handshake for every call.
+
+    Args:
+        options (HttpOptions): Pool and keep-alive options
+
+    Returns:
+        requests.Session: Session with pooled adapters mounted
+    """
+    session = requests.Session()
+    # Auth is always sent explicitly. Never keep cookies, so a session
+    # shared by several accounts can't mix up whose login is used.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=options.pool_size,
+                          pool_maxsize=options.pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not options.keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+class SessionPool:
+    """One pooled session per host, shared by every account on that host."""
+
+    def __init__(self, options: HttpOptions) -> None:
+        self.options = options
+        self._sessions: dict[str, requests.Session] = dict()
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> requests.Session:
+        """Gets the session for a host, making it if needed.
+
+        Args:
+            host (str): Host name of the instance
+
+        Returns:
+            requests.Session: Shared session for the host
+        """
+        with self._lock:
+            if host not in self._sessions:
+                self._sessions[host] = make_session(self.options)
+            return self._sessions[host]
+
+    def close(self) -> None:
+        """Closes every session in the pool."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
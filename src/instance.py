@@ -1,14 +1,36 @@
 """Instance class for use in lemmy_sync.py"""
-import json
-from time import sleep
-from types import SimpleNamespace
+from dataclasses import replace
+from time import perf_counter, sleep
 from urllib.parse import urlparse
 
 import requests
 
 from account import Account
+from actor_index import (COMMUNITY_BLOCKS, FOLLOWS, PERSON_BLOCKS, ActorIndex,
+                         normalize_actor_id)
+from host_group import HostGroup, HostGroups, normalize_host
+from http_session import HttpOptions, SessionPool, make_session
 from lem_types import MyUserInfo, SaveUserSettings
 from log_config import configure_logging
+from metrics import Metrics
+from rate_limiter import RateLimitOptions, get_bucket, parse_retry_after
+from resolve_cache import ResolveCache
+from response_cache import CachedResponse, content_hash
+from retry import RETRY_STATUSES, RetryPolicy
+from token_cache import TokenCache
+
+# Hosts that the site URL may use plain http for.
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+
+def _body_size(response: requests.Response | None) -> int:
+    """Size of a response body, 0 if there was no response."""
+    if response is None:
+        return 0
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit():
+        return int(length)
+    return len(response.content or b'')
 
 
 class Instance:
@@ -16,38 +38,212 @@ class Instance:
     _api_version = "v3"
     _api_base_url = f"api/{_api_version}"
 
-    def __init__(self, account: Account) -> None:
-        # Establish a logger based on the account.
-        self.logger = configure_logging(account.account)
-
+    def __init__(self, account: Account,
+                 http_options: HttpOptions | None = None,
+                 rate_limit: RateLimitOptions | None = None,
+                 resolve_cache: ResolveCache | None = None,
+                 retry_policy: RetryPolicy | None = None,
+                 token_cache: TokenCache | None = None,
+                 session_pool: SessionPool | None = None,
+                 host_groups: HostGroups | None = None,
+                 metrics: Metrics | None = None,
+                 group: str | None = None) -> None:
         self._auth_token = None
-        self.site_response = None
+        # True when the token wasn't just given by a login, e.g. it came
+        # from the token cache or an earlier run of a daemon, so it may
+        # have expired.
+        self._token_may_be_stale = False
+        self.token_cache = token_cache
+        self.myuserinfo: MyUserInfo | None = None
         self.account = account
 
-        # Parse the URL for the site
+        # Caching headers and a hash of the user info from the last site
+        # response, so an unchanged one isn't parsed again.
+        self.site_cache: CachedResponse | None = None
+        self.my_user_hash: str | None = None
+
+        # Parse the URL for the site. Always use https, except when the
+        # config asks for http to a server on this machine, e.g. for tests.
         parsed_url = urlparse(account.site)
         url_path = parsed_url.netloc if parsed_url.netloc else parsed_url.path
-        self._site_url = urlparse(url_path)._replace(scheme='https',
+        scheme = 'https'
+        if (parsed_url.scheme == 'http'
+                and urlparse(f'//{url_path}').hostname in LOOPBACK_HOSTS):
+            scheme = 'http'
+        self._site_url = urlparse(url_path)._replace(scheme=scheme,
                                                      netloc=url_path,
                                                      path='').geturl()
         self.api_url = f'{self._site_url}/{self._api_base_url}'
 
-    def login(self) -> None:
-        """Authenticate to Lemmy instance. Generates self._auth_token"""
+        # Keep a pool of warm connections for every call to this instance,
+        # shared with the other accounts on the host when there's a pool.
+        self.host = normalize_host(urlparse(self._site_url).netloc)
+
+        # Establish a logger based on the account. The same account name
+        # can be used in several groups, so the group and host are logged
+        # with it.
+        self.logger = configure_logging(account.account, group=group,
+                                        host=self.host)
+        self.http_options = http_options if http_options else HttpOptions()
+        self._owns_session = session_pool is None
+        if session_pool:
+            self.session = session_pool.get(self.host)
+        else:
+            self.session = make_session(self.http_options)
+
+        # Every account on the same host shares the same rate limiter.
+        self.rate_limit = rate_limit if rate_limit else RateLimitOptions()
+        self.rate_limiter = get_bucket(self.host, self.rate_limit)
+
+        # Optional cache of resolve_object results shared between runs.
+        self.resolve_cache = resolve_cache
+
+        # IDs resolved this run are shared by every account on the host.
+        if host_groups is not None:
+            self.host_group = host_groups.join(self.host, account.account)
+        else:
+            self.host_group = HostGroup(self.host)
+
+        # Retries for transient errors, usually shared by the whole run.
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+
+        # Optional timing and size stats of every API call.
+        self.metrics = metrics
+
+    def close(self) -> None:
+        """Closes the pooled connections to the instance.
+
+        Shared sessions are left open for the other accounts and are closed
+        by their SessionPool.
+        """
+        if self._owns_session:
+            self.session.close()
+
+    def _request(self, method: str, endpoint: str,
+                 **kwargs) -> requests.Response:
+        """Sends a request to the instance API over the pooled session.
+
+        Waits for the host's rate limiter before sending. Timeouts,
+        connection errors, HTTP 429 and 5xx responses are retried with
+        jittered exponential backoff while the retry policy allows it. A
+        HTTP 429 pauses the whole host for the Retry-After time instead.
+        The call and all its retries are recorded in the metrics as one.
+
+        Args:
+            method (str): HTTP method to use
+            endpoint (str): API endpoint relative to the api_url
+            **kwargs: Passed on to requests.Session.request
+
+        Raises:
+            requests.RequestException: If the request never got a response
+
+        Returns:
+            requests.Response: Last response from the instance
+        """
+        if method != 'GET':
+            # Anything sent changes the site response and the actor index
+            # no longer matches the last one, so read it in full next time.
+            self.site_cache = None
+            self.my_user_hash = None
+
+        attempt = 0
+        waited = 0.0
+        response = None
+        started = perf_counter()
+        try:
+            while True:
+                attempt += 1
+                response = None
+                waited += self.rate_limiter.acquire()
+                try:
+                    response = self.session.request(
+                        method=method,
+                        url=f'{self.api_url}/{endpoint}',
+                        timeout=self.http_options.timeout,
+                        **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as error:
+                    if not self.retry_policy.should_retry(attempt):
+                        raise
+                    delay = self.retry_policy.delay(attempt)
+                    self.logger.warning(f'{type(error).__name__} on'
+                                        f' {endpoint}. Retrying in'
+                                        f' {delay:.1f} seconds.')
+                    sleep(delay)
+                    continue
+
+                if (response.status_code not in RETRY_STATUSES
+                        or not self.retry_policy.should_retry(attempt)):
+                    return response
+
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(
+                        response.headers.get('Retry-After'))
+                    if retry_after is None:
+                        retry_after = self.rate_limit.default_retry_after
+                    self.logger.warning(f'Rate limited by {self.host} on'
+                                        f' {endpoint}. Pausing for'
+                                        f' {retry_after:.1f} seconds.')
+                    self.rate_limiter.pause(retry_after)
+                else:
+                    delay = self.retry_policy.delay(attempt)
+                    self.logger.warning(f'HTTP {response.status_code} on'
+                                        f' {endpoint}. Retrying in'
+                                        f' {delay:.1f} seconds.')
+                    sleep(delay)
+        finally:
+            if self.metrics:
+                self.metrics.record(
+                    self.host, endpoint,
+                    response.status_code if response is not None else None,
+                    perf_counter() - started, retries=attempt - 1,
+                    size=_body_size(response), rate_limit_wait=waited)
+
+    @property
+    def is_logged_in(self) -> bool:
+        """True once there is a login token."""
+        return bool(self._auth_token)
+
+    @property
+    def is_ready(self) -> bool:
+        """True once logged in and the site response was received."""
+        return bool(self._auth_token and self.myuserinfo)
+
+    def forget_login(self) -> None:
+        """Drops the login token and everything read with it."""
+        self._auth_token = None
+        self.myuserinfo = None
+        self.my_user_hash = None
+        self.site_cache = None
+
+    def login(self, use_cache: bool = True) -> None:
+        """Authenticate to Lemmy instance. Generates self._auth_token
+
+        Reuses a cached token from an earlier run when there is one.
+
+        Args:
+            use_cache (bool): False to always send the credentials
+        """
+        if use_cache and self.token_cache:
+            self._auth_token = self.token_cache.get(self.account)
+            if self._auth_token:
+                self._token_may_be_stale = True
+                self.logger.debug('Reusing the cached login.')
+                return
+
         payload = {'username_or_email': self.account.user,
                    'password': self.account.password}
 
         self.logger.debug(f'Attempting to login to {self._site_url}')
+        self._token_may_be_stale = False
 
         try:
-            req = requests.request(
-                method='POST',
-                url=f"{self.api_url}/user/login",
-                json=payload)
+            req = self._request('POST', 'user/login', json=payload)
             req.raise_for_status()
 
             self._auth_token = req.json()['jwt']
             self.logger.debug('Login succeeded.')
+            if self.token_cache:
+                self.token_cache.set(self.account, self._auth_token)
 
         except Exception as exception:
             self.logger.error(f'Login failed for {self.account.user} on'
@@ -55,37 +251,88 @@ class Instance:
             self.logger.error(f'Details: {exception}')
 
     def get_site_response(self) -> None:
-        """Gets the SiteResponse. Will contain MyUserInfo."""
+        """Gets the SiteResponse. Will contain MyUserInfo.
+
+        A response that is still fresh by its Cache-Control isn't asked
+        for again, and one with an ETag or Last-Modified is re-validated.
+        If the user info is the same as last time it isn't parsed again.
+        """
         if not self._auth_token:
             # Not logged in, just return without doing anything.
             return
+        # The cached response is only any use while its user info is held.
+        cached = self.site_cache if self.myuserinfo else None
+        if cached and cached.is_fresh:
+            self.logger.info('Site response is still fresh.')
+            return
         self.logger.info('Attempting to get site response.')
         payload = {'auth': self._auth_token}
 
         try:
-            req = requests.request(
-                method='GET',
-                url=f"{self.api_url}/site",
-                params=payload)
-            req.raise_for_status()
+            req = self._request('GET', 'site', params=payload,
+                                headers=cached.conditional_headers()
+                                if cached else None)
+            my_user = None
+            if req.status_code == 304 and cached:
+                self.logger.info('Site response not modified.')
+                cached.update_freshness(req.headers)
+                self._token_may_be_stale = True
+                return
+            if req.status_code != 401:
+                req.raise_for_status()
+                my_user = req.json().get('my_user')
 
         except Exception as error:
             self.logger.error('Error getting site response.')
             self.logger.error(f'{error = }')
             return
 
+        # A cached or old token that the instance doesn't accept anymore
+        # shows up as a 401 or as a response without the user's info.
+        if not my_user:
+            # Forget the token and the user info it got, so a login that
+            # fails now is tried again on the next run instead of the dead
+            # token being used for good.
+            self.forget_login()
+            if not self._token_may_be_stale:
+                self.logger.error('Site response has no user info. The'
+                                  ' login may have expired.')
+                return
+            self.logger.info('Saved login was rejected. Logging in again.')
+            if self.token_cache:
+                self.token_cache.remove(self.account)
+            self.login(use_cache=False)
+            self.get_site_response()
+            return
+
+        # Only the my_user part is used, so only it has to be the same
+        # as last time.
+        site_cache = CachedResponse.from_headers(req.headers)
+        my_user_hash = content_hash(my_user)
+        self._token_may_be_stale = True
+        if self.myuserinfo and my_user_hash == self.my_user_hash:
+            self.logger.info('Site response unchanged since the last read.')
+            self.site_cache = site_cache
+            return
+
+        # Only the my_user part is turned into objects, the rest of the
+        # site response isn't needed.
         self.logger.info('Site response received. Parsing into object.')
-        self.site_response = json.loads(
-            req.text,
-            object_hook=lambda d: SimpleNamespace(**d))
-
-        self.myuserinfo = MyUserInfo(
-            self.site_response.my_user.local_user_view,
-            self.site_response.my_user.discussion_languages,
-            self.site_response.my_user.follows,
-            self.site_response.my_user.moderates,
-            self.site_response.my_user.community_blocks,
-            self.site_response.my_user.person_blocks)
+        try:
+            self.myuserinfo = MyUserInfo.from_dict(my_user)
+            self.actor_index = ActorIndex.from_myuserinfo(self.myuserinfo)
+
+        except Exception as error:
+            # Don't sync the account from the user info of an older read.
+            self.logger.error('Error parsing site response.')
+            self.logger.error(f'{error = }')
+            self.myuserinfo = None
+            return
+
+        # Only remembered once parsed, so a response that couldn't be
+        # parsed is read and parsed in full again next time.
+        self.site_cache = site_cache
+        self.my_user_hash = my_user_hash
 
         self.get_user_settings()
 
@@ -98,7 +345,7 @@ class Instance:
         Returns:
             (bool): True for success, False for failed to subscribe
         """
-        if not self._auth_token or not self.site_response:
+        if not self.is_ready:
             # Not logged in or site didn't respond initially.
             # Return without doing anything.
             return False
@@ -106,10 +353,9 @@ class Instance:
                           f' "{self._site_url}"')
 
         # Check it's not already subscribed to first.
-        for subscribed_community in self.myuserinfo.follows:
-            if community_url in subscribed_community.community.actor_id:
-                self.logger.debug(f'"{community_url}" already subscribed to.')
-                return True
+        if self.actor_index.has(FOLLOWS, community_url):
+            self.logger.debug(f'"{community_url}" already subscribed to.')
+            return True
 
         # Have to figure out/convert the URL into the ID to subscribe.
         community_id = self.resolve_community_id(community_url=community_url)
@@ -119,33 +365,47 @@ class Instance:
                               ' Unable to subscribe at this time.')
             return False
 
-        # Rest of this is sending the request to subscribe.
+        return self.follow_community_id(community_url, community_id)
+
+    def follow_community_id(self, community_url: str,
+                            community_id: int) -> bool:
+        """Sends the follow for an already resolved community.
+
+        Args:
+            community_url (str): URL of the community, used for logging
+            community_id (int): Community ID on this instance
+
+        Returns:
+            bool: True if successfully subscribed, False if not
+        """
+        if not self.is_ready:
+            # Not logged in or site didn't respond initially.
+            # Return without doing anything.
+            return False
+
+        # Send the request to subscribe.
         payload = {'community_id': community_id,
                    'follow': True,
                    'auth': self._auth_token}
 
         self.logger.debug('Sending the subscribe request.')
-        # Poor man's rate limiting...
-        sleep(0.25)
         try:
-            req = requests.request(
-                method='POST',
-                url=f"{self.api_url}/community/follow",
-                json=payload)
+            req = self._request('POST', 'community/follow', json=payload)
             req.raise_for_status()
 
         except Exception as error:
             self.logger.error(f'Error subscribing to {community_url}.')
             self.logger.error(f'{error = }')
-
-        # Poor man's rate limiting...
-        sleep(0.25)
+            self._forget_resolved(community_url, 'community')
+            return False
 
         if req.status_code == 200:
             self.logger.info(f'Successfully subscribed to {community_url}')
+            self.actor_index.add(FOLLOWS, community_url, community_id)
             return True
         else:
             self.logger.warning(f'Failed to subscribe to {community_url}')
+            self._forget_resolved(community_url, 'community')
             return False
 
     def resolve_community_id(self, community_url: str) -> int | None:
@@ -159,27 +419,82 @@ class Instance:
         Returns:
             (int | None): Community ID if it resolved, otherwise None
         """
-        if not self._auth_token or not self.site_response:
+        if not self.is_ready:
             # Not logged in or site didn't respond initially.
             # Return without doing anything.
             return None
-        self.logger.debug(f'Resolving {community_url} from {self._site_url}')
-        payload = {'q': community_url,
+        return self._resolve_object(community_url, 'community')
+
+    def _resolve_object(self, url: str, kind: str) -> int | None:
+        """Resolves a community or person URL into this instance's ID.
+
+        Other accounts on the same host share the answer, so each URL is
+        only resolved once per host per run.
+
+        Args:
+            url (str): URL of the community or person
+            kind (str): Either "community" or "person"
+
+        Returns:
+            (int | None): Local ID if it resolved, otherwise None
+        """
+        return self.host_group.resolve(
+            kind, normalize_actor_id(url),
+            lambda: self._lookup_object(url, kind))
+
+    def _lookup_object(self, url: str, kind: str) -> int | None:
+        """Looks up a local ID in the resolve cache or from the instance.
+
+        Stores new results in the resolve cache.
+
+        Args:
+            url (str): URL of the community or person
+            kind (str): Either "community" or "person"
+
+        Returns:
+            (int | None): Local ID if it resolved, otherwise None
+        """
+        if self.resolve_cache:
+            local_id = self.resolve_cache.get(self.host,
+                                              normalize_actor_id(url))
+            if local_id is not None:
+                self.logger.debug(f'Resolved {url} from cache.')
+                return local_id
+
+        self.logger.debug(f'Resolving {url} from {self._site_url}')
+        payload = {'q': url,
                    'auth': self._auth_token}
 
         try:
-            req = requests.request(
-                method='GET',
-                url=f"{self.api_url}/resolve_object",
-                params=payload)
+            req = self._request('GET', 'resolve_object', params=payload)
             req.raise_for_status()
+            local_id = req.json()[kind][kind]['id']
 
         except Exception as error:
-            self.logger.error('Error resolving community ID.')
+            self.logger.error(f'Error resolving {kind} ID.')
             self.logger.error(f'{error = }')
             return None
 
-        return req.json()['community']['community']['id']
+        if self.resolve_cache:
+            self.resolve_cache.set(self.host, normalize_actor_id(url),
+                                   local_id)
+        return local_id
+
+    def _forget_resolved(self, url: str, kind: str) -> None:
+        """Drops a resolved ID after a follow or block with it failed.
+
+        The ID may be stale, e.g. the community was purged and fetched
+        again, so it's resolved again next time instead of being reused
+        until the cache entry expires.
+
+        Args:
+            url (str): URL of the community or person
+            kind (str): Either "community" or "person"
+        """
+        actor_id = normalize_actor_id(url)
+        self.host_group.forget(kind, actor_id)
+        if self.resolve_cache:
+            self.resolve_cache.remove(self.host, actor_id)
 
     def block_community(self, community_url: str) -> bool:
         """Block a community for this instance
@@ -190,18 +505,17 @@ class Instance:
         Returns:
             bool: True if successfully blocked, False if not
         """
-        if not self._auth_token or not self.site_response:
+        if not self.is_ready:
             # Not logged in or site didn't respond initially.
             # Return without doing anything.
             return False
         self.logger.debug(f'Blocking {community_url} from {self._site_url}')
 
         # Check it's not already blocked first.
-        for blocked_community in self.myuserinfo.community_blocks:
-            if community_url in blocked_community.community.actor_id:
-                self.logger.debug(f'"{community_url}" already blocked from'
-                                  f' {self._site_url}')
-                return True
+        if self.actor_index.has(COMMUNITY_BLOCKS, community_url):
+            self.logger.debug(f'"{community_url}" already blocked from'
+                              f' {self._site_url}')
+            return True
 
         # Have to figure out/convert the URL into the ID to block.
         community_id = self.resolve_community_id(community_url=community_url)
@@ -211,33 +525,47 @@ class Instance:
                               ' Unable to block at this time.')
             return False
 
-        # Rest of this is sending the request to block.
+        return self.block_community_id(community_url, community_id)
+
+    def block_community_id(self, community_url: str,
+                           community_id: int) -> bool:
+        """Sends the block for an already resolved community.
+
+        Args:
+            community_url (str): URL of the community, used for logging
+            community_id (int): Community ID on this instance
+
+        Returns:
+            bool: True if successfully blocked, False if not
+        """
+        if not self.is_ready:
+            # Not logged in or site didn't respond initially.
+            # Return without doing anything.
+            return False
+
+        # Send the request to block.
         payload = {'community_id': community_id,
                    'block': True,
                    'auth': self._auth_token}
 
         self.logger.debug('Sending the block request.')
-        # Poor man's rate limiting...
-        sleep(0.25)
         try:
-            req = requests.request(
-                method='POST',
-                url=f"{self.api_url}/community/block",
-                json=payload)
+            req = self._request('POST', 'community/block', json=payload)
             req.raise_for_status()
 
         except Exception as error:
             self.logger.error(f'Error blocking {community_url}.')
             self.logger.error(f'{error = }')
-
-        # Poor man's rate limiting...
-        sleep(0.25)
+            self._forget_resolved(community_url, 'community')
+            return False
 
         if req.status_code == 200:
             self.logger.info(f'Successfully blocked {community_url}')
+            self.actor_index.add(COMMUNITY_BLOCKS, community_url, community_id)
             return True
         else:
             self.logger.warning(f'Failed to block {community_url}')
+            self._forget_resolved(community_url, 'community')
             return False
 
     def resolve_person_id(self, person_url: str) -> int | None:
@@ -251,27 +579,11 @@ class Instance:
         Returns:
             (int | None): Person ID if it resolved, otherwise None
         """
-        if not self._auth_token or not self.site_response:
+        if not self.is_ready:
             # Not logged in or site didn't respond initially.
             # Return without doing anything.
             return None
-        self.logger.debug(f'Resolving {person_url} from {self._site_url}')
-        payload = {'q': person_url,
-                   'auth': self._auth_token}
-
-        try:
-            req = requests.request(
-                method='GET',
-                url=f"{self.api_url}/resolve_object",
-                params=payload)
-            req.raise_for_status()
-
-        except Exception as error:
-            self.logger.error('Error resolving person ID.')
-            self.logger.error(f'{error = }')
-            return None
-
-        return req.json()['person']['person']['id']
+        return self._resolve_object(person_url, 'person')
 
     def block_person(self, person_url: str) -> bool:
         """Block a person for this instance
@@ -282,18 +594,17 @@ class Instance:
         Returns:
             bool: True if successfully blocked, False if not
         """
-        if not self._auth_token or not self.site_response:
+        if not self.is_ready:
             # Not logged in or site didn't respond initially.
             # Return without doing anything.
             return False
         self.logger.debug(f'Blocking {person_url} from {self._site_url}')
 
         # Check they not already blocked first.
-        for blocked_person in self.myuserinfo.person_blocks:
-            if person_url in blocked_person.target.actor_id:
-                self.logger.debug(f'"{person_url}" already blocked from'
-                                  f' {self._site_url}')
-                return True
+        if self.actor_index.has(PERSON_BLOCKS, person_url):
+            self.logger.debug(f'"{person_url}" already blocked from'
+                              f' {self._site_url}')
+            return True
 
         # Have to figure out/convert the URL into the ID to block.
         person_id = self.resolve_person_id(person_url=person_url)
@@ -303,42 +614,136 @@ class Instance:
                               ' Unable to block at this time.')
             return False
 
-        # Rest of this is sending the request to block.
+        return self.block_person_id(person_url, person_id)
+
+    def block_person_id(self, person_url: str, person_id: int) -> bool:
+        """Sends the block for an already resolved person.
+
+        Args:
+            person_url (str): URL of the person, used for logging
+            person_id (int): Person ID on this instance
+
+        Returns:
+            bool: True if successfully blocked, False if not
+        """
+        if not self.is_ready:
+            # Not logged in or site didn't respond initially.
+            # Return without doing anything.
+            return False
+
+        # Send the request to block.
         payload = {'person_id': person_id,
                    'block': True,
                    'auth': self._auth_token}
 
         self.logger.debug('Sending the block request.')
-        # Poor man's rate limiting...
-        sleep(0.25)
         try:
-            req = requests.request(
-                method='POST',
-                url=f"{self.api_url}/user/block",
-                json=payload)
+            req = self._request('POST', 'user/block', json=payload)
             req.raise_for_status()
 
         except Exception as error:
             self.logger.error(f'Error blocking {person_url}.')
             self.logger.error(f'{error = }')
-
-        # Poor man's rate limiting...
-        sleep(0.25)
+            self._forget_resolved(person_url, 'person')
+            return False
 
         if req.status_code == 200:
             self.logger.info(f'Successfully blocked {person_url}')
+            self.actor_index.add(PERSON_BLOCKS, person_url, person_id)
             return True
         else:
             self.logger.warning(f'Failed to block {person_url}')
+            self._forget_resolved(person_url, 'person')
             return False
 
+    def unsubscribe_from_community(self, community_url: str) -> bool:
+        """Unsubscribes from a community this instance is subscribed to.
+
+        Args:
+            community_url (str): URL for the community to unsubscribe from
+
+        Returns:
+            bool: True if unsubscribed or not subscribed, False if it failed
+        """
+        return self._undo(FOLLOWS, community_url, 'community/follow',
+                          'community_id', 'follow')
+
+    def unblock_community(self, community_url: str) -> bool:
+        """Unblocks a community that is blocked on this instance.
+
+        Args:
+            community_url (str): Community URL to unblock
+
+        Returns:
+            bool: True if unblocked or not blocked, False if it failed
+        """
+        return self._undo(COMMUNITY_BLOCKS, community_url, 'community/block',
+                          'community_id', 'block')
+
+    def unblock_person(self, person_url: str) -> bool:
+        """Unblocks a person that is blocked on this instance.
+
+        Args:
+            person_url (str): Person URL to unblock
+
+        Returns:
+            bool: True if unblocked or not blocked, False if it failed
+        """
+        return self._undo(PERSON_BLOCKS, person_url, 'user/block',
+                          'person_id', 'block')
+
+    def _undo(self, kind: str, url: str, endpoint: str, id_key: str,
+              flag: str) -> bool:
+        """Sends a follow or block with the flag set to false.
+
+        The local ID comes from the actor index, so nothing needs to be
+        resolved first.
+
+        Args:
+            kind (str): Actor index kind the URL is in
+            url (str): URL of the community or person
+            endpoint (str): API endpoint for the follow or block
+            id_key (str): Payload key for the local ID
+            flag (str): Payload key to set to false
+
+        Returns:
+            bool: True if removed or not there at all, False if it failed
+        """
+        if not self.is_ready:
+            # Not logged in or site didn't respond initially.
+            # Return without doing anything.
+            return False
+
+        local_id = self.actor_index.get(kind).get(normalize_actor_id(url))
+        if local_id is None:
+            self.logger.debug(f'"{url}" already removed from {self._site_url}')
+            return True
+
+        payload = {id_key: local_id,
+                   flag: False,
+                   'auth': self._auth_token}
+
+        self.logger.debug(f'Sending the {flag} removal for {url}.')
+        try:
+            req = self._request('POST', endpoint, json=payload)
+            req.raise_for_status()
+
+        except Exception as error:
+            self.logger.error(f'Error removing {flag} for {url}.')
+            self.logger.error(f'{error = }')
+            return False
+
+        self.logger.info(f'Successfully removed {flag} for {url}')
+        self.actor_index.remove(kind, url)
+        return True
+
     def get_user_settings(self) -> SaveUserSettings:
         """Gets your user settings from the instance.
 
         Returns:
             SaveUserSettings | None: Object that contains your settings
         """
-        if not self._auth_token or not self.site_response:
+        if not self.is_ready:
             # Not logged in or site didn't respond initially.
             # Return without doing anything.
             self.logger.warning('Not logged in or no site response to get'
@@ -354,45 +759,66 @@ class Instance:
     def save_user_settings(self, settings_to_save: SaveUserSettings) -> bool:
         """Saves your user settings to the instance.
 
+        Only the settings that differ from the instance's are sent.
+
         Args:
             settings_to_save (SaveUserSettings): Settings to save to the instance
 
         Returns:
             bool: True if settings were saved, False otherwise.
         """
-        if not self._auth_token or not self.site_response:
+        if not self.is_ready:
             # Not logged in or site didn't respond initially.
             # Return without doing anything.
             self.logger.warning('Not logged in or no site response to save'
                                 ' user settings.')
             return False
+        return self.save_settings_changes(
+            settings_to_save.diff(self.user_settings))
+
+    def save_settings_changes(self, changes: dict) -> bool:
+        """Saves only the given user settings to the instance.
+
+        Settings that aren't in changes are left as they are on the
+        instance, and nothing is sent if there are no changes.
+
+        Args:
+            changes (dict): Setting name -> new value
 
-        if settings_to_save == self.user_settings:
+        Returns:
+            bool: True if settings were saved, False otherwise.
+        """
+        if not self.is_ready:
+            # Not logged in or site didn't respond initially.
+            # Return without doing anything.
+            self.logger.warning('Not logged in or no site response to save'
+                                ' user settings.')
+            return False
+
+        if not changes:
             self.logger.info(
                 f'{self._site_url} user settings already match. Moving on.')
             return True
 
-        self.logger.info(f'Saving user settings to {self._site_url}')
-        self.user_settings = settings_to_save
-        # Rewriting auth for the settings since it was overwritten in
-        # last step.
-        self.user_settings.auth = self._auth_token
+        self.logger.info(f'Saving {", ".join(sorted(changes))} to'
+                         f' {self._site_url}')
+        payload = {**changes, 'auth': self._auth_token}
 
         try:
-            req = requests.request(
-                method='PUT',
-                url=f"{self.api_url}/user/save_user_settings",
-                json=self.user_settings.paylod())
+            req = self._request('PUT', 'user/save_user_settings',
+                                json=payload)
             req.raise_for_status()
 
         except Exception as error:
             self.logger.error(
                 f'Error saving user settings on {self._site_url}.')
             self.logger.error(f'{error = }')
+            return False
 
         if req.status_code == 200:
             self.logger.info(
                 f'Successfully saved user settings to {self._site_url}')
+            self.user_settings = replace(self.user_settings, **changes)
             return True
         else:
             self.logger.warning(
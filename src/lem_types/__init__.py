@@ -1,16 +1,37 @@
-"""All Lemmy types in a single location."""
-from .community import Community
-from .communityblockview import CommunityBlockView
-from .communityfollowerview import CommunityFollowerView
-from .communitymoderatorview import CommunityModeratorView
-from .languageid import LanguageId
-from .listingtype import ListingType
-from .localuser import LocalUser
-from .localuserview import LocalUserView
-from .myuserinfo import MyUserInfo
-from .person import Person
-from .personaggregates import PersonAggregates
-from .personblockview import PersonBlockView
-from .personid import PersonId
-from .saveusersettings import SaveUserSettings
-from .sorttype import SortType
+"""All Lemmy types in a single location.
+
+The modules are only imported when one of their classes is first used.
+"""
+from importlib import import_module
+
+# Class name -> module that defines it.
+_MODULES = {'Community': 'community',
+            'CommunityBlockView': 'communityblockview',
+            'CommunityFollowerView': 'communityfollowerview',
+            'CommunityModeratorView': 'communitymoderatorview',
+            'LanguageId': 'languageid',
+            'ListingType': 'listingtype',
+            'LocalUser': 'localuser',
+            'LocalUserView': 'localuserview',
+            'MyUserInfo': 'myuserinfo',
+            'Person': 'person',
+            'PersonAggregates': 'personaggregates',
+            'PersonBlockView': 'personblockview',
+            'PersonId': 'personid',
+            'SaveUserSettings': 'saveusersettings',
+            'SortType': 'sorttype'}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _MODULES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(f'.{_MODULES[name]}', __name__), name)
+    # Keep it so later lookups don't come back here.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__])
@@ -1,8 +1,10 @@
 """Community Class"""
 from dataclasses import dataclass
 
+from .fromdict import known_fields
 
-@dataclass
+
+@dataclass(slots=True)
 class Community:
     """Community dataclass."""
     id: int
@@ -20,4 +22,9 @@ class Community:
     banner: str
     hidden: bool
     posting_restricted_to_mods: bool
-    instance_id: int
\ No newline at end of file
+    instance_id: int
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Community':
+        """Builds a Community from the API response dict."""
+        return cls(**known_fields(cls, data))
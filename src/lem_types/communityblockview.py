@@ -5,8 +5,14 @@ from .community import Community
 from .person import Person
 
 
-@dataclass
+@dataclass(slots=True)
 class CommunityBlockView:
     """CommunityBlockView dataclass."""
     person : Person = field(default_factory=Person)
     community : Community = field(default_factory=Community)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CommunityBlockView':
+        """Builds a CommunityBlockView from the API response dict."""
+        return cls(person=Person.from_dict(data['person']),
+                   community=Community.from_dict(data['community']))
@@ -5,8 +5,14 @@ from.community import Community
 from .person import Person
 
 
-@dataclass
+@dataclass(slots=True)
 class CommunityFollowerView:
     """CommunityFollowerView dataclass."""
     community: Community = field(default_factory=Community)
-    follower: Person = field(default_factory=Person)
\ No newline at end of file
+    follower: Person = field(default_factory=Person)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CommunityFollowerView':
+        """Builds a CommunityFollowerView from the API response dict."""
+        return cls(community=Community.from_dict(data['community']),
+                   follower=Person.from_dict(data['follower']))
@@ -5,8 +5,14 @@ from .community import Community
 from .person import Person
 
 
-@dataclass
+@dataclass(slots=True)
 class CommunityModeratorView:
     """CommunityModeratorView dataclass."""
     community: Community = field(default_factory=Community)
-    moderator: Person = field(default_factory=Person)
\ No newline at end of file
+    moderator: Person = field(default_factory=Person)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CommunityModeratorView':
+        """Builds a CommunityModeratorView from the API response dict."""
+        return cls(community=Community.from_dict(data['community']),
+                   moderator=Person.from_dict(data['moderator']))
@@ -0,0 +1,26 @@
+"""Helper for building the dataclasses from API response dicts."""
+from dataclasses import MISSING, fields
+
+
+def known_fields(cls: type, data: dict) -> dict:
+    """Picks the keys of an API dict that the dataclass has fields for.
+
+    Lemmy adds new keys over time, so unknown keys are ignored. Fields
+    without a plain default that the instance didn't send are set to None.
+    That includes fields with a default_factory, since some factories,
+    like the enums, can't be called without a value.
+
+    Args:
+        cls (type): Dataclass to build
+        data (dict): Dict from the API response
+
+    Returns:
+        dict: Keyword arguments for the dataclass
+    """
+    kwargs = dict()
+    for item in fields(cls):
+        if item.name in data:
+            kwargs[item.name] = data[item.name]
+        elif item.default is MISSING:
+            kwargs[item.name] = None
+    return kwargs
@@ -1,11 +1,12 @@
 """LocalUser Class"""
 from dataclasses import dataclass, field
 
+from .fromdict import known_fields
 from .listingtype import ListingType
 from .sorttype import SortType
 
 
-@dataclass
+@dataclass(slots=True)
 class LocalUser:
     """LocalUser dataclass."""
     id: int
@@ -26,3 +27,8 @@ class LocalUser:
     totp_2fa_url: str | None = None
     default_sort_type: SortType = field(default_factory=SortType)
     default_listing_type: ListingType = field(default_factory=ListingType)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LocalUser':
+        """Builds a LocalUser from the API response dict."""
+        return cls(**known_fields(cls, data))
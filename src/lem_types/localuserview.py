@@ -6,9 +6,17 @@ from .person import Person
 from .personaggregates import PersonAggregates
 
 
-@dataclass
+@dataclass(slots=True)
 class LocalUserView:
     """LocalUserView dataclass."""
     local_user: LocalUser = field(default_factory=LocalUser)
     person: Person = field(default_factory=Person)
-    counts: PersonAggregates = field(default_factory=PersonAggregates)
\ No newline at end of file
+    counts: PersonAggregates = field(default_factory=PersonAggregates)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LocalUserView':
+        """Builds a LocalUserView from the API response dict."""
+        counts = data.get('counts')
+        return cls(local_user=LocalUser.from_dict(data['local_user']),
+                   person=Person.from_dict(data['person']),
+                   counts=PersonAggregates.from_dict(counts) if counts else None)
@@ -8,7 +8,7 @@ from .localuserview import LocalUserView
 from .personblockview import PersonBlockView
 
 
-@dataclass
+@dataclass(slots=True)
 class MyUserInfo:
     """MyUserInfo dataclass."""
     local_user_view: LocalUserView
@@ -24,3 +24,23 @@ class MyUserInfo:
 
     person_blocks: list[PersonBlockView] = field(
         default_factory=list[PersonBlockView])
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MyUserInfo':
+        """Builds a MyUserInfo from the "my_user" part of the site response.
+
+        Only this part of the response is turned into objects, so the work
+        grows with the account's follows and blocks rather than the size of
+        the whole site response.
+        """
+        return cls(
+            local_user_view=LocalUserView.from_dict(data['local_user_view']),
+            discussion_languages=data.get('discussion_languages'),
+            follows=[CommunityFollowerView.from_dict(view)
+                     for view in data.get('follows', [])],
+            moderates=[CommunityModeratorView.from_dict(view)
+                       for view in data.get('moderates', [])],
+            community_blocks=[CommunityBlockView.from_dict(view)
+                              for view in data.get('community_blocks', [])],
+            person_blocks=[PersonBlockView.from_dict(view)
+                           for view in data.get('person_blocks', [])])
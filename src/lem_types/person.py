@@ -1,8 +1,10 @@
 """Person Class"""
 from dataclasses import dataclass
 
+from .fromdict import known_fields
 
-@dataclass
+
+@dataclass(slots=True)
 class Person:
     """Person dataclass."""
     id: int
@@ -22,3 +24,8 @@ class Person:
     bio: str | None = None
     matrix_user_id: str | None = None
     updated: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Person':
+        """Builds a Person from the API response dict."""
+        return cls(**known_fields(cls, data))
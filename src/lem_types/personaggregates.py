@@ -1,8 +1,10 @@
 """PersonAggregates Class"""
 from dataclasses import dataclass
 
+from .fromdict import known_fields
 
-@dataclass
+
+@dataclass(slots=True)
 class PersonAggregates:
     """PersonAggregates dataclass."""
     id: int
@@ -10,4 +12,9 @@ class PersonAggregates:
     post_count: int
     post_score: int
     comment_count: int
-    comment_score: int
\ No newline at end of file
+    comment_score: int
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PersonAggregates':
+        """Builds a PersonAggregates from the API response dict."""
+        return cls(**known_fields(cls, data))
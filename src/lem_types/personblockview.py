@@ -4,8 +4,14 @@ from dataclasses import dataclass, field
 from .person import Person
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonBlockView:
     """PersonBlockView dataclass."""
     person: Person = field(default_factory=Person)
-    target: Person = field(default_factory=Person)
\ No newline at end of file
+    target: Person = field(default_factory=Person)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PersonBlockView':
+        """Builds a PersonBlockView from the API response dict."""
+        return cls(person=Person.from_dict(data['person']),
+                   target=Person.from_dict(data['target']))
@@ -1,13 +1,18 @@
 """SaveUserSettings Class"""
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
 from .listingtype import ListingType
 from .localuser import LocalUser
 from .person import Person
 from .sorttype import SortType
 
+# Don't think you can save/point to another image? Might try later.
+# Also ignoring the 2fa thing since I think that's probably bad to
+# copy across accounts...
+IGNORED_ON_SAVE = ('avatar', 'banner', 'generate_totp_2fa')
 
-@dataclass
+
+@dataclass(slots=True)
 class SaveUserSettings:
     """SaveUserSettings dataclass."""
     auth: str = field(compare=False)
@@ -40,13 +45,13 @@ class SaveUserSettings:
             localuser (LocalUser): MyUserInfo LocalUser response from instance
         """
         # Set all the SaveUserSettings attributes that we find.
-        for item in vars(self).items():
+        for item in fields(self):
             # Get values from Person
-            if item[0] in vars(person).keys():
-                setattr(self, item[0], getattr(person, item[0]))
+            if hasattr(person, item.name):
+                setattr(self, item.name, getattr(person, item.name))
             # Get values from LocalUser
-            if item[0] in vars(localuser).keys():
-                setattr(self, item[0], getattr(localuser, item[0]))
+            if hasattr(localuser, item.name):
+                setattr(self, item.name, getattr(localuser, item.name))
 
     def paylod(self) -> dict:
         """Generates a payload to send to update your user settings.
@@ -55,13 +60,30 @@ class SaveUserSettings:
             dict: Payload to send for updating user settings.
         """
         payload = dict()
-        # Don't think you can save/point to another image? Might try later.
-        # Also ignoring the 2fa thing since I think that's probably bad to
-        # copy across accounts...
-        attributes_to_ignore: list[str] = ['avatar',
-                                           'banner',
-                                           'generate_totp_2fa']
-        for item in vars(self).items():
-            if item[1] is not None and item[0] not in attributes_to_ignore:
-                payload.update([item])
+        for item in fields(self):
+            value = getattr(self, item.name)
+            if value is not None and item.name not in IGNORED_ON_SAVE:
+                payload[item.name] = value
         return payload
+
+    def diff(self, current: 'SaveUserSettings | None') -> dict:
+        """Finds the settings that would change if these were saved.
+
+        Settings that aren't set here, or that are never copied, are left
+        alone.
+
+        Args:
+            current (SaveUserSettings | None): Settings the instance has now
+
+        Returns:
+            dict: Setting name -> new value for every setting that differs
+        """
+        changes = dict()
+        for item in fields(self):
+            value = getattr(self, item.name)
+            if (not item.compare or value is None
+                    or item.name in IGNORED_ON_SAVE):
+                continue
+            if current is None or getattr(current, item.name) != value:
+                changes[item.name] = value
+        return changes
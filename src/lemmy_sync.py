@@ -1,17 +1,36 @@
-"""Main program to run. Syncs your accounts."""
-import configparser
+"""Main program to run. Syncs your accounts.
+
+Only what's needed to read the arguments and the config is imported up
+front. The HTTP stack and everything that talks to the instances is
+imported once there's work to do, so a run that has nothing to do, e.g.
+because the config is missing, starts quickly.
+"""
+from __future__ import annotations
+
+import argparse
+import json
 import os
 import sys
 from pathlib import Path
-from time import sleep
+from time import perf_counter, process_time
+from typing import TYPE_CHECKING, Callable
+
+from log_config import configure_logging, setup_logging, shutdown_logging
+from sync_config import (ConfigError, SyncGroup, load_groups, read_ini_group,
+                         slugify)
 
-from account import Account
-from instance import Instance
-from log_config import configure_logging
+if TYPE_CHECKING:
+    from account import Account
+    from group_sync import GroupSync
+    from instance import Instance
+    from shard_runner import RunReport, ShardResult
+    from sync_plan import ActionBudget, InstancePlan
 
 # Setup a logger for debugging/outputs.
 logger = configure_logging('lemmy_sync')
 
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
 
 def get_accounts(config_file: Path) -> list[Account]:
     """Get the accounts from the provided configuration file.
@@ -22,143 +41,798 @@ def get_accounts(config_file: Path) -> list[Account]:
     Returns:
         list[Account]: List of Account objects
     """
-    config = configparser.ConfigParser(interpolation=None)
-
     logger.info('Reading the config file.')
-    read = config.read(config_file)
-
-    if not read:
-        logger.error('Could not read the config file. Check the formatting'
-                     ' matches the "exampleconfig.ini".')
+    try:
+        accounts = read_ini_group(config_file).accounts
+    except ConfigError as error:
+        logger.error(f'{error} Check the formatting matches the'
+                     ' "exampleconfig.ini".')
         logger.info('Program exiting.')
         sys.exit(1)
 
-    accounts: list[Account] = list()
-
-    # Read config into list of account objects.
-    for i in config.sections():
-        items = dict(config.items(i))
-        account = Account(account=i,
-                          site=items['site'],
-                          user=items['user'],
-                          password=items['password'])
-        accounts.append(account)
-
     logger.info('Found the following accounts:')
     for acc in accounts:
         logger.info(acc)
     return accounts
 
 
-def main():
-    """Main code to do the account syncing."""
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line arguments.
+
+    Args:
+        argv (list[str] | None): Arguments to parse, defaults to sys.argv
+
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description='Sync your Lemmy accounts with each other.')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Maximum number of instances to sync at the'
+                             ' same time. Use 1 to sync them one after'
+                             ' another. (default: %(default)s)')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Processes to split the groups between, e.g.'
+                             ' the number of CPU cores for hundreds of'
+                             ' accounts. (default: %(default)s)')
+    parser.add_argument('--pool-size', type=int, default=10,
+                        help='Connections kept open per instance.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--no-keep-alive', action='store_true',
+                        help='Close connections after every request.')
+    parser.add_argument('--connect-timeout', type=float, default=5.0,
+                        help='Seconds to wait for a connection.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--read-timeout', type=float, default=30.0,
+                        help='Seconds to wait for a response.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--rate', type=float, default=4.0,
+                        help='Requests per second allowed to each host.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--burst', type=int, default=8,
+                        help='Requests that can be sent to a host at once'
+                             ' before the rate applies.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not use the resolve cache.')
+    parser.add_argument('--cache-ttl', type=float, default=30,
+                        help='Days to keep resolved community and person'
+                             ' IDs. (default: %(default)s)')
+    parser.add_argument('--cache-size', type=int, default=100_000,
+                        help='Maximum number of resolved IDs to keep.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only plan the sync and show what would be'
+                             ' done without sending any changes.')
+    parser.add_argument('--plan-output', type=Path, metavar='FILE',
+                        help='Write the planned actions to a JSON file.')
+    parser.add_argument('--max-actions', type=int, metavar='N',
+                        help='Send at most this many follows, blocks and'
+                             ' settings changes per run. Blocks go first and'
+                             ' the rest waits for the next run.')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help='Stop sending new actions this many seconds'
+                             ' after the run started, e.g. to finish before'
+                             ' the next cron run.')
+    parser.add_argument('--retries', type=int, default=4,
+                        help='Attempts per request for timeouts, HTTP 429'
+                             ' and 5xx errors. (default: %(default)s)')
+    parser.add_argument('--retry-budget', type=int, default=200,
+                        help='Maximum retries for the whole run.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help='Resolved URLs allowed to wait for their'
+                             ' follow or block request per instance.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--no-token-cache', action='store_true',
+                        help='Log in with the password every run instead'
+                             ' of reusing saved login tokens.')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore the snapshot from the last sync and'
+                             ' sync everything every account has.')
+    parser.add_argument('--tombstone-days', type=float, default=30,
+                        help='Days to keep removing something that was'
+                             ' unfollowed or unblocked from accounts that'
+                             ' still have it. (default: %(default)s)')
+    parser.add_argument('--max-removals', type=int, default=50,
+                        help='Skip removing things from the other accounts'
+                             ' when more than this many were removed since'
+                             ' the last sync. (default: %(default)s)')
+    parser.add_argument('--config', type=Path, metavar='PATH',
+                        help='Config file (.ini or .toml) or a folder of'
+                             ' them. (default: "myconfig.ini" next to this'
+                             ' script)')
+    parser.add_argument('--state-dir', type=Path, metavar='PATH',
+                        help='Folder for the caches and sync snapshots.'
+                             ' (default: next to this script)')
+    parser.add_argument('--export', type=Path, metavar='FOLDER',
+                        help='Save a snapshot of every account\'s follows,'
+                             ' blocks and settings to this folder instead'
+                             ' of syncing.')
+    parser.add_argument('--import', dest='import_file', type=Path,
+                        metavar='FILE',
+                        help='Give accounts everything in a snapshot file'
+                             ' that they don\'t have instead of syncing.')
+    parser.add_argument('--to', action='append', metavar='ACCOUNT',
+                        help='Account to --export or --import into. Can be'
+                             ' given more than once. Account names are only'
+                             ' unique within a group, so this picks the'
+                             ' account in every group that has one by that'
+                             ' name. (default: every account)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and sync every --interval'
+                             ' seconds.')
+    parser.add_argument('--interval', type=float, default=300,
+                        help='Seconds between syncs with --daemon.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                        help='Randomly change each interval by up to this'
+                             ' fraction. (default: %(default)s)')
+    parser.add_argument('--status-port', type=int,
+                        help='Serve /status and /health on this local port'
+                             ' with --daemon.')
+    parser.add_argument('--max-runs', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--log-level', default='DEBUG', type=str.upper,
+                        choices=LOG_LEVELS,
+                        help='Lowest level shown on the console.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--log-file-level', default='DEBUG', type=str.upper,
+                        choices=LOG_LEVELS,
+                        help='Lowest level written to the log file.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--log-file', default='logging.log', metavar='FILE',
+                        help='Log file to write, "" for none.'
+                             ' (default: %(default)s)')
+    parser.add_argument('--report', type=Path, metavar='FILE',
+                        help='Write a JSON report of the sync with the'
+                             ' totals of every shard.')
+    parser.add_argument('--metrics-json', type=Path, metavar='FILE',
+                        help='Write timing and size stats of every API'
+                             ' call to a JSON file.')
+    parser.add_argument('--metrics-prom', type=Path, metavar='FILE',
+                        help='Write the API call stats as a Prometheus'
+                             ' textfile, e.g. for the node_exporter'
+                             ' textfile collector.')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.shards < 1:
+        parser.error('--shards must be at least 1')
+    if args.shards > 1 and (args.daemon or args.export or args.import_file):
+        parser.error('--shards can\'t be used with --daemon, --export or'
+                     ' --import')
+    if args.pool_size < 1:
+        parser.error('--pool-size must be at least 1')
+    if args.retries < 1:
+        parser.error('--retries must be at least 1')
+    if args.rate <= 0 or args.burst < 1:
+        parser.error('--rate must be positive and --burst at least 1')
+    if args.interval <= 0 or not 0 <= args.jitter < 1:
+        parser.error('--interval must be positive and --jitter between 0'
+                     ' and 1')
+    if args.max_actions is not None and args.max_actions < 0:
+        parser.error('--max-actions can\'t be negative')
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error('--deadline must be positive')
+    return args
+
+
+def run_concurrently(func: Callable[[Instance], None],
+                     instances: list[Instance],
+                     max_workers: int) -> None:
+    """Runs func for every instance using a pool of worker threads.
+
+    At most max_workers instances are worked on at the same time, so the
+    total time is bounded by the slowest instance instead of the sum of
+    all of them.
+
+    Args:
+        func (Callable[[Instance], None]): Function to run for each instance
+        instances (list[Instance]): Instances to run the function for
+        max_workers (int): Maximum number of instances worked on at once
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(max_workers=max_workers,
+                            thread_name_prefix='sync') as executor:
+        futures = {executor.submit(func, instance): instance
+                   for instance in instances}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as error:
+                logger.error(f'Unexpected error while working on'
+                             f' {futures[future].account.account}.')
+                logger.error(f'{error = }')
+
+
+def prepare_instance(instance: Instance) -> None:
+    """Login and get the site response for a single instance.
+
+    Instances that are already logged in only get the site response.
+
+    Args:
+        instance (Instance): Instance to prepare
+    """
+    if not instance.is_logged_in:
+        instance.login()
+    instance.get_site_response()
+
+
+def run_plans(plans: dict[Instance, InstancePlan], max_workers: int,
+              queue_size: int = 16,
+              budget: ActionBudget | None = None) -> None:
+    """Executes plans with each instance running its own part at once.
+
+    Args:
+        plans (dict[Instance, InstancePlan]): Plan for each instance
+        max_workers (int): Maximum number of instances worked on at once
+        queue_size (int): Resolved URLs allowed to wait for their action
+        budget (ActionBudget | None): Limit on the actions sent
+    """
+    from sync_plan import execute_plan
+
+    run_concurrently(
+        lambda instance: execute_plan(instance, plans[instance], queue_size,
+                                      budget),
+        [instance for instance, plan in plans.items() if plan.actions],
+        max_workers)
+
+
+def reconcile(syncs: list[GroupSync], max_workers: int,
+              queue_size: int = 16,
+              budget: ActionBudget | None = None) -> None:
+    """Re-reads each synced account once and retries anything still missing.
+
+    Args:
+        syncs (list[GroupSync]): Groups that were synced
+        max_workers (int): Maximum number of instances worked on at once
+        queue_size (int): Resolved URLs allowed to wait for their action
+        budget (ActionBudget | None): Limit on the actions sent
+    """
+    from scheduler import schedule
+
+    syncs = [sync for sync in syncs if sync.plan.actions]
+    if not syncs:
+        return
+    if budget and budget.exhausted:
+        logger.info('The run is out of actions or time, leaving the rest'
+                    ' for the next run.')
+        return
+
+    logger.info('Checking for anything that failed to sync.')
+    run_concurrently(lambda instance: instance.get_site_response(),
+                     [i for sync in syncs for i in sync.ready_instances],
+                     max_workers)
+    plans: dict[Instance, InstancePlan] = dict()
+    for sync in syncs:
+        plan = sync.replan()
+        if plan.actions:
+            sync.logger.info('Retrying the actions that are still missing.')
+            for line in plan.summary():
+                sync.logger.info(line)
+        plans.update(sync.plans_by_instance())
+
+    if any(plan.actions for plan in plans.values()):
+        if budget:
+            waiting = dict()
+            for sync in syncs:
+                waiting.update(sync.waiting())
+            plans, _deferred = schedule(plans, budget, waiting)
+        run_plans(plans, max_workers, queue_size, budget)
+    else:
+        logger.info('Every instance is in sync.')
+
+
+def load_config(cfg_path: Path | None) -> list[SyncGroup]:
+    """Loads the sync groups, exiting with a message if it can't.
+
+    Args:
+        cfg_path (Path | None): Config file or folder, defaults to
+            "myconfig.ini" next to this script
 
-    # Establish a base Path to the config file.
-    cfg_path = Path(os.path.dirname(__file__), 'myconfig.ini')
+    Returns:
+        list[SyncGroup]: Groups to sync
+    """
+    # Establish a base Path to the config file or folder.
+    if not cfg_path:
+        cfg_path = Path(os.path.dirname(__file__), 'myconfig.ini')
 
-    # Verify the config file exists. Provide error message and exit
-    # if it doesn't.
-    if not cfg_path.is_file():
+    # Verify the config exists. Provide error message and exit if it
+    # doesn't.
+    if not cfg_path.exists():
         logger.error(f'File "{cfg_path}" does not exist. Please copy and'
                      ' paste the "exampleconfig.ini" file, rename it to'
                      ' "myconfig.ini" and fill it out with your information.')
         logger.info('Program exiting.')
         sys.exit(1)
 
-    # Get the accounts from the config file.
-    accounts = get_accounts(cfg_path)
+    # Get the sync groups from the config.
+    logger.info('Reading the config.')
+    try:
+        groups = load_groups(cfg_path)
+    except ConfigError as error:
+        logger.error(f'{error} Check the formatting matches the'
+                     ' "exampleconfig.ini".')
+        logger.info('Program exiting.')
+        sys.exit(1)
+    for group in groups:
+        logger.info(f'Group "{group.name}" has the following accounts:')
+        for account in group.accounts:
+            logger.info(account)
+    return groups
+
+
+class SharedResources:
+    """Everything that talks to the instances, shared by every group."""
+
+    def __init__(self, args: argparse.Namespace, state_root: Path) -> None:
+        from host_group import HostGroups
+        from http_session import HttpOptions, SessionPool
+        from metrics import Metrics
+        from rate_limiter import RateLimitOptions
+        from resolve_cache import ResolveCache
+        from retry import RetryOptions, RetryPolicy
+        from token_cache import TokenCache
+
+        self.http_options = HttpOptions(pool_size=args.pool_size,
+                                        keep_alive=not args.no_keep_alive,
+                                        connect_timeout=args.connect_timeout,
+                                        read_timeout=args.read_timeout)
+        self.session_pool = SessionPool(self.http_options)
+        # Shards share the rate limits of each host through a file.
+        self.rate_limit = RateLimitOptions(
+            rate=args.rate, burst=args.burst,
+            shared_path=state_root / 'rate_limits.sqlite3'
+            if args.shards > 1 else None)
+        self.retry_policy = RetryPolicy(
+            RetryOptions(max_attempts=args.retries, budget=args.retry_budget))
+        self.resolve_cache = None
+        if not args.no_cache:
+            self.resolve_cache = ResolveCache(
+                state_root / 'resolve_cache.sqlite3',
+                ttl=args.cache_ttl * 24 * 60 * 60,
+                max_entries=args.cache_size)
+        self.token_cache = None
+        if not args.no_token_cache:
+            self.token_cache = TokenCache(state_root / 'token_cache.json')
+        self.metrics = Metrics()
+        self.host_groups = HostGroups()
+
+    def make_instance(self, account: Account,
+                      group: str | None = None) -> Instance:
+        """Makes an Instance that uses the shared resources.
 
-    # Make an Instance object for each account and add to a single list.
+        Args:
+            account (Account): Account to make the Instance for
+            group (str | None): Name of the account's group, for the log
+
+        Returns:
+            Instance: Instance for the account
+        """
+        from instance import Instance
+
+        return Instance(account=account, http_options=self.http_options,
+                        rate_limit=self.rate_limit,
+                        resolve_cache=self.resolve_cache,
+                        retry_policy=self.retry_policy,
+                        token_cache=self.token_cache,
+                        session_pool=self.session_pool,
+                        host_groups=self.host_groups,
+                        metrics=self.metrics,
+                        group=group)
+
+    def close(self) -> None:
+        """Closes the sessions and the resolve cache."""
+        self.session_pool.close()
+        if self.resolve_cache:
+            self.resolve_cache.close()
+
+    def log_stats(self) -> None:
+        """Logs the cache, lookup, retry and timing stats."""
+        if self.resolve_cache:
+            logger.info(f'Resolve cache: {self.resolve_cache.stats()}')
+        for host_group in self.host_groups:
+            logger.info(f'{host_group.host}: {host_group.stats()}')
+        logger.info(f'Retries used: {self.retry_policy.retries}')
+        logger.info('Where the time went:')
+        for line in self.metrics.summary():
+            logger.info(line)
+
+    def shard_result(self, shard: int, syncs: list[GroupSync], actions: int,
+                     started: float, cpu_started: float) -> ShardResult:
+        """What the groups synced with these resources did.
+
+        Args:
+            shard (int): Number of the shard
+            syncs (list[GroupSync]): Groups that were synced
+            actions (int): Actions that were planned
+            started (float): perf_counter() when the sync started
+            cpu_started (float): process_time() when the sync started
+
+        Returns:
+            ShardResult: Result for the run report
+        """
+        from shard_runner import ShardResult
+
+        return ShardResult(
+            shard=shard,
+            groups=[sync.group.name for sync in syncs],
+            accounts=sum(len(sync.instances) for sync in syncs),
+            actions=actions,
+            duration=perf_counter() - started,
+            cpu_time=process_time() - cpu_started,
+            retries=self.retry_policy.retries,
+            cache_hits=self.resolve_cache.hits if self.resolve_cache else 0,
+            cache_misses=self.resolve_cache.misses
+            if self.resolve_cache else 0,
+            started=self.metrics.started,
+            calls=self.metrics.snapshot())
+
+    def write_metrics(self, args: argparse.Namespace) -> None:
+        """Writes the metrics files asked for on the command line."""
+        if args.metrics_json:
+            self.metrics.write_json(args.metrics_json)
+            logger.info(f'Metrics written to "{args.metrics_json}".')
+        if args.metrics_prom:
+            self.metrics.write_prometheus(args.metrics_prom)
+            logger.info(f'Metrics written to "{args.metrics_prom}".')
+
+
+def make_syncs(groups: list[SyncGroup], resources: SharedResources,
+               state_root: Path) -> list[GroupSync]:
+    """Makes an Instance for each account in each group.
+
+    Args:
+        groups (list[SyncGroup]): Groups to sync
+        resources (SharedResources): Resources shared by the instances
+        state_root (Path): Folder for the caches and sync snapshots
+
+    Returns:
+        list[GroupSync]: One GroupSync per group
+    """
+    from group_sync import GroupSync
+
+    # Accounts on the same host share their resolved IDs.
     logger.info('Making a list of Lemmy instances.')
-    instances: list[Instance] = list()
-    for account in accounts:
-        instance = Instance(account=account)
-        instances.append(instance)
+    state_dir = state_root / 'sync_state'
+    return [GroupSync(group,
+                      [resources.make_instance(account, group.name)
+                       for account in group.accounts],
+                      state_dir / f'{group.slug}.json')
+            for group in groups]
+
+
+def close_syncs(syncs: list[GroupSync], resources: SharedResources) -> None:
+    """Closes every instance and the shared resources."""
+    for sync in syncs:
+        for instance in sync.instances:
+            instance.close()
+    resources.close()
+
+
+def write_plans(plans: dict[str, dict], path: Path) -> None:
+    """Writes the plan of every group to a JSON file.
+
+    Args:
+        plans (dict[str, dict]): Group name -> SyncPlan.to_dict()
+        path (Path): File to write
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(plans, file, indent=2)
+    logger.info(f'Plan written to "{path}".')
+
+
+def sync_once(syncs: list[GroupSync], args: argparse.Namespace,
+              full: bool = False) -> int:
+    """Reads every account, then plans and sends what each one lacks.
+
+    Accounts that are already logged in only have their site response
+    read again, so this can be called over and over.
+
+    Args:
+        syncs (list[GroupSync]): Groups to sync
+        args (argparse.Namespace): Parsed command line arguments
+        full (bool): Ignore the snapshot from the last sync
+
+    Returns:
+        int: Number of actions that were planned
+    """
+    from scheduler import schedule
+    from sync_plan import ActionBudget
+
+    # The deadline counts from the start of the run.
+    budget = ActionBudget(args.max_actions, args.deadline)
+    instances = [instance for sync in syncs for instance in sync.instances]
 
     # Login, get site response, and user settings for each instance.
     logger.info('Logging into each instance and getting site responses.')
-    for instance in instances:
-        instance.login()
-        # Poor man's rate limiting...
-        sleep(0.25)
-        instance.get_site_response()
-
-    # Establish an instance to copy user settings from since we don't know
-    # which account was updated last.
-    for instance in instances:
-        if not instance._auth_token or not instance.site_response:
-            continue
-        if instance.account.account == 'Main Account':
-            settings_to_copy = instance.get_user_settings()
-
-    # Save those user settings to each instance if we found them.
-    if settings_to_copy:
-        for instance in instances:
-            if not instance._auth_token or not instance.site_response:
-                continue
-            instance.save_user_settings(settings_to_copy)
-
-    # ---------------------------------------------------------
-    # Sync subscribed/followed communities across instances.
-    # ---------------------------------------------------------
-    # Make a combined set of subscribed communities.
-    logger.info('Making a combined set of subscriptions.')
-    combined_subscriptions: set[str] = set()
-    for instance in instances:
-        if not instance._auth_token or not instance.site_response:
-            continue
-        for community in instance.myuserinfo.follows:
-            combined_subscriptions.add(community.community.actor_id)
-
-    # Subscribe to each community on each instance.
-    for instance in instances:
-        if not instance._auth_token or not instance.site_response:
-            continue
-        for subscription in combined_subscriptions:
-            instance.subscribe_to_community(subscription)
-
-    # ---------------------------------------------------------
-    # Sync blocked communities across instances.
-    # ---------------------------------------------------------
-    # Make a combined set of blocked communities.
-    logger.info('Making a combined set of blocked communities.')
-    combined_blocked_communities: set[str] = set()
-    for instance in instances:
-        if not instance._auth_token or not instance.site_response:
-            continue
-        for community in instance.myuserinfo.community_blocks:
-            combined_blocked_communities.add(community.community.actor_id)
-
-    # Block each community on each instance.
-    for instance in instances:
-        if not instance._auth_token or not instance.site_response:
-            continue
-        for community_url in combined_blocked_communities:
-            instance.block_community(community_url)
-
-    # ---------------------------------------------------------
-    # Sync blocked users across instances.
-    # ---------------------------------------------------------
-    # Make a combined set of blocked users.
-    logger.info('Making a combined set of blocked users.')
-    combined_blocked_users: set[str] = set()
-    for instance in instances:
-        if not instance._auth_token or not instance.site_response:
-            continue
-        for user in instance.myuserinfo.person_blocks:
-            combined_blocked_users.add(user.target.actor_id)
-
-    # Block each user on each instance.
-    for instance in instances:
-        if not instance._auth_token or not instance.site_response:
-            continue
-        for user_url in combined_blocked_users:
-            instance.block_person(user_url)
+    run_concurrently(prepare_instance, instances, args.workers)
 
-    logger.info('PROGRAM COMPLETE. ACCOUNTS SYNCED.')
+    # Work out exactly what each instance is missing before sending
+    # anything.
+    logger.info('Planning what each instance needs.')
+    plans: dict[Instance, InstancePlan] = dict()
+    for sync in syncs:
+        plan = sync.plan_sync(full=full,
+                              max_removals=args.max_removals,
+                              tombstone_ttl=args.tombstone_days * 24 * 60 * 60)
+        for line in plan.summary():
+            sync.logger.info(line)
+        plans.update(sync.plans_by_instance())
+    if args.plan_output:
+        write_plans({sync.group.name: sync.plan.to_dict() for sync in syncs},
+                    args.plan_output)
+    actions = sum(plan.actions for plan in plans.values())
+
+    if args.dry_run:
+        logger.info('Dry run, not sending any changes.')
+        return actions
+
+    if actions:
+        # Blocks go first, and what doesn't fit in --max-actions waits
+        # for the next run, oldest first.
+        waiting = dict()
+        for sync in syncs:
+            waiting.update(sync.waiting())
+        plans, deferred = schedule(plans, budget, waiting)
+        if deferred:
+            logger.info(f'Sending {actions - deferred} actions, {deferred}'
+                        ' are left for the next run.')
+
+        # Each instance runs its own plan at the same time as the others.
+        logger.info('Syncing each instance.')
+        run_plans(plans, args.workers, args.queue_size, budget)
+
+        # Re-read every account once and retry only what is still missing.
+        reconcile(syncs, args.workers, args.queue_size, budget)
+    else:
+        logger.info('Nothing to sync.')
+
+    # Remember what was synced, and what is still missing, for the next
+    # run.
+    for sync in syncs:
+        sync.save_state()
+    pending = sum(len(queued) for sync in syncs
+                  for queued in sync.state.pending.values())
+    if pending:
+        logger.info(f'{pending} actions are waiting for the next run.')
+    return actions
+
+
+def run_daemon(syncs: list[GroupSync], resources: SharedResources,
+               args: argparse.Namespace) -> None:
+    """Keeps syncing every --interval seconds until stopped.
+
+    Logins, sessions and caches stay warm between runs, and each run only
+    sends what changed since the one before.
+
+    Args:
+        syncs (list[GroupSync]): Groups to sync
+        resources (SharedResources): Resources shared by the instances
+        args (argparse.Namespace): Parsed command line arguments
+    """
+    import signal
+    import threading
+
+    from daemon import StatusServer, SyncDaemon
+
+    runs = 0
+
+    def run() -> int:
+        nonlocal runs
+        runs += 1
+        # The metrics files and the lookups shared by the accounts on a
+        # host are per run, not for the whole daemon.
+        resources.metrics.reset()
+        resources.host_groups.reset()
+        actions = sync_once(syncs, args, full=args.full and runs == 1)
+        resources.write_metrics(args)
+        return actions
+
+    daemon = SyncDaemon(run, interval=args.interval, jitter=args.jitter)
+    status_server = None
+    if args.status_port is not None:
+        status_server = StatusServer(daemon, args.status_port).start()
+        logger.info(f'Status at http://127.0.0.1:{status_server.port}'
+                    '/status')
+
+    # Finish the current run and exit cleanly on Ctrl+C or SIGTERM.
+    def stop(signum, _frame) -> None:
+        logger.info(f'Got signal {signum}, stopping after this run.')
+        daemon.stop()
+
+    handlers = dict()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            handlers[signum] = signal.signal(signum, stop)
+    logger.info(f'Syncing every {args.interval:.0f} seconds.')
+    try:
+        daemon.run(max_runs=args.max_runs)
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+        if status_server:
+            status_server.stop()
+
+
+def transfer_snapshots(syncs: list[GroupSync],
+                       args: argparse.Namespace) -> None:
+    """Exports every account to snapshot files or imports one into some.
 
-    # TODO - Get a site response again, compare against combined lists
-    # and try failed things again.
+    Args:
+        syncs (list[GroupSync]): Groups with the accounts
+        args (argparse.Namespace): Parsed command line arguments
+    """
+    from snapshot_file import SnapshotError, export_snapshot, import_snapshot
+    from sync_plan import SyncPlan
+
+    instances = [instance for sync in syncs for instance in sync.instances
+                 if not args.to or instance.account.account in args.to]
+    if args.to and not instances:
+        logger.error(f'No accounts called {", ".join(args.to)}.')
+        return
+    run_concurrently(prepare_instance, instances, args.workers)
+
+    if args.export:
+        args.export.mkdir(parents=True, exist_ok=True)
+        for sync in syncs:
+            for instance in sync.ready_instances:
+                if instance not in instances:
+                    continue
+                name = slugify(instance.account.account)
+                path = args.export / f'{sync.group.slug}-{name}.jsonl.gz'
+                entries = export_snapshot(instance, path)
+                instance.logger.info(f'Exported {entries} follows and'
+                                     f' blocks to "{path}".')
+        return
+
+    def apply(instance: Instance) -> None:
+        try:
+            plan = import_snapshot(instance, args.import_file,
+                                   args.queue_size, dry_run=args.dry_run)
+        except SnapshotError as error:
+            instance.logger.error(str(error))
+            return
+        for line in SyncPlan([plan]).summary():
+            instance.logger.info(line)
+
+    run_concurrently(apply, [instance for instance in instances
+                             if instance.is_ready], args.workers)
+
+
+def sync_shard(shard: int, groups: list[SyncGroup], args: argparse.Namespace,
+               state_root: Path) -> ShardResult:
+    """Syncs one shard's groups. Runs in its own process.
+
+    Args:
+        shard (int): Number of the shard
+        groups (list[SyncGroup]): Groups in the shard
+        args (argparse.Namespace): Parsed command line arguments
+        state_root (Path): Folder for the caches and sync snapshots
+
+    Returns:
+        ShardResult: What the shard did
+    """
+    # Worker processes don't run atexit, so logging is set up and shut
+    # down around every shard.
+    setup_logging(console_level=args.log_level,
+                  file_level=args.log_file_level,
+                  log_file=args.log_file or None)
+    try:
+        started, cpu_started = perf_counter(), process_time()
+        logger.info(f'Shard {shard} syncing {len(groups)} groups.')
+        resources = SharedResources(args, state_root)
+        syncs = make_syncs(groups, resources, state_root)
+        # The plans of every shard go into one file, written once all of
+        # them are done.
+        shard_args = argparse.Namespace(**{**vars(args),
+                                           'plan_output': None})
+        try:
+            actions = sync_once(syncs, shard_args, full=args.full)
+        finally:
+            close_syncs(syncs, resources)
+        result = resources.shard_result(shard, syncs, actions, started,
+                                        cpu_started)
+        if args.plan_output:
+            result.plans = {sync.group.name: sync.plan.to_dict()
+                            for sync in syncs}
+        return result
+    finally:
+        shutdown_logging()
+
+
+def run_sharded(groups: list[SyncGroup], args: argparse.Namespace,
+                state_root: Path) -> None:
+    """Syncs the groups in --shards processes and merges their results.
+
+    Args:
+        groups (list[SyncGroup]): Groups to sync
+        args (argparse.Namespace): Parsed command line arguments
+        state_root (Path): Folder for the caches and sync snapshots
+    """
+    from functools import partial
+
+    from shard_runner import RunReport, run_shards, split_groups
+
+    shards = split_groups(groups, args.shards)
+    logger.info(f'Splitting {len(groups)} groups between {len(shards)}'
+                ' processes.')
+    started = perf_counter()
+    results = run_shards(partial(sync_shard, args=args,
+                                 state_root=state_root), shards)
+    report = RunReport(results, perf_counter() - started)
+
+    for line in report.summary():
+        logger.info(line)
+    for shard in report.failed:
+        logger.error(f'Shard {shard} failed, its groups were not synced.')
+    logger.info('Where the time went:')
+    for line in report.metrics.summary():
+        logger.info(line)
+    write_report(report, args)
+
+
+def write_report(report: RunReport, args: argparse.Namespace) -> None:
+    """Writes the report and metrics files asked for on the command line."""
+    if args.report:
+        report.write(args.report)
+        logger.info(f'Report written to "{args.report}".')
+    if args.plan_output:
+        write_plans(report.plans, args.plan_output)
+    if args.metrics_json:
+        report.metrics.write_json(args.metrics_json)
+        logger.info(f'Metrics written to "{args.metrics_json}".')
+    if args.metrics_prom:
+        report.metrics.write_prometheus(args.metrics_prom)
+        logger.info(f'Metrics written to "{args.metrics_prom}".')
+
+
+def main(argv: list[str] | None = None):
+    """Main code to do the account syncing.
+
+    Args:
+        argv (list[str] | None): Command line arguments, defaults to sys.argv
+    """
+    args = parse_args(argv)
+    setup_logging(console_level=args.log_level,
+                  file_level=args.log_file_level,
+                  log_file=args.log_file or None)
+    groups = load_config(args.config)
+
+    state_root = args.state_dir
+    if not state_root:
+        state_root = Path(os.path.dirname(__file__))
+    state_root.mkdir(parents=True, exist_ok=True)
+
+    if args.shards > 1:
+        run_sharded(groups, args, state_root)
+        logger.info('PROGRAM COMPLETE. ACCOUNTS SYNCED.')
+        return
+
+    resources = SharedResources(args, state_root)
+    syncs = make_syncs(groups, resources, state_root)
+
+    result = None
+    if args.export or args.import_file:
+        transfer_snapshots(syncs, args)
+    elif args.daemon:
+        run_daemon(syncs, resources, args)
+    else:
+        started, cpu_started = perf_counter(), process_time()
+        actions = sync_once(syncs, args, full=args.full)
+        result = resources.shard_result(0, syncs, actions, started,
+                                        cpu_started)
+
+    close_syncs(syncs, resources)
+    resources.log_stats()
+    resources.write_metrics(args)
+    if result and args.report:
+        from shard_runner import RunReport
+
+        RunReport([result], result.duration).write(args.report)
+        logger.info(f'Report written to "{args.report}".')
+    logger.info('PROGRAM COMPLETE. ACCOUNTS SYNCED.')
 
 
 if __name__ == "__main__":
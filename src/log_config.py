@@ -1,34 +1,124 @@
-"""Configures a logger for console and file logging."""
+"""Configures logging for console and file output.
+
+Every logger made here is a child of one "lemmy_sync" logger that only
+puts records on a queue. A single background listener writes them to the
+console and the log file, so slow terminals or disks never hold up the
+threads talking to the instances, and the log file is only opened once.
+"""
+import atexit
 import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+ROOT_LOGGER = 'lemmy_sync'
+CONSOLE_FORMAT = ('[%(asctime)s] %(levelname)-8s: %(account)s%(context)s:'
+                  ' %(message)s')
+FILE_FORMAT = ('[%(asctime)s] %(levelname)-8s: %(account)s%(context)s:'
+               ' %(threadName)s: %(message)s')
+
+_listener: QueueListener | None = None
+_setup_lock = threading.RLock()
+
+
+class _AccountFilter(logging.Filter):
+    """Makes sure every record has an account and context for the
+    formatters."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'account'):
+            record.account = record.name.removeprefix(f'{ROOT_LOGGER}.')
+        if not hasattr(record, 'context'):
+            record.context = ''
+        return True
+
+
+def setup_logging(console_level: str = 'DEBUG', file_level: str = 'DEBUG',
+                  log_file: Path | str | None = 'logging.log') -> None:
+    """Sets up the queue and the listener that writes the records.
+
+    Calling it again replaces the handlers instead of adding more, so it
+    can be used to change the levels or the log file.
+
+    Args:
+        console_level (str): Lowest level shown on the console
+        file_level (str): Lowest level written to the log file
+        log_file (Path | str | None): Log file, None for no file
+    """
+    global _listener
+    with _setup_lock:
+        if _listener:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+
+        console = logging.StreamHandler()
+        console.setLevel(console_level)
+        console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers: list[logging.Handler] = [console]
+        if log_file:
+            # The file isn't opened until the first record is written.
+            file_handler = logging.FileHandler(log_file, delay=True)
+            file_handler.setLevel(file_level)
+            file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+            handlers.append(file_handler)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(_AccountFilter())
+        root.addHandler(queue_handler)
+        root.setLevel(min(handler.level for handler in handlers))
+
+        _listener = QueueListener(log_queue, *handlers,
+                                  respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Writes out every queued record and stops the listener."""
+    global _listener
+    with _setup_lock:
+        if _listener:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+            logging.getLogger(ROOT_LOGGER).handlers.clear()
+
+
+atexit.register(shutdown_logging)
+
+
+def configure_logging(logger_name: str = 'default',
+                      **context) -> logging.LoggerAdapter:
+    """Gets a logger for part of the program, e.g. one account.
 
+    Logging is set up with the defaults the first time. Calling this again
+    for the same name doesn't add any handlers.
 
-def configure_logging(logger_name: str = 'default'):
-    """Sets up some basic logging for debugging and console output.
+    Account names are only unique within a group, so the context, e.g. the
+    group and host, is shown after the name on every line.
 
     Args:
-        logger_name (str): Name for the logger
+        logger_name (str): Name for the logger, usually the account name
+        **context: Extra fields added to every record, e.g. group and host
 
     Returns:
-        Logger: Logger to use for logging
+        LoggerAdapter: Logger to use for logging
     """
-    logger = logging.getLogger(logger_name)
-    logger.setLevel('DEBUG')
-
-    # Create handlers
-    c_handler = logging.StreamHandler()
-    f_handler = logging.FileHandler('logging.log')
-    c_handler.setLevel('DEBUG')
-    f_handler.setLevel('DEBUG')
-
-    # Create formatters and add it to the handlers
-    c_formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)-8s: %(message)s')
-    f_formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)-8s: %(name)s: %(message)s')
-    c_handler.setFormatter(c_formatter)
-    f_handler.setFormatter(f_formatter)
-
-    # Add handlers to the logger
-    logger.addHandler(c_handler)
-    logger.addHandler(f_handler)
-    return logger
+    with _setup_lock:
+        if _listener is None:
+            setup_logging()
+    if logger_name == ROOT_LOGGER:
+        logger = logging.getLogger(ROOT_LOGGER)
+    else:
+        logger = logging.getLogger(f'{ROOT_LOGGER}.{logger_name}')
+    label = ' '.join(f'{key}={value}' for key, value in context.items()
+                     if value)
+    return logging.LoggerAdapter(logger,
+                                 {'account': logger_name, **context,
+                                  'context': f' [{label}]' if label else ''})
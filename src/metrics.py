@@ -0,0 +1,251 @@
+"""Timing and size metrics for every API call made during a run."""
+import json
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import time
+
+# Upper bounds in seconds of the latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                   math.inf)
+
+
+@dataclass
+class CallStats:
+    """Totals for one endpoint on one host."""
+    count: int = 0
+    errors: int = 0
+    retries: int = 0
+    bytes: int = 0
+    latency: float = 0.0
+    max_latency: float = 0.0
+    rate_limit_wait: float = 0.0
+    statuses: dict[str, int] = field(default_factory=dict)
+    buckets: list[int] = field(
+        default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+
+    def quantile(self, q: float) -> float:
+        """Approximate latency quantile from the histogram.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float: Upper bound of the bucket the quantile falls in
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_latency)
+        return self.max_latency
+
+    def to_dict(self) -> dict:
+        """Summary of the stats for the JSON export."""
+        return {'count': self.count,
+                'errors': self.errors,
+                'retries': self.retries,
+                'bytes': self.bytes,
+                'statuses': dict(self.statuses),
+                'rate_limit_wait': round(self.rate_limit_wait, 4),
+                'latency': {
+                    'total': round(self.latency, 4),
+                    'mean': round(self.latency / self.count, 4)
+                    if self.count else 0.0,
+                    'p50': round(self.quantile(0.5), 4),
+                    'p95': round(self.quantile(0.95), 4),
+                    'max': round(self.max_latency, 4)}}
+
+
+class Metrics:
+    """Thread safe collector of per host and endpoint call stats."""
+
+    def __init__(self) -> None:
+        self.started = time()
+        self._calls: dict[tuple[str, str], CallStats] = dict()
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Drops the stats so far and starts counting a new run."""
+        with self._lock:
+            self.started = time()
+            self._calls = dict()
+
+    def record(self, host: str, endpoint: str, status: int | None,
+               latency: float, retries: int = 0, size: int = 0,
+               rate_limit_wait: float = 0.0) -> None:
+        """Records one API call, including all of its retries.
+
+        Args:
+            host (str): Host the call was sent to
+            endpoint (str): API endpoint that was called
+            status (int | None): Final HTTP status, None if there was no
+                response
+            latency (float): Seconds from the first attempt to the answer
+            retries (int): Attempts after the first one
+            size (int): Bytes in the response body
+            rate_limit_wait (float): Seconds spent waiting for the rate
+                limiter
+        """
+        status_key = str(status) if status is not None else 'error'
+        with self._lock:
+            stats = self._calls.setdefault((host, endpoint), CallStats())
+            stats.count += 1
+            if status is None or status >= 400:
+                stats.errors += 1
+            stats.retries += retries
+            stats.bytes += size
+            stats.latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            stats.rate_limit_wait += rate_limit_wait
+            stats.statuses[status_key] = stats.statuses.get(status_key, 0) + 1
+            for number, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats.buckets[number] += 1
+                    break
+
+    def snapshot(self) -> dict[tuple[str, str], CallStats]:
+        """Copy of the stats so far, keyed by (host, endpoint)."""
+        with self._lock:
+            return {key: CallStats(**{**vars(stats),
+                                      'statuses': dict(stats.statuses),
+                                      'buckets': list(stats.buckets)})
+                    for key, stats in self._calls.items()}
+
+    def merge(self, calls: dict[tuple[str, str], CallStats],
+              started: float | None = None) -> None:
+        """Adds the stats of another collector, e.g. from a shard process.
+
+        Args:
+            calls (dict[tuple[str, str], CallStats]): Stats from the other
+                collector's snapshot
+            started (float | None): When the other collector started
+        """
+        with self._lock:
+            if started is not None:
+                self.started = min(self.started, started)
+            for key, other in calls.items():
+                stats = self._calls.setdefault(key, CallStats())
+                stats.count += other.count
+                stats.errors += other.errors
+                stats.retries += other.retries
+                stats.bytes += other.bytes
+                stats.latency += other.latency
+                stats.max_latency = max(stats.max_latency, other.max_latency)
+                stats.rate_limit_wait += other.rate_limit_wait
+                for status, count in other.statuses.items():
+                    stats.statuses[status] = (stats.statuses.get(status, 0)
+                                              + count)
+                stats.buckets = [mine + theirs for mine, theirs
+                                 in zip(stats.buckets, other.buckets)]
+
+    def to_dict(self) -> dict:
+        """Summary of the run for the JSON export."""
+        calls = self.snapshot()
+        return {'started': self.started,
+                'duration': round(time() - self.started, 4),
+                'calls': [{'host': host, 'endpoint': endpoint,
+                           **stats.to_dict()}
+                          for (host, endpoint), stats
+                          in sorted(calls.items())]}
+
+    def summary(self, limit: int = 5) -> list[str]:
+        """Lines for the log with the endpoints that took the most time.
+
+        Args:
+            limit (int): Maximum number of endpoints to list
+
+        Returns:
+            list[str]: One line per endpoint
+        """
+        calls = sorted(self.snapshot().items(),
+                       key=lambda item: item[1].latency, reverse=True)
+        return [f'{host} {endpoint}: {stats.count} calls,'
+                f' {stats.latency:.1f}s total,'
+                f' p95 {stats.quantile(0.95):.2f}s, {stats.retries} retries,'
+                f' {stats.errors} errors'
+                for (host, endpoint), stats in calls[:limit]]
+
+    def to_prometheus(self) -> str:
+        """Stats in the Prometheus text exposition format."""
+        lines = [
+            '# HELP lemmy_sync_requests_total API calls by final status.',
+            '# TYPE lemmy_sync_requests_total counter']
+        calls = sorted(self.snapshot().items())
+        for (host, endpoint), stats in calls:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'lemmy_sync_requests_total{{'
+                             f'{_labels(host, endpoint)},status="{status}"}}'
+                             f' {count}')
+
+        for name, kind, help_text, value in (
+                ('retries_total', 'counter', 'Retried attempts.',
+                 lambda stats: stats.retries),
+                ('response_bytes_total', 'counter', 'Response body bytes.',
+                 lambda stats: stats.bytes),
+                ('rate_limit_wait_seconds_total', 'counter',
+                 'Seconds spent waiting for the rate limiter.',
+                 lambda stats: stats.rate_limit_wait)):
+            lines.append(f'# HELP lemmy_sync_{name} {help_text}')
+            lines.append(f'# TYPE lemmy_sync_{name} {kind}')
+            for (host, endpoint), stats in calls:
+                lines.append(f'lemmy_sync_{name}{{'
+                             f'{_labels(host, endpoint)}}} {value(stats)}')
+
+        lines.append('# HELP lemmy_sync_request_duration_seconds API call'
+                     ' latency including retries.')
+        lines.append('# TYPE lemmy_sync_request_duration_seconds histogram')
+        for (host, endpoint), stats in calls:
+            labels = _labels(host, endpoint)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                upper = '+Inf' if bound == math.inf else bound
+                lines.append(f'lemmy_sync_request_duration_seconds_bucket{{'
+                             f'{labels},le="{upper}"}} {cumulative}')
+            lines.append(f'lemmy_sync_request_duration_seconds_sum{{'
+                         f'{labels}}} {stats.latency}')
+            lines.append(f'lemmy_sync_request_duration_seconds_count{{'
+                         f'{labels}}} {stats.count}')
+
+        lines.append('# HELP lemmy_sync_last_run_timestamp_seconds When the'
+                     ' run started.')
+        lines.append('# TYPE lemmy_sync_last_run_timestamp_seconds gauge')
+        lines.append(f'lemmy_sync_last_run_timestamp_seconds {self.started}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: Path) -> None:
+        """Writes the JSON summary.
+
+        Args:
+            path (Path): File to write
+        """
+        _write_atomic(path, json.dumps(self.to_dict(), indent=2))
+
+    def write_prometheus(self, path: Path) -> None:
+        """Writes a textfile for the node_exporter textfile collector.
+
+        Args:
+            path (Path): File to write, should end in ".prom"
+        """
+        _write_atomic(path, self.to_prometheus())
+
+
+def _labels(host: str, endpoint: str) -> str:
+    host = host.replace('\\', '\\\\').replace('"', '\\"')
+    endpoint = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+    return f'host="{host}",endpoint="{endpoint}"'
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # Collectors may read the file at any time, so never let them see a
+    # half written one.
+    temp_path = Path(path).with_name(f'{Path(path).name}.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_path, path)
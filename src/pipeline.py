@@ -0,0 +1,65 @@
+"""Two stage resolve -> action pipeline for a single instance."""
+import queue
+import threading
+from typing import Callable, Iterable
+
+# Put on the queue once the resolve stage has nothing left.
+_DONE = object()
+
+
+def run_pipeline(items: Iterable[str],
+                 resolve: Callable[[str], int | None],
+                 act: Callable[[str, int], bool],
+                 queue_size: int = 16) -> dict[str, bool]:
+    """Resolves items in one thread while acting on them in another.
+
+    The resolve stage works ahead of the action stage through a bounded
+    queue, so resolving item n+1 overlaps with the action for item n
+    without resolving everything up front.
+
+    Args:
+        items (Iterable[str]): URLs to resolve and act on, in order
+        resolve (Callable[[str], int | None]): Turns a URL into a local ID
+        act (Callable[[str, int], bool]): Sends the action for a local ID
+        queue_size (int): Resolved items allowed to wait for the action stage
+
+    Returns:
+        dict[str, bool]: Result of the action for each item. Items that
+            didn't resolve are False.
+    """
+    resolved: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        # Keep checking for a stop so a failed action stage can't leave
+        # this thread blocked on a full queue.
+        while not stop.is_set():
+            try:
+                resolved.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def resolve_stage() -> None:
+        try:
+            for item in items:
+                if not put((item, resolve(item))):
+                    return
+        finally:
+            put(_DONE)
+
+    resolver = threading.Thread(target=resolve_stage, daemon=True,
+                                name=f'{threading.current_thread().name}'
+                                     '-resolve')
+    resolver.start()
+
+    results: dict[str, bool] = dict()
+    try:
+        while (entry := resolved.get()) is not _DONE:
+            item, local_id = entry
+            results[item] = act(item, local_id) if local_id else False
+    finally:
+        stop.set()
+        resolver.join()
+    return results
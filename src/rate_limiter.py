@@ -0,0 +1,220 @@
+"""Per-host token bucket rate limiting for Lemmy API calls."""
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from time import monotonic, sleep, time
+
+
+@dataclass
+class RateLimitOptions:
+    """Options for the per-host token buckets."""
+    rate: float = 4.0
+    burst: int = 8
+    default_retry_after: float = 5.0
+    # SQLite file to share the buckets with other processes, e.g. shards.
+    shared_path: Path | None = None
+
+
+class TokenBucket:
+    """Thread safe token bucket.
+
+    Tokens refill at `rate` per second up to `burst`. Every request takes
+    one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Takes a token, waiting until one is available.
+
+        Returns:
+            float: Seconds spent waiting for the token
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Stops handing out tokens for a while, e.g. after a HTTP 429.
+
+        Args:
+            seconds (float): How long to hold off sending requests
+        """
+        with self._lock:
+            now = monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = now
+
+
+class SharedTokenBucket:
+    """Token bucket kept in a SQLite file so several processes share it.
+
+    Works like TokenBucket, but the tokens of every host live in one table
+    and each take is its own write transaction. The file uses WAL so the
+    processes don't block each other's reads. Wall clock time is used
+    because monotonic clocks aren't comparable between processes.
+    """
+
+    def __init__(self, path: Path | str, host: str, rate: float,
+                 burst: int) -> None:
+        self.path = path
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30,
+                                           check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            ' host TEXT PRIMARY KEY,'
+            ' tokens REAL NOT NULL,'
+            ' updated REAL NOT NULL,'
+            ' paused_until REAL NOT NULL)')
+
+    def _update(self, take: bool, pause: float = 0.0) -> float:
+        """Refills the bucket and takes a token or pauses it, atomically.
+
+        Args:
+            take (bool): Take a token if one is available
+            pause (float): Seconds to stop handing out tokens for
+
+        Returns:
+            float: Seconds to wait before trying again, 0 if a token was
+                taken
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                now = time()
+                row = self._connection.execute(
+                    'SELECT tokens, updated, paused_until FROM buckets'
+                    ' WHERE host = ?', (self.host,)).fetchone()
+                tokens, updated, paused_until = row or (self.burst, now, 0.0)
+                tokens = min(self.burst,
+                             tokens + max(0.0, now - updated) * self.rate)
+                wait = 0.0
+                if pause:
+                    paused_until = max(paused_until, now + pause)
+                    tokens = 0.0
+                elif now < paused_until:
+                    wait = paused_until - now
+                elif tokens >= 1:
+                    if take:
+                        tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO buckets'
+                    ' (host, tokens, updated, paused_until)'
+                    ' VALUES (?, ?, ?, ?)',
+                    (self.host, tokens, now, paused_until))
+                self._connection.execute('COMMIT')
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+        return wait
+
+    def acquire(self) -> float:
+        """Takes a token, waiting until one is available.
+
+        Returns:
+            float: Seconds spent waiting for the token
+        """
+        waited = 0.0
+        while True:
+            wait = self._update(take=True)
+            if not wait:
+                return waited
+            sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Stops handing out tokens for a while, e.g. after a HTTP 429.
+
+        Args:
+            seconds (float): How long to hold off sending requests
+        """
+        self._update(take=False, pause=seconds)
+
+
+_buckets: dict[tuple[str, float, int, Path | None],
+               TokenBucket | SharedTokenBucket] = dict()
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host: str, options: RateLimitOptions
+               ) -> TokenBucket | SharedTokenBucket:
+    """Gets the token bucket for a host, making it if needed.
+
+    All accounts on the same host with the same rate and burst share one
+    bucket. With a shared_path the bucket is also shared with every other
+    process using that file.
+
+    Args:
+        host (str): Host name of the instance
+        options (RateLimitOptions): Rate and burst of the bucket
+
+    Returns:
+        TokenBucket | SharedTokenBucket: Shared bucket for the host
+    """
+    key = (host, options.rate, options.burst, options.shared_path)
+    with _buckets_lock:
+        if key not in _buckets:
+            if options.shared_path:
+                _buckets[key] = SharedTokenBucket(
+                    options.shared_path, host, options.rate, options.burst)
+            else:
+                _buckets[key] = TokenBucket(options.rate, options.burst)
+        return _buckets[key]
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses a Retry-After header into seconds.
+
+    Args:
+        value (str | None): Header value, either seconds or a HTTP date
+
+    Returns:
+        float | None: Seconds to wait, or None if it couldn't be parsed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,134 @@
+"""On disk cache for resolve_object results."""
+import sqlite3
+import threading
+from pathlib import Path
+from time import time
+
+
+class ResolveCache:
+    """Caches (instance host, actor_id) -> local ID in a SQLite file.
+
+    The ID an instance gives a community or person doesn't change, so
+    later runs can skip /resolve_object for anything resolved before.
+    Entries older than ttl seconds are treated as missing and the oldest
+    entries are dropped once there are more than max_entries.
+
+    The file uses WAL, so several processes can read and write it at the
+    same time. The entry count is only this process's view of it, so the
+    size limit is checked loosely when other processes add entries too.
+    """
+
+    def __init__(self, path: Path | str, ttl: float = 30 * 24 * 60 * 60,
+                 max_entries: int = 100_000) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30,
+                                           check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS resolved ('
+            ' host TEXT NOT NULL,'
+            ' actor_id TEXT NOT NULL,'
+            ' local_id INTEGER NOT NULL,'
+            ' resolved_at REAL NOT NULL,'
+            ' PRIMARY KEY (host, actor_id))')
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS resolved_age'
+            ' ON resolved (resolved_at)')
+        self._entries = self._connection.execute(
+            'SELECT COUNT(*) FROM resolved').fetchone()[0]
+
+    def get(self, host: str, actor_id: str) -> int | None:
+        """Gets a cached local ID.
+
+        Args:
+            host (str): Host of the instance the ID belongs to
+            actor_id (str): Actor ID of the community or person
+
+        Returns:
+            int | None: Local ID if cached and not expired, otherwise None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT local_id, resolved_at FROM resolved'
+                ' WHERE host = ? AND actor_id = ?',
+                (host, actor_id)).fetchone()
+            if row and time() - row[1] <= self.ttl:
+                self.hits += 1
+                return row[0]
+            if row:
+                self._connection.execute(
+                    'DELETE FROM resolved WHERE host = ? AND actor_id = ?',
+                    (host, actor_id))
+                self._entries -= 1
+            self.misses += 1
+            return None
+
+    def set(self, host: str, actor_id: str, local_id: int) -> None:
+        """Stores a resolved local ID.
+
+        Args:
+            host (str): Host of the instance the ID belongs to
+            actor_id (str): Actor ID of the community or person
+            local_id (int): ID the instance gave it
+        """
+        with self._lock:
+            existed = self._connection.execute(
+                'SELECT 1 FROM resolved WHERE host = ? AND actor_id = ?',
+                (host, actor_id)).fetchone()
+            self._connection.execute(
+                'INSERT OR REPLACE INTO resolved'
+                ' (host, actor_id, local_id, resolved_at)'
+                ' VALUES (?, ?, ?, ?)',
+                (host, actor_id, local_id, time()))
+            if not existed:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._evict()
+
+    def remove(self, host: str, actor_id: str) -> None:
+        """Drops a local ID, e.g. one the instance no longer accepts.
+
+        Args:
+            host (str): Host of the instance the ID belongs to
+            actor_id (str): Actor ID of the community or person
+        """
+        with self._lock:
+            removed = self._connection.execute(
+                'DELETE FROM resolved WHERE host = ? AND actor_id = ?',
+                (host, actor_id)).rowcount
+            self._entries -= removed
+
+    def _evict(self) -> None:
+        """Drops expired entries, then the oldest down to 90% of max."""
+        self._connection.execute('DELETE FROM resolved WHERE resolved_at < ?',
+                                 (time() - self.ttl,))
+        keep = int(self.max_entries * 0.9)
+        self._connection.execute(
+            'DELETE FROM resolved WHERE rowid IN ('
+            ' SELECT rowid FROM resolved ORDER BY resolved_at DESC'
+            ' LIMIT -1 OFFSET ?)', (keep,))
+        self._entries = self._connection.execute(
+            'SELECT COUNT(*) FROM resolved').fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def stats(self) -> str:
+        """Short summary of cache hits and misses for the log."""
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f'{self.hits} hits, {self.misses} misses'
+                f' ({rate:.0f}% hit rate), {self._entries} entries')
+
+    def close(self) -> None:
+        """Closes the database."""
+        with self._lock:
+            self._connection.close()
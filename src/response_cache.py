@@ -0,0 +1,104 @@
+"""Remembers how to re-validate read responses instead of parsing them again.
+
+Lemmy instances behind a cache or a proxy may send an ETag, Last-Modified
+or Cache-Control header with /site. When they do, the next read is sent as
+a conditional request, or skipped while the response is still fresh. When
+they don't, a hash of the part of the response that's used shows whether
+it changed, so it doesn't have to be parsed again.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from time import time
+from typing import Mapping
+
+
+def content_hash(data) -> str:
+    """Hash of a JSON value that doesn't depend on the key order.
+
+    Args:
+        data: Parsed JSON value
+
+    Returns:
+        str: Hex digest
+    """
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    """Parses a Cache-Control header into its directives.
+
+    Args:
+        value (str | None): Header value, e.g. "private, max-age=60"
+
+    Returns:
+        dict[str, str | None]: Lower case directive -> value, None for
+            directives without one
+    """
+    directives: dict[str, str | None] = dict()
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+@dataclass
+class CachedResponse:
+    """Validators and freshness of one response."""
+    etag: str | None = None
+    last_modified: str | None = None
+    fresh_until: float = 0.0
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str]
+                     ) -> 'CachedResponse | None':
+        """Reads the caching headers of a response.
+
+        Args:
+            headers (Mapping[str, str]): Response headers
+
+        Returns:
+            CachedResponse | None: None if the server said not to store it
+        """
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        if 'no-store' in directives:
+            return None
+        cached = cls(etag=headers.get('ETag'),
+                     last_modified=headers.get('Last-Modified'))
+        cached.update_freshness(headers)
+        return cached
+
+    def update_freshness(self, headers: Mapping[str, str]) -> None:
+        """Works out how long the response can be used without asking.
+
+        Args:
+            headers (Mapping[str, str]): Headers of the response or of a
+                HTTP 304 that re-validated it
+        """
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        self.fresh_until = 0.0
+        if 'no-cache' in directives or 'must-revalidate' in directives:
+            return
+        try:
+            max_age = float(directives.get('max-age') or 0)
+            age = float(headers.get('Age') or 0)
+        except ValueError:
+            return
+        if max_age > age:
+            self.fresh_until = time() + max_age - age
+
+    @property
+    def is_fresh(self) -> bool:
+        """True while the response can be used without asking the server."""
+        return time() < self.fresh_until
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Headers that turn the next request into a conditional one."""
+        headers = dict()
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
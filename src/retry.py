@@ -0,0 +1,66 @@
+"""Retries with jittered exponential backoff and a shared retry budget."""
+import random
+import threading
+from dataclasses import dataclass
+
+# Responses worth trying again. Anything else is a real answer.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class RetryOptions:
+    """Options for retrying failed requests."""
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    budget: int = 200
+
+
+class RetryPolicy:
+    """Decides when to retry and how long to wait first.
+
+    One policy is shared by every instance in a run, so the budget caps the
+    total number of retries and a dead instance can't keep the run going
+    forever.
+    """
+
+    def __init__(self, options: RetryOptions | None = None) -> None:
+        self.options = options if options else RetryOptions()
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    @property
+    def budget_left(self) -> int:
+        """Retries left before the budget runs out."""
+        with self._lock:
+            return max(0, self.options.budget - self.retries)
+
+    def should_retry(self, attempt: int) -> bool:
+        """Checks if another attempt is allowed and takes it from the budget.
+
+        Args:
+            attempt (int): Number of attempts made so far, starting at 1
+
+        Returns:
+            bool: True if the request should be sent again
+        """
+        if attempt >= self.options.max_attempts:
+            return False
+        with self._lock:
+            if self.retries >= self.options.budget:
+                return False
+            self.retries += 1
+            return True
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before the next attempt, with full jitter.
+
+        Args:
+            attempt (int): Number of attempts made so far, starting at 1
+
+        Returns:
+            float: Random delay up to the exponential backoff cap
+        """
+        cap = min(self.options.max_delay,
+                  self.options.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, cap)
@@ -0,0 +1,90 @@
+"""Picks which planned actions are sent when a run can't send them all.
+
+With --max-actions only part of a big backlog, e.g. after adding a new
+account, is sent per run. The actions are picked in PRIORITY order across
+every instance, and within the same priority the ones that have waited
+longest go first. Whatever is left over is remembered in the group's state
+file so it goes first the next time.
+"""
+from dataclasses import replace
+from math import inf
+
+from instance import Instance
+from sync_plan import PRIORITY, SETTINGS, ActionBudget, InstancePlan
+
+
+def action_key(name: str, url: str | None = None) -> str:
+    """Key of one action in the pending queue.
+
+    Args:
+        name (str): InstancePlan field of the action, e.g. "follows"
+        url (str | None): Actor ID the action is for, None for settings
+
+    Returns:
+        str: Key for the action
+    """
+    return name if url is None else f'{name} {url}'
+
+
+def plan_actions(plan: InstancePlan) -> list[tuple[str, str | None]]:
+    """Every action in a plan as (field, URL) in PRIORITY order.
+
+    Args:
+        plan (InstancePlan): Plan for one instance
+
+    Returns:
+        list[tuple[str, str | None]]: Actions, settings have no URL
+    """
+    actions: list[tuple[str, str | None]] = list()
+    for name in PRIORITY:
+        if name == SETTINGS:
+            if plan.settings:
+                actions.append((name, None))
+        else:
+            actions.extend((name, url) for url in getattr(plan, name))
+    return actions
+
+
+def schedule(plans: dict[Instance, InstancePlan], budget: ActionBudget,
+             waiting: dict[Instance, dict[str, float]] | None = None
+             ) -> tuple[dict[Instance, InstancePlan], int]:
+    """Trims the plans to what fits in the budget's remaining actions.
+
+    Args:
+        plans (dict[Instance, InstancePlan]): Plan for each instance
+        budget (ActionBudget): Budget of the run
+        waiting (dict[Instance, dict[str, float]] | None): Pending queue
+            of each instance, action key -> when it was first left over
+
+    Returns:
+        tuple[dict[Instance, InstancePlan], int]: Plans to send this run
+            and the number of actions left for the next one
+    """
+    total = sum(plan.actions for plan in plans.values())
+    if budget.remaining is None or total <= budget.remaining:
+        return plans, 0
+
+    waiting = waiting if waiting else dict()
+    candidates = list()
+    for number, (instance, plan) in enumerate(plans.items()):
+        queued = waiting.get(instance, {})
+        ranks: dict[str, int] = dict()
+        for name, url in plan_actions(plan):
+            # Taking one action per instance at a time keeps a single big
+            # backlog from using the whole budget.
+            rank = ranks[name] = ranks.get(name, -1) + 1
+            candidates.append(((PRIORITY.index(name),
+                                queued.get(action_key(name, url), inf),
+                                rank, number), instance, name, url))
+    candidates.sort(key=lambda candidate: candidate[0])
+
+    chosen = {instance: replace(plan, settings={},
+                                **{name: [] for name in PRIORITY
+                                   if name != SETTINGS})
+              for instance, plan in plans.items()}
+    for _order, instance, name, url in candidates[:budget.remaining]:
+        if name == SETTINGS:
+            chosen[instance].settings = plans[instance].settings
+        else:
+            getattr(chosen[instance], name).append(url)
+    return chosen, total - min(total, budget.remaining)
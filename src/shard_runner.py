@@ -0,0 +1,185 @@
+"""Runs sync groups in several processes and merges what they did.
+
+A single process spends most of its time parsing JSON and doing TLS once
+there are hundreds of accounts, so a big fleet can be split into shards
+that each run in their own process. Whole groups go to one shard because
+planning needs every account of a group. The shards share the per-host
+rate limits and the resolve cache through SQLite files.
+"""
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from metrics import CallStats, Metrics
+from sync_config import SyncGroup
+
+
+@dataclass
+class ShardResult:
+    """What one shard did."""
+    shard: int
+    groups: list[str]
+    accounts: int
+    actions: int = 0
+    duration: float = 0.0
+    cpu_time: float = 0.0
+    retries: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    started: float | None = None
+    calls: dict[tuple[str, str], CallStats] = field(default_factory=dict)
+    plans: dict[str, dict] = field(default_factory=dict)
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        """Summary of the shard for the run report."""
+        return {'shard': self.shard,
+                'groups': self.groups,
+                'accounts': self.accounts,
+                'actions': self.actions,
+                'duration': round(self.duration, 4),
+                'cpu_time': round(self.cpu_time, 4),
+                'retries': self.retries,
+                'api_calls': sum(stats.count
+                                 for stats in self.calls.values()),
+                'error': self.error}
+
+
+def split_groups(groups: list[SyncGroup],
+                 shards: int) -> list[list[SyncGroup]]:
+    """Splits groups into shards with about as many accounts each.
+
+    The biggest groups are handed out first, each to the shard with the
+    fewest accounts so far. Shards that would be empty are left out.
+
+    Args:
+        groups (list[SyncGroup]): Groups to split
+        shards (int): Maximum number of shards
+
+    Returns:
+        list[list[SyncGroup]]: Groups of each shard
+    """
+    split: list[list[SyncGroup]] = [[] for _ in range(max(shards, 1))]
+    sizes = [0] * len(split)
+    for group in sorted(groups, key=lambda group: len(group.accounts),
+                        reverse=True):
+        smallest = sizes.index(min(sizes))
+        split[smallest].append(group)
+        sizes[smallest] += len(group.accounts)
+    return [shard for shard in split if shard]
+
+
+def run_shards(func: Callable[[int, list[SyncGroup]], ShardResult],
+               shards: list[list[SyncGroup]]) -> list[ShardResult]:
+    """Runs func for every shard, each in its own process.
+
+    New processes are spawned instead of forked, so no locks or threads of
+    this process end up in a shard. A shard that crashes gets a result
+    with its error instead of stopping the others.
+
+    Args:
+        func (Callable[[int, list[SyncGroup]], ShardResult]): Picklable
+            function that syncs one shard's groups
+        shards (list[list[SyncGroup]]): Groups of each shard
+
+    Returns:
+        list[ShardResult]: Result of each shard, in shard order
+    """
+    results: list[ShardResult] = list()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(shards),
+                             mp_context=context) as executor:
+        futures = [executor.submit(func, number, groups)
+                   for number, groups in enumerate(shards)]
+        for number, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                results.append(ShardResult(
+                    shard=number,
+                    groups=[group.name for group in shards[number]],
+                    accounts=sum(len(group.accounts)
+                                 for group in shards[number]),
+                    error=repr(error)))
+    return results
+
+
+class RunReport:
+    """Every shard's results merged into one report for the run."""
+
+    def __init__(self, results: list[ShardResult], wall_time: float) -> None:
+        self.results = results
+        self.wall_time = wall_time
+        self.metrics = Metrics()
+        for result in results:
+            self.metrics.merge(result.calls, result.started)
+
+    @property
+    def actions(self) -> int:
+        """Actions planned by every shard."""
+        return sum(result.actions for result in self.results)
+
+    @property
+    def plans(self) -> dict[str, dict]:
+        """Plan of every group, by group name."""
+        return {name: plan for result in self.results
+                for name, plan in result.plans.items()}
+
+    @property
+    def failed(self) -> list[int]:
+        """Shards that crashed."""
+        return [result.shard for result in self.results if result.error]
+
+    def to_dict(self) -> dict:
+        """The whole report for the JSON export."""
+        hits = sum(result.cache_hits for result in self.results)
+        misses = sum(result.cache_misses for result in self.results)
+        calls = sum(stats.count
+                    for stats in self.metrics.snapshot().values())
+        return {'wall_time': round(self.wall_time, 4),
+                'cpu_time': round(sum(result.cpu_time
+                                      for result in self.results), 4),
+                'shards': len(self.results),
+                'failed_shards': self.failed,
+                'groups': sum(len(result.groups) for result in self.results),
+                'accounts': sum(result.accounts for result in self.results),
+                'actions': self.actions,
+                'retries': sum(result.retries for result in self.results),
+                'api_calls': calls,
+                'calls_per_second': round(calls / self.wall_time, 1)
+                if self.wall_time else 0.0,
+                'resolve_cache': {'hits': hits, 'misses': misses},
+                'by_shard': [result.to_dict() for result in self.results],
+                'calls': self.metrics.to_dict()['calls']}
+
+    def summary(self) -> list[str]:
+        """Lines for the log with the totals and each shard."""
+        report = self.to_dict()
+        lines = [f'{report["shards"]} shards synced {report["accounts"]}'
+                 f' accounts in {report["wall_time"]:.1f}s'
+                 f' ({report["cpu_time"]:.1f}s CPU), {report["actions"]}'
+                 f' actions, {report["api_calls"]} API calls,'
+                 f' {report["retries"]} retries.']
+        for result in self.results:
+            line = (f'Shard {result.shard}: {len(result.groups)} groups,'
+                    f' {result.accounts} accounts, {result.actions}'
+                    f' actions in {result.duration:.1f}s')
+            if result.error:
+                line += f', failed: {result.error}'
+            lines.append(line)
+        return lines
+
+    def write(self, path: Path) -> None:
+        """Writes the report as JSON.
+
+        Args:
+            path (Path): File to write
+        """
+        temp_path = Path(path).with_name(f'{Path(path).name}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+        os.replace(temp_path, path)
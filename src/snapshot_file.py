@@ -0,0 +1,153 @@
+"""Exports an account's follows, blocks and settings to a file and back.
+
+Snapshots are gzipped JSON Lines. The first line is a header with the
+format version, the second holds the settings, and every other line is one
+[kind, actor ID] pair in sorted order. Both reading and writing stream one
+line at a time.
+"""
+import gzip
+import json
+import os
+from dataclasses import fields
+from pathlib import Path
+from time import time
+from typing import Iterator
+
+from actor_index import KINDS, normalize_actor_id
+from instance import Instance
+from lem_types import SaveUserSettings
+from lem_types.saveusersettings import IGNORED_ON_SAVE
+from sync_plan import InstancePlan, build_plan, execute_plan
+
+SNAPSHOT_FORMAT = 'lemmy_sync.snapshot'
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file can't be read."""
+
+
+def export_snapshot(instance: Instance, path: Path) -> int:
+    """Writes a ready instance's follows, blocks and settings to a file.
+
+    Args:
+        instance (Instance): Logged in instance with a site response
+        path (Path): Snapshot file to write, usually ending in .jsonl.gz
+
+    Returns:
+        int: Number of follows and blocks written
+    """
+    settings = dict()
+    if instance.user_settings:
+        settings = {item.name: getattr(instance.user_settings, item.name)
+                    for item in fields(instance.user_settings)
+                    if item.compare and item.name not in IGNORED_ON_SAVE
+                    and getattr(instance.user_settings, item.name)
+                    is not None}
+
+    header = {'format': SNAPSHOT_FORMAT,
+              'version': SNAPSHOT_VERSION,
+              'account': instance.account.account,
+              'site': instance.account.site,
+              'exported_at': time()}
+    entries = 0
+    path = Path(path)
+    temp_path = path.with_name(f'{path.name}.tmp')
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as file:
+        file.write(json.dumps(header, separators=(',', ':')) + '\n')
+        file.write(json.dumps({'settings': settings}, default=str,
+                              separators=(',', ':')) + '\n')
+        for kind in KINDS:
+            for actor_id in sorted(instance.actor_index.get(kind)):
+                file.write(json.dumps([kind, actor_id]) + '\n')
+                entries += 1
+    os.replace(temp_path, path)
+    return entries
+
+
+class SnapshotReader:
+    """Reads a snapshot file one line at a time.
+
+    The header and settings are read when the file is opened. Iterating
+    over the reader yields (kind, actor ID) pairs.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        try:
+            self._file = gzip.open(self.path, 'rt', encoding='utf-8')
+            self.header = json.loads(self._file.readline())
+            self.settings = json.loads(self._file.readline())['settings']
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            self.close()
+            raise SnapshotError(f'Could not read "{path}": {error}') from error
+        if (self.header.get('format') != SNAPSHOT_FORMAT
+                or self.header.get('version') != SNAPSHOT_VERSION):
+            self.close()
+            raise SnapshotError(f'"{path}" is not a version'
+                                f' {SNAPSHOT_VERSION} snapshot.')
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        number = 2
+        try:
+            for number, line in enumerate(self._file, start=3):
+                if not line.strip():
+                    continue
+                kind, actor_id = json.loads(line)
+                if kind not in KINDS:
+                    raise ValueError(f'unknown kind "{kind}"')
+                yield kind, actor_id
+        except (OSError, ValueError) as error:
+            raise SnapshotError(f'Could not read "{self.path}" line'
+                                f' {number}: {error}') from error
+
+    def close(self) -> None:
+        """Closes the file."""
+        if getattr(self, '_file', None):
+            self._file.close()
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+
+def import_snapshot(instance: Instance, path: Path,
+                    queue_size: int = 16,
+                    dry_run: bool = False) -> InstancePlan:
+    """Gives a ready instance everything in a snapshot it doesn't have.
+
+    Nothing the instance has is removed. The same planner and executor as
+    a normal sync are used, so only missing follows, blocks and settings
+    are sent.
+
+    Args:
+        instance (Instance): Logged in instance with a site response
+        path (Path): Snapshot file to read
+        queue_size (int): Resolved URLs allowed to wait for their action
+        dry_run (bool): Only plan, don't send anything
+
+    Raises:
+        SnapshotError: If the file can't be read
+
+    Returns:
+        InstancePlan: What was planned for the instance
+    """
+    target: dict[str, set[str]] = {kind: set() for kind in KINDS}
+    with SnapshotReader(path) as reader:
+        settings = reader.settings
+        for kind, actor_id in reader:
+            target[kind].add(normalize_actor_id(actor_id))
+
+    settings_source = None
+    if settings:
+        known = {item.name for item in fields(SaveUserSettings)}
+        settings_source = SaveUserSettings(
+            auth=None, **{name: value for name, value in settings.items()
+                          if name in known and name != 'auth'})
+    instance_plan = build_plan([instance], settings_source,
+                               target).instances[0]
+    if not dry_run and instance_plan.actions:
+        execute_plan(instance, instance_plan, queue_size)
+    return instance_plan
@@ -0,0 +1,183 @@
+"""Snapshot of the last synced state, so later runs only sync changes."""
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from time import time
+
+from actor_index import KINDS, ActorIndex
+from lem_types import SaveUserSettings
+
+STATE_VERSION = 2
+
+
+def settings_hash(settings: SaveUserSettings | None) -> str | None:
+    """Hash of the settings that are compared when syncing.
+
+    Args:
+        settings (SaveUserSettings | None): Settings to hash
+
+    Returns:
+        str | None: Hex digest, or None if there are no settings
+    """
+    if settings is None:
+        return None
+    values = {item.name: getattr(settings, item.name)
+              for item in fields(settings) if item.compare}
+    encoded = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+@dataclass
+class AccountSnapshot:
+    """Follows and blocks an account had at the end of the last sync."""
+    follows: set[str] = field(default_factory=set)
+    community_blocks: set[str] = field(default_factory=set)
+    person_blocks: set[str] = field(default_factory=set)
+    settings_hash: str | None = None
+
+    @classmethod
+    def from_index(cls, index: ActorIndex,
+                   settings: SaveUserSettings | None) -> 'AccountSnapshot':
+        """Takes a snapshot of an account's current state.
+
+        Args:
+            index (ActorIndex): Account's follows and blocks
+            settings (SaveUserSettings | None): Account's user settings
+
+        Returns:
+            AccountSnapshot: Snapshot of the account
+        """
+        return cls(**{kind: set(index.get(kind)) for kind in KINDS},
+                   settings_hash=settings_hash(settings))
+
+    def get(self, kind: str) -> set[str]:
+        """Actor IDs of one kind in the snapshot."""
+        if kind not in KINDS:
+            raise ValueError(f'Unknown snapshot kind "{kind}"')
+        return getattr(self, kind)
+
+
+@dataclass
+class SyncState:
+    """State of a sync group at the end of its last run.
+
+    synced is what every account in the group should have. accounts holds
+    what each account actually had, which tells apart things the user
+    changed since then from actions that failed to sync. tombstones holds
+    actor IDs that were deliberately removed and when, so they are removed
+    from every account instead of being added back. pending holds the
+    actions each account still needed when the run ended and when each was
+    first left over, so a run with a budget can send the oldest first.
+    """
+    synced: dict[str, set[str]] = field(
+        default_factory=lambda: {kind: set() for kind in KINDS})
+    accounts: dict[str, AccountSnapshot] = field(default_factory=dict)
+    settings_hash: str | None = None
+    tombstones: dict[str, dict[str, float]] = field(
+        default_factory=lambda: {kind: dict() for kind in KINDS})
+    pending: dict[str, dict[str, float]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> 'SyncState':
+        """Loads the state, or an empty one if there isn't a usable file.
+
+        Args:
+            path (Path): State file to read
+
+        Returns:
+            SyncState: State of the last run
+        """
+        try:
+            with open(path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cls()
+        if data.get('version') != STATE_VERSION:
+            return cls()
+
+        state = cls(settings_hash=data.get('settings_hash'))
+        for kind in KINDS:
+            state.synced[kind] = set(data['synced'].get(kind, []))
+            state.tombstones[kind] = dict(data['tombstones'].get(kind, {}))
+        for name, snapshot in data['accounts'].items():
+            state.accounts[name] = AccountSnapshot(
+                **{kind: set(snapshot.get(kind, [])) for kind in KINDS},
+                settings_hash=snapshot.get('settings_hash'))
+        state.pending = {name: dict(actions) for name, actions
+                         in data.get('pending', {}).items()}
+        return state
+
+    def save(self, path: Path) -> None:
+        """Saves the state, replacing the old file in one step.
+
+        Args:
+            path (Path): State file to write
+        """
+        data = {
+            'version': STATE_VERSION,
+            'settings_hash': self.settings_hash,
+            'synced': {kind: sorted(self.synced[kind]) for kind in KINDS},
+            'tombstones': self.tombstones,
+            'pending': self.pending,
+            'accounts': {
+                name: {**{kind: sorted(snapshot.get(kind)) for kind in KINDS},
+                       'settings_hash': snapshot.settings_hash}
+                for name, snapshot in self.accounts.items()}}
+        temp_path = Path(path).with_name(f'{Path(path).name}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    def record(self, name: str, index: ActorIndex,
+               settings: SaveUserSettings | None) -> None:
+        """Stores an account's state at the end of a sync.
+
+        Args:
+            name (str): Account name from the config
+            index (ActorIndex): Account's follows and blocks
+            settings (SaveUserSettings | None): Account's user settings
+        """
+        self.accounts[name] = AccountSnapshot.from_index(index, settings)
+
+    def update_tombstones(self, added: dict[str, set[str]],
+                          removed: dict[str, set[str]], ttl: float,
+                          now: float | None = None) -> None:
+        """Adds tombstones for removals and drops re-added or expired ones.
+
+        Args:
+            added (dict[str, set[str]]): Actor IDs added since the last sync
+            removed (dict[str, set[str]]): Actor IDs removed since then
+            ttl (float): Seconds a tombstone is kept
+            now (float | None): Current time, defaults to time()
+        """
+        now = time() if now is None else now
+        for kind in KINDS:
+            stones = self.tombstones[kind]
+            for actor_id in removed[kind]:
+                stones.setdefault(actor_id, now)
+            for actor_id in added[kind]:
+                stones.pop(actor_id, None)
+            for actor_id, removed_at in list(stones.items()):
+                if now - removed_at > ttl:
+                    del stones[actor_id]
+
+    def update_pending(self, name: str, actions: list[str],
+                       now: float | None = None) -> None:
+        """Replaces an account's pending actions, keeping how old they are.
+
+        Args:
+            name (str): Account name from the config
+            actions (list[str]): Keys of the actions it still needs
+            now (float | None): Current time, defaults to time()
+        """
+        now = time() if now is None else now
+        queued = self.pending.get(name, {})
+        self.pending[name] = {key: queued.get(key, now) for key in actions}
+        if not actions:
+            del self.pending[name]
+
+    def removals(self) -> dict[str, set[str]]:
+        """Actor IDs with a tombstone, which no account should have."""
+        return {kind: set(self.tombstones[kind]) for kind in KINDS}
@@ -0,0 +1,159 @@
+"""Loads sync groups from ini files, TOML files or a folder of them."""
+import configparser
+import re
+import tomllib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from account import Account
+
+# Account whose settings are copied when a group doesn't name one.
+DEFAULT_SOURCE = 'Main Account'
+
+
+class ConfigError(Exception):
+    """Raised when a config file can't be read or is missing something."""
+
+
+def slugify(name: str) -> str:
+    """Turns a group or account name into something safe for file names."""
+    return re.sub(r'[^\w.-]+', '_', name).strip('_') or 'default'
+
+
+@dataclass
+class SyncGroup:
+    """Accounts that are synced with each other."""
+    name: str
+    accounts: list[Account] = field(default_factory=list)
+    source: str | None = DEFAULT_SOURCE
+
+    @property
+    def slug(self) -> str:
+        """Group name that is safe to use in file names."""
+        return slugify(self.name)
+
+
+def _make_account(name: str, items: dict, path: Path) -> Account:
+    items = {key.lower(): value for key, value in items.items()}
+    missing = [key for key in ('site', 'user', 'password')
+               if not items.get(key)]
+    if missing:
+        raise ConfigError(f'Account "{name}" in "{path}" is missing'
+                          f' {", ".join(missing)}.')
+    return Account(account=name,
+                   site=items['site'],
+                   user=items['user'],
+                   password=items['password'])
+
+
+def read_ini_group(path: Path) -> SyncGroup:
+    """Reads one group from an ini file like "exampleconfig.ini".
+
+    Every section is an account. The account with "Source = yes" is the
+    settings source, otherwise it's the one called "Main Account".
+
+    Args:
+        path (Path): Ini file to read
+
+    Raises:
+        ConfigError: If the file can't be read or an account is incomplete
+
+    Returns:
+        SyncGroup: Group named after the file
+    """
+    config = configparser.ConfigParser(interpolation=None)
+    try:
+        read = config.read(path)
+    except configparser.Error as error:
+        raise ConfigError(f'Could not parse "{path}": {error}') from error
+    if not read:
+        raise ConfigError(f'Could not read "{path}".')
+
+    group = SyncGroup(name=Path(path).stem)
+    for section in config.sections():
+        group.accounts.append(
+            _make_account(section, dict(config.items(section)), path))
+        if config.getboolean(section, 'source', fallback=False):
+            group.source = section
+    return group
+
+
+def read_toml_groups(path: Path) -> list[SyncGroup]:
+    """Reads any number of groups from a TOML file.
+
+    Each group is a [[group]] table with a name, an optional source and a
+    table of accounts::
+
+        [[group]]
+        name = "alice"
+        source = "Main Account"
+
+        [group.accounts."Main Account"]
+        site = "https://sh.itjust.works"
+        user = "Imauser"
+        password = "apasswod"
+
+    Args:
+        path (Path): TOML file to read
+
+    Raises:
+        ConfigError: If the file can't be read or a group is incomplete
+
+    Returns:
+        list[SyncGroup]: Groups in the file
+    """
+    try:
+        with open(path, 'rb') as file:
+            data = tomllib.load(file)
+    except (OSError, tomllib.TOMLDecodeError) as error:
+        raise ConfigError(f'Could not read "{path}": {error}') from error
+
+    groups: list[SyncGroup] = list()
+    for number, table in enumerate(data.get('group', []), start=1):
+        group = SyncGroup(name=table.get('name', f'{Path(path).stem}'
+                                                 f'-{number}'),
+                          source=table.get('source', DEFAULT_SOURCE))
+        for name, items in table.get('accounts', {}).items():
+            group.accounts.append(_make_account(name, items, path))
+        groups.append(group)
+    return groups
+
+
+def load_groups(path: Path) -> list[SyncGroup]:
+    """Loads sync groups from a config file or a folder of config files.
+
+    Args:
+        path (Path): .ini or .toml file, or a folder containing them
+
+    Raises:
+        ConfigError: If a file can't be read, there are no groups, a group
+            has no accounts or two groups have the same name
+
+    Returns:
+        list[SyncGroup]: Every group found
+    """
+    path = Path(path)
+    if path.is_dir():
+        files = sorted(file for file in path.iterdir()
+                       if file.suffix in ('.ini', '.toml'))
+    else:
+        files = [path]
+
+    groups: list[SyncGroup] = list()
+    for file in files:
+        if file.suffix == '.toml':
+            groups.extend(read_toml_groups(file))
+        else:
+            groups.append(read_ini_group(file))
+    if not groups:
+        raise ConfigError(f'No sync groups found in "{path}".')
+
+    names = set()
+    for group in groups:
+        if not group.accounts:
+            raise ConfigError(f'Group "{group.name}" has no accounts.')
+        if group.slug in names:
+            raise ConfigError(f'More than one group is called'
+                              f' "{group.name}".')
+        names.add(group.slug)
+    return groups
@@ -0,0 +1,300 @@
+"""Works out what each instance is missing before anything is sent."""
+import threading
+from dataclasses import dataclass, field
+from itertools import takewhile
+from time import monotonic
+
+from actor_index import COMMUNITY_BLOCKS, FOLLOWS, KINDS, PERSON_BLOCKS
+from instance import Instance
+from lem_types import SaveUserSettings
+from pipeline import run_pipeline
+from state_store import AccountSnapshot, SyncState, settings_hash
+
+
+# InstancePlan field holding the removals for each index kind.
+REMOVALS = {FOLLOWS: 'unfollows',
+            COMMUNITY_BLOCKS: 'community_unblocks',
+            PERSON_BLOCKS: 'person_unblocks'}
+
+# InstancePlan fields in the order they are sent. Blocks go first so
+# unwanted people and communities are hidden as soon as possible.
+SETTINGS = 'settings'
+PRIORITY = (PERSON_BLOCKS, COMMUNITY_BLOCKS, SETTINGS, FOLLOWS,
+            'unfollows', 'community_unblocks', 'person_unblocks')
+
+
+class ActionBudget:
+    """Thread safe limit on the actions a run sends and on its duration.
+
+    Every action takes one from the budget before it is sent. Once
+    max_actions were taken, or deadline seconds passed since the budget
+    was made, nothing more is taken. None means no limit.
+    """
+
+    def __init__(self, max_actions: int | None = None,
+                 deadline: float | None = None) -> None:
+        self.remaining = max_actions
+        self.deadline = (monotonic() + deadline if deadline is not None
+                         else None)
+        self.used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        """True once no more actions may be sent."""
+        if self.remaining == 0:
+            return True
+        return self.deadline is not None and monotonic() >= self.deadline
+
+    def take(self) -> bool:
+        """Takes one action from the budget.
+
+        Returns:
+            bool: True if the action may be sent
+        """
+        with self._lock:
+            if self.exhausted:
+                return False
+            if self.remaining is not None:
+                self.remaining -= 1
+            self.used += 1
+            return True
+
+
+@dataclass
+class InstancePlan:
+    """Actions needed to bring one instance in line with the others."""
+    account: str
+    host: str
+    follows: list[str] = field(default_factory=list)
+    community_blocks: list[str] = field(default_factory=list)
+    person_blocks: list[str] = field(default_factory=list)
+    unfollows: list[str] = field(default_factory=list)
+    community_unblocks: list[str] = field(default_factory=list)
+    person_unblocks: list[str] = field(default_factory=list)
+    settings: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def actions(self) -> int:
+        """Number of API writes this plan will send."""
+        return (sum(len(getattr(self, kind)) for kind in KINDS)
+                + sum(len(getattr(self, name)) for name in REMOVALS.values())
+                + (1 if self.settings else 0))
+
+    def to_dict(self) -> dict:
+        """Plan as a dict that can be dumped to JSON."""
+        return {'account': self.account,
+                'host': self.host,
+                FOLLOWS: self.follows,
+                COMMUNITY_BLOCKS: self.community_blocks,
+                PERSON_BLOCKS: self.person_blocks,
+                **{name: getattr(self, name) for name in REMOVALS.values()},
+                'settings': sorted(self.settings)}
+
+
+@dataclass
+class SyncPlan:
+    """Plans for every instance in a run."""
+    instances: list[InstancePlan] = field(default_factory=list)
+
+    @property
+    def actions(self) -> int:
+        """Number of API writes the whole run will send."""
+        return sum(plan.actions for plan in self.instances)
+
+    def to_dict(self) -> dict:
+        """Plan as a dict that can be dumped to JSON."""
+        return {'actions': self.actions,
+                'instances': [plan.to_dict() for plan in self.instances]}
+
+    def settings_counts(self) -> dict[str, int]:
+        """Number of instances each setting will be changed on."""
+        counts: dict[str, int] = dict()
+        for plan in self.instances:
+            for name in plan.settings:
+                counts[name] = counts.get(name, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def summary(self) -> list[str]:
+        """One line per instance describing the planned actions."""
+        lines = [f'{plan.account} ({plan.host}):'
+                 f' {len(plan.follows)} follows,'
+                 f' {len(plan.community_blocks)} community blocks,'
+                 f' {len(plan.person_blocks)} person blocks,'
+                 f' {len(plan.unfollows)} unfollows,'
+                 f' {len(plan.community_unblocks)} community unblocks,'
+                 f' {len(plan.person_unblocks)} person unblocks,'
+                 f' {len(plan.settings)} settings'
+                 for plan in self.instances]
+        counts = self.settings_counts()
+        if counts:
+            lines.append('Settings to change: ' + ', '.join(
+                f'{name} on {count}' for name, count in counts.items()))
+        lines.append(f'{self.actions} actions planned in total.')
+        return lines
+
+
+@dataclass
+class Changes:
+    """What the accounts changed since the last synced snapshot."""
+    added: dict[str, set[str]] = field(
+        default_factory=lambda: {kind: set() for kind in KINDS})
+    removed: dict[str, set[str]] = field(
+        default_factory=lambda: {kind: set() for kind in KINDS})
+    settings_changed: bool = False
+
+    @property
+    def count(self) -> int:
+        """Number of added and removed entries."""
+        return sum(len(self.added[kind]) + len(self.removed[kind])
+                   for kind in KINDS)
+
+    def summary(self) -> list[str]:
+        """One line per kind describing the changes."""
+        lines = [f'{kind.replace("_", " ").capitalize()}:'
+                 f' {len(self.added[kind])} new,'
+                 f' {len(self.removed[kind])} removed'
+                 for kind in KINDS]
+        lines.append('Settings changed.' if self.settings_changed
+                     else 'Settings unchanged.')
+        return lines
+
+
+def compute_changes(instances: list[Instance], state: SyncState,
+                    settings_source: SaveUserSettings | None = None
+                    ) -> Changes:
+    """Compares each account with its snapshot from the last sync.
+
+    Accounts without a snapshot count everything they have as new, so the
+    first run, or a newly added account, syncs in full.
+
+    Args:
+        instances (list[Instance]): Logged in instances with site responses
+        state (SyncState): State saved at the end of the last sync
+        settings_source (SaveUserSettings | None): Settings to copy, if any
+
+    Returns:
+        Changes: Entries added and removed since the last sync
+    """
+    changes = Changes()
+    for instance in instances:
+        snapshot = state.accounts.get(instance.account.account,
+                                      AccountSnapshot())
+        for kind in KINDS:
+            current = instance.actor_index.get(kind).keys()
+            changes.added[kind].update(current - snapshot.get(kind))
+            changes.removed[kind].update(snapshot.get(kind) - current)
+
+    # If one account added something another removed, keep it.
+    for kind in KINDS:
+        changes.removed[kind] -= changes.added[kind]
+    changes.settings_changed = (settings_source is not None
+                                and settings_hash(settings_source)
+                                != state.settings_hash)
+    return changes
+
+
+def compute_target(state: SyncState, changes: Changes) -> dict[str, set[str]]:
+    """Works out what every account should have after this sync.
+
+    Args:
+        state (SyncState): State saved at the end of the last sync
+        changes (Changes): Changes made since the last sync
+
+    Returns:
+        dict[str, set[str]]: Actor IDs each account should have, per kind
+    """
+    return {kind: (state.synced[kind] | changes.added[kind])
+            - changes.removed[kind] - state.tombstones[kind].keys()
+            for kind in KINDS}
+
+
+def build_plan(instances: list[Instance],
+               settings_source: SaveUserSettings | None = None,
+               target: dict[str, set[str]] | None = None,
+               remove: dict[str, set[str]] | None = None) -> SyncPlan:
+    """Computes the exact follows, blocks and settings each instance lacks.
+
+    Args:
+        instances (list[Instance]): Logged in instances with site responses
+        settings_source (SaveUserSettings | None): Settings to copy, if any
+        target (dict[str, set[str]] | None): What every instance should
+            have, per kind. Defaults to everything any instance has.
+        remove (dict[str, set[str]] | None): What no instance should have,
+            per kind. Defaults to nothing.
+
+    Returns:
+        SyncPlan: Per instance plan of missing actions
+    """
+    if target is None:
+        target = {kind: set() for kind in KINDS}
+        for instance in instances:
+            for kind in KINDS:
+                target[kind].update(instance.actor_index.get(kind))
+
+    plan = SyncPlan()
+    for instance in instances:
+        instance_plan = InstancePlan(account=instance.account.account,
+                                     host=instance.host)
+        for kind in KINDS:
+            current = instance.actor_index.get(kind)
+            setattr(instance_plan, kind, sorted(target[kind] - current.keys()))
+            if remove:
+                setattr(instance_plan, REMOVALS[kind],
+                        sorted(remove[kind] & current.keys()))
+        if settings_source:
+            instance_plan.settings = settings_source.diff(
+                instance.user_settings)
+        plan.instances.append(instance_plan)
+    return plan
+
+
+def execute_plan(instance: Instance, instance_plan: InstancePlan,
+                 queue_size: int = 16,
+                 budget: ActionBudget | None = None) -> None:
+    """Sends the planned actions to a single instance in PRIORITY order.
+
+    Follows and blocks go through a resolve -> action pipeline so resolving
+    the next URL overlaps with the request for the current one.
+
+    Args:
+        instance (Instance): Instance to apply the plan to
+        instance_plan (InstancePlan): Actions planned for the instance
+        queue_size (int): Resolved URLs allowed to wait for their action
+        budget (ActionBudget | None): Stop once this runs out, shared by
+            every instance in the run
+    """
+    budget = budget if budget else ActionBudget()
+    stages = {FOLLOWS: (instance.resolve_community_id,
+                        instance.follow_community_id),
+              COMMUNITY_BLOCKS: (instance.resolve_community_id,
+                                 instance.block_community_id),
+              PERSON_BLOCKS: (instance.resolve_person_id,
+                              instance.block_person_id)}
+    # Removals already have their local IDs, so no pipeline is needed.
+    removals = {'unfollows': instance.unsubscribe_from_community,
+                'community_unblocks': instance.unblock_community,
+                'person_unblocks': instance.unblock_person}
+
+    def take_and_act(act):
+        return lambda url, local_id: budget.take() and act(url, local_id)
+
+    for name in PRIORITY:
+        if budget.exhausted:
+            return
+        if name == SETTINGS:
+            if instance_plan.settings and budget.take():
+                instance.save_settings_changes(instance_plan.settings)
+        elif name in removals:
+            for url in getattr(instance_plan, name):
+                if not budget.take():
+                    return
+                removals[name](url)
+        else:
+            # Skip anything done since the plan was made.
+            urls = [url for url in getattr(instance_plan, name)
+                    if not instance.actor_index.has(name, url)]
+            if urls:
+                resolve, act = stages[name]
+                run_pipeline(takewhile(lambda _: not budget.exhausted, urls),
+                             resolve, take_and_act(act), queue_size)
@@ -0,0 +1,145 @@
+"""Keeps login tokens between runs so accounts don't log in every time."""
+import base64
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from time import time
+from typing import Iterator
+
+from account import Account
+
+try:
+    import fcntl
+except ImportError:
+    # Not on Windows, where only the threads of one process are kept
+    # from overwriting each other's tokens.
+    fcntl = None
+
+
+def cache_key(account: Account) -> str:
+    """Key for an account's token.
+
+    The site and user are part of the key so changing either in the config
+    doesn't reuse a token for the wrong account.
+
+    Args:
+        account (Account): Account the token belongs to
+
+    Returns:
+        str: Key for the token cache
+    """
+    return f'{account.account}|{account.site}|{account.user}'
+
+
+def jwt_expired(token: str, leeway: float = 60) -> bool:
+    """Cheap local check of a JWT's exp claim. Doesn't check the signature.
+
+    Lemmy tokens often have no exp claim at all, those count as valid and
+    the instance gets the final say.
+
+    Args:
+        token (str): JWT to check
+        leeway (float): Seconds before the expiry to already treat it as
+            expired
+
+    Returns:
+        bool: True if the token is malformed or expired
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, ValueError):
+        return True
+    expires = claims.get('exp') if isinstance(claims, dict) else None
+    return expires is not None and expires <= time() + leeway
+
+
+class TokenCache:
+    """Login tokens stored in a JSON file only the owner can read."""
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._tokens = self._read()
+
+    def _read(self) -> dict[str, str]:
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                tokens = json.load(file)
+        except (OSError, ValueError):
+            return dict()
+        return tokens if isinstance(tokens, dict) else dict()
+
+    def get(self, account: Account) -> str | None:
+        """Gets a cached token for the account if it still looks valid.
+
+        Args:
+            account (Account): Account to get the token for
+
+        Returns:
+            str | None: Cached token, or None if there isn't a usable one
+        """
+        with self._lock:
+            token = self._tokens.get(cache_key(account))
+        if token and not jwt_expired(token):
+            return token
+        return None
+
+    def set(self, account: Account, token: str) -> None:
+        """Stores a token for the account and saves the file.
+
+        Args:
+            account (Account): Account the token belongs to
+            token (str): Token from a successful login
+        """
+        with self._lock:
+            self._save(cache_key(account), token)
+
+    def remove(self, account: Account) -> None:
+        """Forgets the account's token, e.g. after the instance rejected it.
+
+        Args:
+            account (Account): Account to forget the token for
+        """
+        with self._lock:
+            if cache_key(account) in self._tokens:
+                self._save(cache_key(account), None)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Keeps other processes from saving the file at the same time."""
+        if fcntl is None:
+            yield
+            return
+        lock_path = self.path.with_name(f'{self.path.name}.lock')
+        descriptor = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(descriptor)
+
+    def _save(self, key: str, token: str | None) -> None:
+        # Other processes, e.g. shards, may have saved their own tokens
+        # since the file was read, so re-read it and only change this one
+        # key while holding the lock.
+        with self._file_lock():
+            self._tokens = self._read()
+            if token is None:
+                self._tokens.pop(key, None)
+            else:
+                self._tokens[key] = token
+
+            # Write to a temp file made with owner only permissions, then
+            # swap it in so the tokens are never readable by anyone else.
+            temp_path = self.path.with_name(
+                f'{self.path.name}.{os.getpid()}.tmp')
+            descriptor = os.open(temp_path,
+                                 os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                json.dump(self._tokens, file)
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.path)
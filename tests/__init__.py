@@ -0,0 +1,15 @@
+"""Tests for lemmy_sync.
+
+The modules in "src" import each other by name, the same way they do when
+running "lemmy_sync.py", so put that folder on the path for the tests.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                'src'))
+
+# Don't leave a "logging.log" in the folder the tests are run from.
+from log_config import setup_logging  # pylint: disable=C0413
+
+setup_logging(log_file=None)
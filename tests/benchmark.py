@@ -0,0 +1,166 @@
+"""Benchmarks a full sync against local mock Lemmy instances.
+
+Run from the repository root, e.g.::
+
+    python -m tests.benchmark --accounts 20 --follows 200 --latency 0.02
+
+Every account starts with its own random follows and blocks, so each
+account has to get everything the others have. The wall time, the number
+of API calls and the calls per second are reported, and every account is
+checked to have ended up with the same follows and blocks as the rest of
+its group. With --groups and --shards the accounts are split into groups
+that are synced by several processes.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from tests.mock_lemmy import MockLemmy, MockOptions
+
+
+def write_config(path: Path, accounts: list[tuple[str, str, str]],
+                 name: str = 'benchmark') -> None:
+    """Writes a TOML config with one group holding every account.
+
+    Args:
+        path (Path): Config file to write
+        accounts (list[tuple[str, str, str]]): (name, site, user) of each
+            account, the first one is the settings source
+        name (str): Name of the group
+    """
+    lines = ['[[group]]', f'name = "{name}"',
+             f'source = "{accounts[0][0]}"', '']
+    for name, site, user in accounts:
+        lines += [f'[group.accounts."{name}"]', f'site = "{site}"',
+                  f'user = "{user}"', 'password = "password"', '']
+    path.write_text('\n'.join(lines), encoding='utf-8')
+
+
+def make_fleet(instances: int, accounts: int, follows: int,
+               options: MockOptions, seed: int = 0
+               ) -> tuple[list[MockLemmy], list[tuple[str, str, str]]]:
+    """Starts mock instances and spreads random accounts over them.
+
+    Args:
+        instances (int): Number of mock instances
+        accounts (int): Number of accounts, spread round robin
+        follows (int): Follows each account starts with
+        options (MockOptions): Latency, rate limit and errors to add
+        seed (int): Seed for the random follows and blocks
+
+    Returns:
+        tuple[list[MockLemmy], list[tuple[str, str, str]]]: Running
+            servers and the (name, site, user) of each account
+    """
+    picker = random.Random(seed)
+    communities = [f'https://remote{number % 7}.test/c/community{number}'
+                   for number in range(max(follows * 2, 1))]
+    people = [f'https://remote{number % 5}.test/u/person{number}'
+              for number in range(max(follows // 10, 1))]
+    servers = [MockLemmy(MockOptions(**{**vars(options),
+                                        'seed': seed + number}),
+                         domain=f'mock{number}.test').start()
+               for number in range(instances)]
+    config = list()
+    for number in range(accounts):
+        server = servers[number % instances]
+        user = f'user{number}'
+        server.add_user(user,
+                        follows=picker.sample(communities, follows),
+                        community_blocks=picker.sample(communities[-5:], 1),
+                        person_blocks=picker.sample(people, 1),
+                        theme=f'theme{number}')
+        config.append((f'Account {number}', server.url, user))
+    return servers, config
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Runs one benchmark and returns its report."""
+    # Imported here so --help doesn't pay for the sync's imports.
+    from lemmy_sync import main
+
+    options = MockOptions(latency=args.latency, rate_limit=args.rate_limit,
+                          error_rate=args.error_rate)
+    servers, accounts = make_fleet(args.instances, args.accounts,
+                                   args.follows, options, args.seed)
+    groups = [accounts[number::args.groups] for number in range(args.groups)]
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config = Path(tmp_dir, 'groups')
+            config.mkdir()
+            for number, group in enumerate(groups):
+                write_config(config / f'benchmark{number}.toml', group,
+                             name=f'benchmark{number}')
+            started = perf_counter()
+            main(['--config', str(config), '--state-dir', tmp_dir,
+                  '--workers', str(args.workers),
+                  '--shards', str(args.shards), '--rate', '1000',
+                  '--burst', '1000', '--no-token-cache',
+                  '--retry-budget', '100000'])
+            wall_time = perf_counter() - started
+    finally:
+        for server in servers:
+            server.stop()
+
+    by_url = {server.url: server for server in servers}
+    in_sync = True
+    for group in groups:
+        users = [by_url[site].users[user] for _name, site, user in group]
+        in_sync = in_sync and all(
+            user.follows == users[0].follows
+            and user.community_blocks == users[0].community_blocks
+            and user.person_blocks == users[0].person_blocks
+            for user in users)
+    calls = sum(sum(server.requests.values()) for server in servers)
+    by_endpoint: dict[str, int] = dict()
+    for server in servers:
+        for endpoint, count in server.requests.items():
+            by_endpoint[endpoint] = by_endpoint.get(endpoint, 0) + count
+    return {'instances': args.instances,
+            'accounts': args.accounts,
+            'follows': args.follows,
+            'workers': args.workers,
+            'groups': args.groups,
+            'shards': args.shards,
+            'wall_time': round(wall_time, 3),
+            'api_calls': calls,
+            'calls_per_second': round(calls / wall_time, 1),
+            'calls_by_endpoint': dict(sorted(by_endpoint.items())),
+            'in_sync': in_sync}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instances', type=int, default=3)
+    parser.add_argument('--accounts', type=int, default=6)
+    parser.add_argument('--follows', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--groups', type=int, default=1,
+                        help='Groups to split the accounts between.')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Processes to sync the groups with.')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds added to every mock API call.')
+    parser.add_argument('--rate-limit', type=float,
+                        help='Requests per second each mock instance allows.')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Chance of a HTTP 503 for any call.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, metavar='FILE',
+                        help='Also write the report to a JSON file.')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    report = run(arguments)
+    print(json.dumps(report, indent=2))
+    if arguments.output:
+        arguments.output.write_text(json.dumps(report, indent=2),
+                                    encoding='utf-8')
+    sys.exit(0 if report['in_sync'] else 1)
@@ -0,0 +1,42 @@
+"""Stand-ins shared by the unit tests"""
+from types import SimpleNamespace
+
+from actor_index import COMMUNITY_BLOCKS, FOLLOWS, PERSON_BLOCKS, ActorIndex
+from lem_types import SaveUserSettings
+
+
+class FakeSession:
+    """Session stand-in that hands out canned results in order."""
+
+    def __init__(self, results: list) -> None:
+        self.results = results
+        self.calls = 0
+        self.sent: list[dict] = list()
+
+    def request(self, **kwargs):
+        """Returns or raises the next canned result."""
+        self.sent.append(kwargs)
+        result = self.results[self.calls]
+        self.calls += 1
+        if isinstance(result, Exception):
+            raise result
+        return SimpleNamespace(status_code=result, headers={},
+                               content=b'{"ok": true}')
+
+
+def make_instance(name: str, follows: list[str] = (),
+                  community_blocks: list[str] = (),
+                  person_blocks: list[str] = (),
+                  theme: str = 'darkly', **settings) -> SimpleNamespace:
+    """Makes a stand-in for a logged in Instance."""
+    index = ActorIndex()
+    for kind, urls in ((FOLLOWS, follows),
+                       (COMMUNITY_BLOCKS, community_blocks),
+                       (PERSON_BLOCKS, person_blocks)):
+        for local_id, url in enumerate(urls):
+            index.add(kind, url, local_id)
+    return SimpleNamespace(
+        account=SimpleNamespace(account=name, site=f'https://{name}.test'),
+        host=f'{name}.test',
+        actor_index=index,
+        user_settings=SaveUserSettings(auth=name, theme=theme, **settings))
@@ -0,0 +1,378 @@
+"""Local stand-in for the parts of the Lemmy v3 API that lemmy_sync uses.
+
+Every MockLemmy is one instance with its own users and its own local IDs,
+served over plain http on 127.0.0.1. Latency, rate limiting and errors can
+be added to see how the sync copes with slow or flaky instances.
+"""
+import base64
+import hashlib
+import json
+import random
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, sleep
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = '/api/v3/'
+
+# SaveUserSettings fields that live on the Person, the rest are LocalUser.
+PERSON_SETTINGS = ('display_name', 'bio', 'matrix_user_id', 'bot_account')
+DEFAULT_SETTINGS = {'show_nsfw': False,
+                    'show_scores': True,
+                    'theme': 'browser',
+                    'interface_language': 'browser',
+                    'email': None,
+                    'show_avatars': True,
+                    'send_notifications_to_email': False,
+                    'show_bot_accounts': True,
+                    'show_read_posts': True,
+                    'show_new_post_notifs': False,
+                    'default_listing_type': 'Local',
+                    'default_sort_type': 'Active',
+                    'display_name': None,
+                    'bio': None,
+                    'matrix_user_id': None,
+                    'bot_account': False}
+
+
+@dataclass
+class MockOptions:
+    """How the mock instance behaves.
+
+    latency is added to every request. rate_limit is requests per second
+    for the whole instance, above it requests get a HTTP 429 with
+    Retry-After. error_rate is the chance of a HTTP 503 for any request.
+    With etags /site answers If-None-Match with a HTTP 304 when nothing
+    changed, and cache_control is sent as its Cache-Control header.
+    """
+    latency: float = 0.0
+    rate_limit: float | None = None
+    retry_after: int = 1
+    error_rate: float = 0.0
+    seed: int | None = None
+    etags: bool = False
+    cache_control: str | None = None
+
+
+@dataclass
+class MockUser:
+    """Account on the mock instance."""
+    id: int
+    name: str
+    password: str
+    follows: set[str] = field(default_factory=set)
+    community_blocks: set[str] = field(default_factory=set)
+    person_blocks: set[str] = field(default_factory=set)
+    settings: dict = field(default_factory=lambda: dict(DEFAULT_SETTINGS))
+    token_version: int = 0
+
+
+class MockLemmy:
+    """Lemmy instance stand-in running in a background thread."""
+
+    def __init__(self, options: MockOptions | None = None,
+                 domain: str = 'mock.test') -> None:
+        self.options = options if options else MockOptions()
+        self.domain = domain
+        self.users: dict[str, MockUser] = dict()
+        self.requests: Counter = Counter()
+        self.saved_settings: list[dict] = list()
+        self.not_modified = 0
+        # Logins that are refused even with the right password.
+        self.failing_logins = 0
+
+        self._random = random.Random(self.options.seed)
+        self._ids: dict[str, int] = dict()
+        self._actors: dict[int, str] = dict()
+        self._next_id = self._random.randrange(1000, 100_000)
+        self._lock = threading.Lock()
+        self._allowance = float(self.options.rate_limit or 0)
+        self._checked = monotonic()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Site URL to put in the config."""
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def start(self) -> 'MockLemmy':
+        """Starts serving requests."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockLemmy':
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
+
+    def add_user(self, name: str, password: str = 'password',
+                 follows=(), community_blocks=(), person_blocks=(),
+                 **settings) -> MockUser:
+        """Adds an account, optionally with follows, blocks and settings.
+
+        Returns:
+            MockUser: The new account
+        """
+        with self._lock:
+            user = MockUser(id=len(self.users) + 1, name=name,
+                            password=password, follows=set(follows),
+                            community_blocks=set(community_blocks),
+                            person_blocks=set(person_blocks))
+            user.settings.update(settings)
+            self.users[name] = user
+            return user
+
+    def local_id(self, actor_id: str) -> int:
+        """ID this instance gives a community or person.
+
+        IDs start at a random offset so no two instances agree on them.
+        """
+        if actor_id not in self._ids:
+            self._next_id += 1
+            self._ids[actor_id] = self._next_id
+            self._actors[self._next_id] = actor_id
+        return self._ids[actor_id]
+
+    def actor_id(self, local_id: int) -> str | None:
+        """Actor ID for a local ID, None if it was never handed out."""
+        return self._actors.get(local_id)
+
+    def _throttled(self) -> bool:
+        rate = self.options.rate_limit
+        if not rate:
+            return False
+        now = monotonic()
+        self._allowance = min(rate, self._allowance
+                              + (now - self._checked) * rate)
+        self._checked = now
+        if self._allowance < 1:
+            return True
+        self._allowance -= 1
+        return False
+
+    def handle(self, method: str, endpoint: str, query: dict, body: dict,
+               headers: dict | None = None) -> tuple[int, dict, dict]:
+        """Answers one API call.
+
+        Args:
+            method (str): HTTP method
+            endpoint (str): Path after /api/v3/
+            query (dict): Query string parameters
+            body (dict): JSON body
+            headers (dict | None): Request headers
+
+        Returns:
+            tuple[int, dict, dict]: Status, JSON response and headers
+        """
+        if self.options.latency:
+            sleep(self.options.latency)
+        with self._lock:
+            self.requests[endpoint] += 1
+            if self._throttled():
+                return 429, {'error': 'rate_limit_error'}, {
+                    'Retry-After': str(self.options.retry_after)}
+            if self._random.random() < self.options.error_rate:
+                return 503, {'error': 'injected_error'}, {}
+
+            handler = _ROUTES.get((method, endpoint))
+            if handler is None:
+                return 404, {'error': 'unknown_endpoint'}, {}
+            if endpoint == 'user/login':
+                return handler(self, None, body)
+
+            user = self._authenticate(query.get('auth') or body.get('auth'))
+            if user is None:
+                return 401, {'error': 'not_logged_in'}, {}
+            status, data, response_headers = handler(self, user,
+                                                     {**query, **body})
+            if endpoint == 'site' and status == 200:
+                return self._cache_headers(data, headers or {})
+            return status, data, response_headers
+
+    def _cache_headers(self, data: dict,
+                       headers: dict) -> tuple[int, dict, dict]:
+        response_headers = dict()
+        if self.options.cache_control:
+            response_headers['Cache-Control'] = self.options.cache_control
+        if self.options.etags:
+            encoded = json.dumps(data, sort_keys=True).encode()
+            etag = f'"{hashlib.sha256(encoded).hexdigest()[:16]}"'
+            response_headers['ETag'] = etag
+            if headers.get('If-None-Match') == etag:
+                self.not_modified += 1
+                return 304, {}, response_headers
+        return 200, data, response_headers
+
+    def revoke(self, name: str) -> None:
+        """Makes every token issued to an account so far invalid."""
+        with self._lock:
+            self.users[name].token_version += 1
+
+    def _authenticate(self, token: str | None) -> MockUser | None:
+        try:
+            payload = token.split('.')[1]
+            payload += '=' * (-len(payload) % 4)
+            claims = json.loads(base64.urlsafe_b64decode(payload))
+            user = self.users.get(claims['sub'])
+        except (AttributeError, IndexError, KeyError, ValueError):
+            return None
+        if user is None or claims.get('ver') != user.token_version:
+            return None
+        return user
+
+    def _login(self, _user, body: dict) -> tuple[int, dict, dict]:
+        user = self.users.get(body.get('username_or_email'))
+        if user is None or user.password != body.get('password'):
+            return 400, {'error': 'incorrect_login'}, {}
+        if self.failing_logins:
+            self.failing_logins -= 1
+            return 400, {'error': 'incorrect_login'}, {}
+        claims = json.dumps({'sub': user.name, 'iss': self.domain,
+                             'ver': user.token_version})
+        token = '.'.join(
+            base64.urlsafe_b64encode(part.encode()).decode().rstrip('=')
+            for part in ('{"alg":"HS256"}', claims, 'signature'))
+        return 200, {'jwt': token}, {}
+
+    def _person(self, actor_id: str) -> dict:
+        return {'id': self.local_id(actor_id),
+                'name': actor_id.rstrip('/').rsplit('/', 1)[-1],
+                'actor_id': actor_id,
+                'local': urlparse(actor_id).netloc == self.domain}
+
+    def _community(self, actor_id: str) -> dict:
+        name = actor_id.rstrip('/').rsplit('/', 1)[-1]
+        return {'id': self.local_id(actor_id),
+                'name': name,
+                'title': name.title(),
+                'actor_id': actor_id,
+                'local': urlparse(actor_id).netloc == self.domain}
+
+    def _site(self, user: MockUser, _params: dict) -> tuple[int, dict, dict]:
+        person = {**self._person(f'https://{self.domain}/u/{user.name}'),
+                  **{key: user.settings[key] for key in PERSON_SETTINGS}}
+        local_user = {key: value for key, value in user.settings.items()
+                      if key not in PERSON_SETTINGS}
+        my_user = {
+            'local_user_view': {
+                'local_user': {'id': user.id, 'person_id': person['id'],
+                               **local_user},
+                'person': person,
+                'counts': {'id': user.id, 'person_id': person['id']}},
+            'follows': [{'community': self._community(actor_id),
+                         'follower': person}
+                        for actor_id in sorted(user.follows)],
+            'moderates': [],
+            'community_blocks': [{'person': person,
+                                  'community': self._community(actor_id)}
+                                 for actor_id in sorted(user.community_blocks)],
+            'person_blocks': [{'person': person,
+                               'target': self._person(actor_id)}
+                              for actor_id in sorted(user.person_blocks)],
+            'discussion_languages': []}
+        return 200, {'version': '0.18.0', 'my_user': my_user}, {}
+
+    def _resolve(self, _user, params: dict) -> tuple[int, dict, dict]:
+        actor_id = params.get('q', '')
+        if not urlparse(actor_id).netloc:
+            return 400, {'error': 'couldnt_find_object'}, {}
+        if '/u/' in actor_id:
+            return 200, {'person': {'person': self._person(actor_id)}}, {}
+        return 200, {'community': {'community': self._community(actor_id)}}, {}
+
+    def _set(self, user: MockUser, kind: str, id_key: str, flag: str,
+             params: dict) -> tuple[int, dict, dict]:
+        actor_id = self.actor_id(params.get(id_key))
+        if actor_id is None:
+            return 404, {'error': 'couldnt_find_object'}, {}
+        items = getattr(user, kind)
+        if params.get(flag):
+            items.add(actor_id)
+        else:
+            items.discard(actor_id)
+        return 200, {}, {}
+
+    def _follow(self, user, params):
+        return self._set(user, 'follows', 'community_id', 'follow', params)
+
+    def _block_community(self, user, params):
+        return self._set(user, 'community_blocks', 'community_id', 'block',
+                         params)
+
+    def _block_person(self, user, params):
+        return self._set(user, 'person_blocks', 'person_id', 'block', params)
+
+    def _save_settings(self, user: MockUser,
+                       params: dict) -> tuple[int, dict, dict]:
+        self.saved_settings.append(params)
+        for key, value in params.items():
+            if key in user.settings:
+                user.settings[key] = value
+        return 200, {'jwt': params.get('auth')}, {}
+
+
+_ROUTES = {('POST', 'user/login'): MockLemmy._login,
+           ('GET', 'site'): MockLemmy._site,
+           ('GET', 'resolve_object'): MockLemmy._resolve,
+           ('POST', 'community/follow'): MockLemmy._follow,
+           ('POST', 'community/block'): MockLemmy._block_community,
+           ('POST', 'user/block'): MockLemmy._block_person,
+           ('PUT', 'user/save_user_settings'): MockLemmy._save_settings}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, so Nagle's algorithm would
+    # add a delayed ACK wait to every keep-alive response.
+    disable_nagle_algorithm = True
+
+    def _serve(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        query = {key: values[-1]
+                 for key, values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length)) if length else {}
+        except ValueError:
+            body = {}
+        if not parsed.path.startswith(API_PREFIX):
+            status, data, headers = 404, {'error': 'unknown_endpoint'}, {}
+        else:
+            status, data, headers = self.server.mock.handle(
+                method, parsed.path[len(API_PREFIX):], query, body,
+                self.headers)
+
+        # A HTTP 304 has no body.
+        encoded = json.dumps(data).encode() if status != 304 else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self):
+        self._serve('GET')
+
+    def do_POST(self):
+        self._serve('POST')
+
+    def do_PUT(self):
+        self._serve('PUT')
+
+    def log_message(self, *_args) -> None:
+        # Keep the test and benchmark output clean.
+        pass
@@ -0,0 +1,57 @@
+"""Unit tests for actor_index.py"""
+import unittest
+from types import SimpleNamespace
+
+from actor_index import (COMMUNITY_BLOCKS, FOLLOWS, PERSON_BLOCKS, ActorIndex,
+                         normalize_actor_id)
+
+
+def make_myuserinfo() -> SimpleNamespace:
+    """Makes a minimal stand-in for MyUserInfo."""
+    def community(actor_id, local_id):
+        return SimpleNamespace(
+            community=SimpleNamespace(actor_id=actor_id, id=local_id))
+
+    return SimpleNamespace(
+        follows=[community('https://lemmy.ml/c/linuxgaming', 1)],
+        community_blocks=[community('https://Lemmy.World/c/memes/', 2)],
+        person_blocks=[SimpleNamespace(
+            target=SimpleNamespace(actor_id='https://a.test/u/troll', id=3))])
+
+
+class TestNormalizeActorId(unittest.TestCase):
+    """normalize_actor_id test case."""
+
+    def test_normalize(self):
+        """Scheme and host case, trailing slashes and missing schemes."""
+        self.assertEqual(normalize_actor_id('HTTPS://Lemmy.ML/c/linux/'),
+                         'https://lemmy.ml/c/linux')
+        self.assertEqual(normalize_actor_id('lemmy.ml/c/linux'),
+                         'https://lemmy.ml/c/linux')
+
+
+class TestActorIndex(unittest.TestCase):
+    """ActorIndex test case."""
+
+    def test_exact_matches(self):
+        """Lookups are exact, so /c/linux doesn't match /c/linuxgaming."""
+        index = ActorIndex.from_myuserinfo(make_myuserinfo())
+        self.assertTrue(index.has(FOLLOWS, 'https://lemmy.ml/c/linuxgaming'))
+        self.assertFalse(index.has(FOLLOWS, 'https://lemmy.ml/c/linux'))
+        self.assertTrue(index.has(COMMUNITY_BLOCKS,
+                                  'https://lemmy.world/c/memes'))
+        self.assertEqual(index.person_blocks, {'https://a.test/u/troll': 3})
+
+    def test_add_and_remove(self):
+        """Entries can be added and removed as actions succeed."""
+        index = ActorIndex()
+        index.add(FOLLOWS, 'https://lemmy.ml/c/linux', 5)
+        self.assertTrue(index.has(FOLLOWS, 'https://lemmy.ml/c/linux/'))
+        index.remove(FOLLOWS, 'https://lemmy.ml/c/linux')
+        self.assertFalse(index.has(FOLLOWS, 'https://lemmy.ml/c/linux'))
+
+    def test_unknown_kind(self):
+        """Unknown kinds raise a ValueError."""
+        with self.assertRaises(ValueError):
+            ActorIndex().get('moderates')
+        self.assertEqual(ActorIndex().get(PERSON_BLOCKS), {})
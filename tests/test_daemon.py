@@ -0,0 +1,53 @@
+"""Unit tests for daemon.py"""
+import unittest
+
+import requests
+
+from daemon import StatusServer, SyncDaemon
+
+
+class TestSyncDaemon(unittest.TestCase):
+    """SyncDaemon and StatusServer test case."""
+
+    def test_runs_and_status(self):
+        """Runs are counted and failures don't stop the daemon."""
+        results = iter([3, RuntimeError('boom'), 0])
+
+        def sync():
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        daemon = SyncDaemon(sync, interval=0.01, jitter=0.5)
+        daemon.run(max_runs=2)
+        status = daemon.status()
+        self.assertEqual((status['runs'], status['failures']), (2, 1))
+        self.assertIn('boom', status['last_error'])
+        self.assertFalse(daemon.healthy)
+
+        daemon.run_once()
+        self.assertTrue(daemon.healthy)
+        self.assertEqual(daemon.status()['last_actions'], 0)
+
+    def test_jitter(self):
+        """Delays stay within the jitter around the interval."""
+        daemon = SyncDaemon(lambda: 0, interval=100, jitter=0.1)
+        for _ in range(20):
+            self.assertTrue(90 <= daemon.next_delay() <= 110)
+
+    def test_status_server(self):
+        """The status and health endpoints answer with JSON."""
+        daemon = SyncDaemon(lambda: 5, interval=1)
+        daemon.run_once()
+        server = StatusServer(daemon, port=0).start()
+        try:
+            url = f'http://127.0.0.1:{server.port}'
+            status = requests.get(f'{url}/status', timeout=5)
+            health = requests.get(f'{url}/health', timeout=5)
+            missing = requests.get(f'{url}/nothing', timeout=5)
+        finally:
+            server.stop()
+        self.assertEqual(status.json()['last_actions'], 5)
+        self.assertEqual(health.status_code, 200)
+        self.assertEqual(missing.status_code, 404)
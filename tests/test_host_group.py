@@ -0,0 +1,124 @@
+"""Unit tests for host_group.py"""
+import threading
+import unittest
+
+from account import Account
+from host_group import HostGroup, HostGroups, normalize_host
+from instance import Instance
+
+
+class TestHostGroup(unittest.TestCase):
+    """HostGroup test case."""
+
+    def test_normalize_host(self):
+        """Case, default port and trailing dots don't matter."""
+        self.assertEqual(normalize_host('Lemmy.World:443'), 'lemmy.world')
+        self.assertEqual(normalize_host('lemmy.world.'), 'lemmy.world')
+        self.assertEqual(normalize_host('lemmy.test:8536'), 'lemmy.test:8536')
+
+    def test_resolve_once(self):
+        """Later lookups of the same actor reuse the first answer."""
+        group = HostGroup('lemmy.test')
+        calls = []
+
+        def lookup():
+            calls.append(1)
+            return 42
+
+        for _ in range(3):
+            self.assertEqual(
+                group.resolve('community', 'https://a.test/c/x', lookup), 42)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((group.lookups, group.shared), (1, 2))
+
+    def test_failures_not_remembered(self):
+        """A failed lookup is tried again next time."""
+        group = HostGroup('lemmy.test')
+        answers = iter([None, 7])
+        self.assertIsNone(group.resolve('person', 'https://a.test/u/y',
+                                        lambda: next(answers)))
+        self.assertEqual(group.resolve('person', 'https://a.test/u/y',
+                                       lambda: next(answers)), 7)
+
+    def test_reset(self):
+        """A reset forgets the IDs and counts but keeps the accounts."""
+        groups = HostGroups()
+        group = groups.join('lemmy.test', 'Main')
+        group.resolve('community', 'https://a.test/c/x', lambda: 42)
+        groups.reset()
+        self.assertEqual((group.lookups, group.shared), (0, 0))
+        self.assertEqual(group.resolve('community', 'https://a.test/c/x',
+                                       lambda: 43), 43)
+        self.assertEqual(group.accounts, ['Main'])
+
+    def test_concurrent_lookups(self):
+        """Accounts asking at the same time wait for one lookup."""
+        group = HostGroup('lemmy.test')
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def lookup():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 9
+
+        def resolve():
+            results.append(group.resolve('community', 'https://a.test/c/x',
+                                         lookup))
+
+        threads = [threading.Thread(target=resolve) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [9, 9, 9, 9])
+        self.assertEqual(len(calls), 1)
+
+    def test_waiters_retry_failed_lookup(self):
+        """Accounts waiting for a lookup that failed try it themselves."""
+        group = HostGroup('lemmy.test')
+        started = threading.Event()
+        release = threading.Event()
+        answers = iter([None, 5])
+        results = []
+
+        def lookup():
+            started.set()
+            release.wait(5)
+            return next(answers)
+
+        def resolve():
+            results.append(group.resolve('person', 'https://a.test/u/y',
+                                         lookup))
+
+        threads = [threading.Thread(target=resolve) for _ in range(3)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(sorted(results, key=str), [5, 5, None])
+        self.assertEqual(group.lookups, 2)
+
+    def test_instances_share_group(self):
+        """Accounts on the same site share one group and rate limiter."""
+        groups = HostGroups()
+        first = Instance(Account('One', 'https://Share.Test/', 'a', 'b'),
+                         host_groups=groups)
+        second = Instance(Account('Two', 'share.test', 'c', 'd'),
+                          host_groups=groups)
+        other = Instance(Account('Three', 'other.test', 'e', 'f'),
+                         host_groups=groups)
+        self.assertIs(first.host_group, second.host_group)
+        self.assertIs(first.rate_limiter, second.rate_limiter)
+        self.assertIsNot(first.host_group, other.host_group)
+        self.assertEqual(first.host_group.accounts, ['One', 'Two'])
+        self.assertEqual(len(groups), 2)
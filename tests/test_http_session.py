@@ -0,0 +1,53 @@
+"""Unit tests for http_session.py"""
+import unittest
+
+import requests
+
+from account import Account
+from http_session import HttpOptions, SessionPool, make_session
+from instance import Instance
+from tests.fakes import FakeSession
+
+
+class TestHttpSession(unittest.TestCase):
+    """make_session and SessionPool test case."""
+
+    def test_pool_size(self):
+        """Both schemes get an adapter with a pool of the given size."""
+        session = make_session(HttpOptions(pool_size=3))
+        for url in ('https://a.test/', 'http://127.0.0.1/'):
+            adapter = session.get_adapter(url)
+            self.assertEqual(adapter._pool_connections, 3)
+            self.assertEqual(adapter._pool_maxsize, 3)
+        session.close()
+
+    def test_keep_alive(self):
+        """Without keep-alive every request asks to close the connection."""
+        request = requests.Request('GET', 'https://a.test/')
+        session = make_session(HttpOptions())
+        self.assertEqual(
+            session.prepare_request(request).headers['Connection'],
+            'keep-alive')
+        session = make_session(HttpOptions(keep_alive=False))
+        self.assertEqual(
+            session.prepare_request(request).headers['Connection'], 'close')
+
+    def test_timeout_passed_on(self):
+        """Requests get the (connect, read) timeout of the options."""
+        options = HttpOptions(connect_timeout=1.5, read_timeout=7.0)
+        self.assertEqual(options.timeout, (1.5, 7.0))
+        instance = Instance(Account('Test', 'lemmy.test', 'user', 'pw'),
+                            http_options=options)
+        instance.session = FakeSession([200])
+        instance._request('GET', 'site')
+        self.assertEqual(instance.session.sent[0]['timeout'], (1.5, 7.0))
+
+    def test_pool_per_host(self):
+        """Each host gets one session until the pool is closed."""
+        pool = SessionPool(HttpOptions())
+        first = pool.get('a.test')
+        self.assertIs(pool.get('a.test'), first)
+        self.assertIsNot(pool.get('b.test'), first)
+        pool.close()
+        self.assertIsNot(pool.get('a.test'), first)
+        pool.close()
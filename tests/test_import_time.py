@@ -0,0 +1,91 @@
+"""Guards the startup cost of lemmy_sync against regressions"""
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+SRC = Path(os.path.dirname(__file__), '..', 'src').resolve()
+
+# Modules that must not be imported before there's work to do.
+HEAVY_MODULES = ('requests', 'urllib3', 'instance', 'group_sync',
+                 'sync_plan', 'http.server', 'concurrent.futures',
+                 'sqlite3', 'lem_types.myuserinfo')
+
+
+def imported_modules(statement: str) -> set[str]:
+    """Runs a statement in a fresh interpreter and lists its new modules.
+
+    Args:
+        statement (str): Python statement to run
+
+    Returns:
+        set[str]: Modules imported after interpreter startup
+    """
+    code = ('import sys\n'
+            'before = set(sys.modules)\n'
+            f'{statement}\n'
+            'print("\\n".join(set(sys.modules) - before))')
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC,
+                            capture_output=True, text=True, check=True,
+                            env={**os.environ, 'PYTHONPATH': str(SRC)})
+    return set(result.stdout.split())
+
+
+def import_time(module: str) -> float:
+    """Times an import in a fresh interpreter with -X importtime.
+
+    Args:
+        module (str): Module to import
+
+    Returns:
+        float: Best cumulative import time of three runs in milliseconds
+    """
+    times = list()
+    for _ in range(3):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=SRC, capture_output=True, text=True, check=True,
+            env={**os.environ, 'PYTHONPATH': str(SRC)})
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith('import time:'):
+                continue
+            _, cumulative, name = line.split('|')
+            if name.strip() == module and not name.startswith('  '):
+                times.append(int(cumulative) / 1000)
+    return min(times)
+
+
+class TestImportTime(unittest.TestCase):
+    """Lazy import test case."""
+
+    def test_entry_point_is_light(self):
+        """Importing lemmy_sync doesn't pull in the HTTP stack."""
+        modules = imported_modules('import lemmy_sync')
+        self.assertIn('lemmy_sync', modules)
+        self.assertFalse(modules & set(HEAVY_MODULES))
+
+    def test_entry_point_import_time(self):
+        """Importing lemmy_sync costs less than importing requests alone."""
+        elapsed = import_time('lemmy_sync')
+        self.assertLess(elapsed, import_time('requests'))
+        self.assertLess(elapsed, 150)
+
+    def test_missing_config_exits_early(self):
+        """A run without a config exits before importing the HTTP stack."""
+        modules = imported_modules(
+            'import lemmy_sync\n'
+            'try:\n'
+            '    lemmy_sync.main(["--config", "missing.ini",'
+            ' "--log-file", ""])\n'
+            'except SystemExit:\n'
+            '    pass')
+        self.assertFalse(modules & set(HEAVY_MODULES))
+
+    def test_lem_types_are_lazy(self):
+        """Only the lem_types modules that are used get imported."""
+        modules = imported_modules(
+            'from lem_types import SaveUserSettings')
+        self.assertIn('lem_types.saveusersettings', modules)
+        self.assertNotIn('lem_types.myuserinfo', modules)
@@ -0,0 +1,73 @@
+"""Unit tests for instance.py"""
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from account import Account
+from actor_index import FOLLOWS
+from instance import Instance
+from resolve_cache import ResolveCache
+from tests.mock_lemmy import MockLemmy
+
+
+class TestInstance(unittest.TestCase):
+    """Instance test case."""
+
+    def site_url(self, site: str) -> str:
+        """Site URL an instance uses for a config's site."""
+        return Instance(Account('Test', site, 'user', 'password'))._site_url
+
+    def test_site_url_https(self):
+        """Sites use https whatever the config says."""
+        self.assertEqual(self.site_url('lemmy.ml'), 'https://lemmy.ml')
+        self.assertEqual(self.site_url('https://lemmy.ml/'),
+                         'https://lemmy.ml')
+        self.assertEqual(self.site_url('http://lemmy.ml'), 'https://lemmy.ml')
+
+    def test_site_url_loopback(self):
+        """Only servers on this machine can be reached over plain http."""
+        self.assertEqual(self.site_url('http://127.0.0.1:8536'),
+                         'http://127.0.0.1:8536')
+        self.assertEqual(self.site_url('http://localhost:8536'),
+                         'http://localhost:8536')
+        self.assertEqual(self.site_url('https://localhost:8536'),
+                         'https://localhost:8536')
+
+    def test_unparsed_site_response_read_again(self):
+        """A site response that failed to parse isn't taken as unchanged."""
+        with MockLemmy() as server:
+            user = server.add_user('main', follows=['https://a.test/c/one'])
+            instance = Instance(Account('Test', server.url, 'main',
+                                        'password'))
+            instance.login()
+            instance.get_site_response()
+            user.follows.add('https://a.test/c/two')
+            with patch('instance.MyUserInfo.from_dict',
+                       side_effect=TypeError('bad response')):
+                instance.get_site_response()
+            # Not synced from the user info of the older read.
+            self.assertFalse(instance.is_ready)
+            instance.get_site_response()
+            instance.close()
+        self.assertTrue(instance.actor_index.has(FOLLOWS,
+                                                 'https://a.test/c/two'))
+
+    def test_stale_resolved_id_dropped(self):
+        """A cached ID the instance rejects is resolved again next time."""
+        url = 'https://a.test/c/linux'
+        with tempfile.TemporaryDirectory() as tmp_dir, MockLemmy() as server:
+            server.add_user('main')
+            cache = ResolveCache(Path(tmp_dir, 'cache.sqlite3'))
+            instance = Instance(Account('Test', server.url, 'main',
+                                        'password'), resolve_cache=cache)
+            # An ID the mock instance never handed out.
+            cache.set(instance.host, url, 1)
+            instance.login()
+            instance.get_site_response()
+            self.assertFalse(instance.subscribe_to_community(url))
+            self.assertEqual(len(cache), 0)
+            self.assertTrue(instance.subscribe_to_community(url))
+            self.assertEqual(server.users['main'].follows, {url})
+            instance.close()
+            cache.close()
@@ -0,0 +1,71 @@
+"""Unit tests for the lem_types package."""
+import json
+import os
+import unittest
+from pathlib import Path
+
+from lem_types import (Community, CommunityFollowerView, LocalUser,
+                       MyUserInfo, Person, SaveUserSettings)
+
+
+class TestMyUserInfo(unittest.TestCase):
+    """MyUserInfo parsing test case."""
+
+    def setUp(self):
+        site_response = Path(os.path.dirname(__file__),
+                             'test_files',
+                             'site_response.json')
+        with open(site_response, encoding='utf-8') as file:
+            self.my_user = json.load(file)['my_user']
+
+    def test_from_dict(self):
+        """my_user is parsed into the typed classes."""
+        myuserinfo = MyUserInfo.from_dict(self.my_user)
+
+        self.assertIsInstance(myuserinfo.follows[0], CommunityFollowerView)
+        self.assertIsInstance(myuserinfo.follows[0].community, Community)
+        self.assertEqual(myuserinfo.follows[1].community.actor_id,
+                         'https://lemmy.ml/c/linuxgaming')
+        self.assertIsInstance(myuserinfo.person_blocks[0].target, Person)
+        self.assertEqual(myuserinfo.person_blocks[0].target.name, 'troll')
+        self.assertEqual(myuserinfo.local_user_view.local_user.theme,
+                         'darkly')
+        self.assertEqual(myuserinfo.discussion_languages, [0, 37])
+
+    def test_missing_keys(self):
+        """Keys an instance didn't send become None, even enum fields."""
+        local_user = dict(self.my_user['local_user_view']['local_user'])
+        del local_user['default_sort_type']
+        del local_user['theme']
+        parsed = LocalUser.from_dict(local_user)
+        self.assertIsNone(parsed.default_sort_type)
+        self.assertIsNone(parsed.theme)
+
+    def test_slots(self):
+        """The parsed classes use slots instead of a __dict__."""
+        myuserinfo = MyUserInfo.from_dict(self.my_user)
+        self.assertFalse(hasattr(myuserinfo.follows[0].community,
+                                 '__dict__'))
+
+    def test_user_settings(self):
+        """SaveUserSettings can be filled from the parsed classes."""
+        myuserinfo = MyUserInfo.from_dict(self.my_user)
+        settings = SaveUserSettings(auth='token')
+        settings.set_settings(myuserinfo.local_user_view.person,
+                              myuserinfo.local_user_view.local_user)
+
+        self.assertEqual(settings.theme, 'darkly')
+        self.assertEqual(settings.email, 'cool@example.com')
+        payload = settings.paylod()
+        self.assertEqual(payload['auth'], 'token')
+        self.assertNotIn('avatar', payload)
+
+    def test_settings_diff(self):
+        """Only set, copied settings that differ are in the diff."""
+        source = SaveUserSettings(auth='a', theme='darkly', bio='hi',
+                                  avatar='https://a.test/me.png')
+        current = SaveUserSettings(auth='b', theme='litely', bio='hi',
+                                   show_nsfw=True)
+        self.assertEqual(source.diff(current), {'theme': 'darkly'})
+        self.assertEqual(source.diff(source), {})
+        self.assertEqual(source.diff(None), {'theme': 'darkly', 'bio': 'hi'})
@@ -3,7 +3,8 @@ import os
 import unittest
 from pathlib import Path
 
-from src.lemmy_sync import get_accounts
+from account import Account
+from lemmy_sync import get_accounts
 
 
 class TestLemmySync(unittest.TestCase):
@@ -11,14 +12,14 @@ class TestLemmySync(unittest.TestCase):
 
     def test_get_accounts(self):
         """Test get_accounts function."""
-        expected_results = {'Main Account':
-                            {'site': 'https://sh.itjust.works',
-                             'user': 'Imauser',
-                             'password': 'apasswod'},
-                            'Account 2':
-                            {'site': 'https://lemmy.ml',
-                             'user': 'cooluser',
-                             'password': 'badpassword'}}
+        expected_results = [Account(account='Main Account',
+                                    site='https://sh.itjust.works',
+                                    user='Imauser',
+                                    password='apasswod'),
+                            Account(account='Account 2',
+                                    site='https://lemmy.ml',
+                                    user='cooluser',
+                                    password='badpassword')]
 
         test_config = Path(os.path.dirname(__file__),
                            'test_files',
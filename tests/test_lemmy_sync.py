@@ -0,0 +1,280 @@
+"""End to end tests of lemmy_sync.main against mock Lemmy instances"""
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from time import sleep
+from types import SimpleNamespace
+
+from lemmy_sync import main, run_concurrently
+from log_config import setup_logging, shutdown_logging
+from tests.benchmark import write_config
+from tests.mock_lemmy import MockLemmy, MockOptions
+
+
+class TestRunConcurrently(unittest.TestCase):
+    """run_concurrently test case."""
+
+    def make_instances(self, count: int) -> list[SimpleNamespace]:
+        """Makes stand-ins with just the account name that gets logged."""
+        return [SimpleNamespace(account=SimpleNamespace(account=f'{number}'))
+                for number in range(count)]
+
+    def test_max_workers(self):
+        """No more than max_workers instances are worked on at once."""
+        lock = threading.Lock()
+        running = []
+        most = []
+        done = []
+
+        def work(instance):
+            with lock:
+                running.append(instance)
+                most.append(len(running))
+            sleep(0.01)
+            with lock:
+                running.remove(instance)
+                done.append(instance)
+
+        instances = self.make_instances(10)
+        run_concurrently(work, instances, max_workers=3)
+        self.assertEqual(len(done), 10)
+        self.assertEqual(max(most), 3)
+
+    def test_error_isolated(self):
+        """An instance that raises doesn't stop the others."""
+        done = []
+
+        def work(instance):
+            if instance.account.account == '2':
+                raise RuntimeError('broken')
+            done.append(instance.account.account)
+
+        run_concurrently(work, self.make_instances(5), max_workers=2)
+        self.assertEqual(sorted(done), ['0', '1', '3', '4'])
+
+
+class TestMain(unittest.TestCase):
+    """lemmy_sync.main test case."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = Path(self.tmp_dir.name, 'test.toml')
+        self.servers = list()
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+        # Stop writing to the log file in the temporary folder.
+        setup_logging(log_file=None)
+        self.tmp_dir.cleanup()
+
+    def start(self, options: MockOptions | None = None) -> MockLemmy:
+        """Starts a mock instance that is stopped after the test."""
+        server = MockLemmy(options, domain=f'mock{len(self.servers)}.test')
+        self.servers.append(server.start())
+        return server
+
+    def sync(self, *args: str) -> None:
+        """Runs a sync of the config with fast retries."""
+        main(['--config', str(self.config), '--state-dir', self.tmp_dir.name,
+              '--log-file', str(Path(self.tmp_dir.name, 'sync.log')),
+              '--no-token-cache', '--rate', '1000', '--burst', '1000',
+              *args])
+
+    def test_sync(self):
+        """Every account ends up with everything, settings from the source."""
+        first = self.start()
+        second = self.start()
+        first.add_user('main', follows=['https://a.test/c/linux'],
+                       theme='darkly')
+        first.add_user('alt', follows=['https://b.test/c/memes'],
+                       person_blocks=['https://b.test/u/troll'])
+        second.add_user('remote',
+                        community_blocks=['https://c.test/c/spam'])
+        write_config(self.config, [('Main', first.url, 'main'),
+                                   ('Alt', first.url, 'alt'),
+                                   ('Remote', second.url, 'remote')])
+        self.sync()
+
+        for user in (*first.users.values(), *second.users.values()):
+            self.assertEqual(user.follows, {'https://a.test/c/linux',
+                                            'https://b.test/c/memes'})
+            self.assertEqual(user.community_blocks, {'https://c.test/c/spam'})
+            self.assertEqual(user.person_blocks, {'https://b.test/u/troll'})
+            self.assertEqual(user.settings['theme'], 'darkly')
+        # Only the setting that differs is sent.
+        self.assertEqual([set(params) for params in second.saved_settings],
+                         [{'theme', 'auth'}])
+        # Both accounts on the first instance need the spam block, but it
+        # is only looked up once.
+        self.assertEqual(first.requests['resolve_object'], 4)
+
+        # Nothing changed, so the next run only reads.
+        first.requests.clear()
+        self.sync()
+        self.assertEqual(set(first.requests), {'user/login', 'site'})
+
+    def test_daemon(self):
+        """Later runs reuse the logins and send nothing new."""
+        server = self.start()
+        server.add_user('main', follows=['https://a.test/c/linux'])
+        server.add_user('alt')
+        write_config(self.config, [('Main', server.url, 'main'),
+                                   ('Alt', server.url, 'alt')])
+        metrics_file = Path(self.tmp_dir.name, 'metrics.json')
+        self.sync('--daemon', '--interval', '0.01', '--max-runs', '3',
+                  '--metrics-json', str(metrics_file))
+        self.assertEqual(server.users['alt'].follows,
+                         {'https://a.test/c/linux'})
+        self.assertEqual(server.requests['user/login'], 2)
+        self.assertEqual(server.requests['community/follow'], 1)
+        # One read per account per run, plus the re-read after syncing.
+        self.assertEqual(server.requests['site'], 8)
+        # The metrics only cover the last run, which just read both.
+        metrics = json.loads(metrics_file.read_text(encoding='utf-8'))
+        self.assertEqual({call['endpoint']: call['count']
+                          for call in metrics['calls']}, {'site': 2})
+
+    def test_daemon_login_rejected(self):
+        """A failed login after the saved one was rejected is tried again."""
+        server = self.start()
+        server.add_user('main', follows=['https://a.test/c/linux'])
+        write_config(self.config, [('Main', server.url, 'main')])
+        args = ['--config', str(self.config), '--state-dir',
+                self.tmp_dir.name, '--log-file',
+                str(Path(self.tmp_dir.name, 'sync.log')), '--rate', '1000',
+                '--burst', '1000']
+        # Saves the login in the token cache.
+        main(args)
+        server.revoke('main')
+        server.failing_logins = 1
+        main([*args, '--daemon', '--interval', '0.01', '--max-runs', '3'])
+        # The first login, the one that failed and the one on the next run.
+        self.assertEqual(server.requests['user/login'], 3)
+        self.assertEqual(server.failing_logins, 0)
+
+    def test_unchanged_site_responses(self):
+        """Unchanged accounts aren't parsed or planned again."""
+        server = self.start(MockOptions(etags=True))
+        server.add_user('main', follows=['https://a.test/c/linux'])
+        server.add_user('alt')
+        write_config(self.config, [('Main', server.url, 'main'),
+                                   ('Alt', server.url, 'alt')])
+        log_file = Path(self.tmp_dir.name, 'sync.log')
+        self.sync('--daemon', '--interval', '0.01', '--max-runs', '3',
+                  '--log-file', str(log_file))
+        # Write out the queued records before reading the log.
+        shutdown_logging()
+        self.assertEqual(server.requests['community/follow'], 1)
+        # Only the first read of each account and the re-read of the one
+        # that got the follow weren't a HTTP 304.
+        self.assertEqual(server.requests['site'], 8)
+        self.assertEqual(server.not_modified, 5)
+        log = log_file.read_text(encoding='utf-8')
+        self.assertEqual(log.count('No account changed'), 2)
+
+    def test_fresh_site_responses(self):
+        """Site responses aren't asked for again while they're fresh."""
+        server = self.start(MockOptions(cache_control='private, max-age=60'))
+        server.add_user('main', follows=['https://a.test/c/linux'])
+        server.add_user('alt')
+        write_config(self.config, [('Main', server.url, 'main'),
+                                   ('Alt', server.url, 'alt')])
+        self.sync('--daemon', '--interval', '0.01', '--max-runs', '3')
+        self.assertEqual(server.users['alt'].follows,
+                         {'https://a.test/c/linux'})
+        # Only the account that was changed is read again.
+        self.assertEqual(server.requests['site'], 3)
+
+    def test_export_import(self):
+        """A snapshot of one account can be applied to another."""
+        server = self.start()
+        server.add_user('main', follows=['https://a.test/c/linux'],
+                        person_blocks=['https://a.test/u/troll'],
+                        theme='darkly')
+        server.add_user('new')
+        write_config(self.config, [('Main', server.url, 'main'),
+                                   ('New', server.url, 'new')])
+        folder = Path(self.tmp_dir.name, 'snapshots')
+        self.sync('--export', str(folder), '--to', 'Main')
+        self.assertEqual(server.requests['community/follow'], 0)
+
+        self.sync('--import', str(folder / 'benchmark-Main.jsonl.gz'),
+                  '--to', 'New')
+        new = server.users['new']
+        self.assertEqual(new.follows, {'https://a.test/c/linux'})
+        self.assertEqual(new.person_blocks, {'https://a.test/u/troll'})
+        self.assertEqual(new.settings['theme'], 'darkly')
+
+    def test_max_actions(self):
+        """A backlog is sent a few actions per run, blocks first."""
+        server = self.start()
+        follows = [f'https://a.test/c/{number}' for number in range(3)]
+        server.add_user('main', follows=follows,
+                        person_blocks=['https://a.test/u/troll'])
+        server.add_user('new')
+        write_config(self.config, [('Main', server.url, 'main'),
+                                   ('New', server.url, 'new')])
+        new = server.users['new']
+
+        self.sync('--max-actions', '2')
+        self.assertEqual(new.person_blocks, {'https://a.test/u/troll'})
+        self.assertEqual(len(new.follows), 1)
+        state = json.loads(Path(self.tmp_dir.name, 'sync_state',
+                                'benchmark.json').read_text(encoding='utf-8'))
+        self.assertEqual(len(state['pending']['New']), 2)
+
+        self.sync('--max-actions', '2')
+        self.assertEqual(new.follows, set(follows))
+        self.sync('--max-actions', '2')
+        self.assertEqual(server.requests['community/follow'], 3)
+
+    def test_shards(self):
+        """Groups synced in separate processes end up with one report."""
+        first = self.start()
+        second = self.start()
+        first.add_user('main', follows=['https://a.test/c/linux'])
+        first.add_user('alt')
+        second.add_user('other', person_blocks=['https://a.test/u/troll'])
+        second.add_user('other_alt')
+        folder = Path(self.tmp_dir.name, 'groups')
+        folder.mkdir()
+        write_config(folder / 'one.toml', [('Main', first.url, 'main'),
+                                           ('Alt', first.url, 'alt')],
+                     name='one')
+        write_config(folder / 'two.toml',
+                     [('Other', second.url, 'other'),
+                      ('Other Alt', second.url, 'other_alt')], name='two')
+        self.config = folder
+        report = Path(self.tmp_dir.name, 'report.json')
+        plan = Path(self.tmp_dir.name, 'plan.json')
+        self.sync('--shards', '2', '--report', str(report),
+                  '--plan-output', str(plan))
+
+        self.assertEqual(first.users['alt'].follows,
+                         {'https://a.test/c/linux'})
+        self.assertEqual(second.users['other_alt'].person_blocks,
+                         {'https://a.test/u/troll'})
+        data = json.loads(report.read_text(encoding='utf-8'))
+        self.assertEqual((data['shards'], data['accounts'], data['actions']),
+                         (2, 4, 2))
+        self.assertEqual(data['failed_shards'], [])
+        # Every shard's groups end up in the one plan file.
+        plans = json.loads(plan.read_text(encoding='utf-8'))
+        self.assertEqual(sorted(plans), ['one', 'two'])
+        self.assertTrue(Path(self.tmp_dir.name,
+                             'rate_limits.sqlite3').exists())
+
+    def test_flaky_instance(self):
+        """Injected 503 errors are retried until everything is synced."""
+        flaky = self.start(MockOptions(error_rate=0.2, seed=1))
+        flaky.add_user('main', follows=[f'https://a.test/c/{number}'
+                                        for number in range(10)])
+        flaky.add_user('alt')
+        write_config(self.config, [('Main', flaky.url, 'main'),
+                                   ('Alt', flaky.url, 'alt')])
+        self.sync('--retries', '10')
+        self.assertEqual(flaky.users['alt'].follows,
+                         flaky.users['main'].follows)
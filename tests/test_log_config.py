@@ -0,0 +1,60 @@
+"""Unit tests for log_config.py"""
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+
+from log_config import (ROOT_LOGGER, configure_logging, setup_logging,
+                        shutdown_logging)
+
+
+class TestLogConfig(unittest.TestCase):
+    """Logging setup test case."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_file = Path(self.tmp_dir.name, 'test.log')
+
+    def tearDown(self):
+        # Go back to logging without a file for the other tests.
+        shutdown_logging()
+        setup_logging(log_file=None)
+        self.tmp_dir.cleanup()
+
+    def test_no_duplicate_handlers(self):
+        """Loggers share one queue handler no matter how often they're made."""
+        setup_logging(log_file=self.log_file)
+        for _ in range(3):
+            configure_logging('Main Account')
+            configure_logging('Account 2')
+        setup_logging(log_file=self.log_file)
+        self.assertEqual(len(logging.getLogger(ROOT_LOGGER).handlers), 1)
+        self.assertFalse(
+            logging.getLogger(f'{ROOT_LOGGER}.Main Account').handlers)
+
+    def test_levels_and_context(self):
+        """Records carry the account and respect the file level."""
+        setup_logging(console_level='CRITICAL', file_level='INFO',
+                      log_file=self.log_file)
+        logger = configure_logging('Main Account')
+        logger.debug('hidden')
+        logger.info('shown')
+        shutdown_logging()
+        text = self.log_file.read_text(encoding='utf-8')
+        self.assertIn('INFO    : Main Account: ', text)
+        self.assertIn('shown', text)
+        self.assertNotIn('hidden', text)
+
+    def test_group_and_host(self):
+        """Accounts with the same name in two groups can be told apart."""
+        setup_logging(console_level='CRITICAL', log_file=self.log_file)
+        configure_logging('Main Account', group='one',
+                          host='lemmy.ml').info('first')
+        configure_logging('Main Account', group='two',
+                          host='lemmy.ml').info('second')
+        configure_logging('daemon').info('third')
+        shutdown_logging()
+        text = self.log_file.read_text(encoding='utf-8')
+        self.assertIn('Main Account [group=one host=lemmy.ml]: ', text)
+        self.assertIn('Main Account [group=two host=lemmy.ml]: ', text)
+        self.assertIn('daemon: ', text)
@@ -0,0 +1,89 @@
+"""Unit tests for metrics.py and the metrics recorded by Instance._request"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import requests
+
+from account import Account
+from instance import Instance
+from metrics import Metrics
+from retry import RetryOptions, RetryPolicy
+from tests.fakes import FakeSession
+
+
+class TestMetrics(unittest.TestCase):
+    """Metrics test case."""
+
+    def test_record(self):
+        """Calls are totalled per host and endpoint."""
+        metrics = Metrics()
+        metrics.record('a.test', 'site', 200, 0.2, size=100)
+        metrics.record('a.test', 'site', 502, 1.5, retries=3)
+        metrics.record('a.test', 'resolve_object', None, 0.01)
+        calls = metrics.snapshot()
+        site = calls[('a.test', 'site')]
+        self.assertEqual((site.count, site.errors, site.retries, site.bytes),
+                         (2, 1, 3, 100))
+        self.assertEqual(site.statuses, {'200': 1, '502': 1})
+        self.assertEqual(site.quantile(0.5), 0.25)
+        self.assertEqual(site.quantile(1), 1.5)
+        self.assertEqual(calls[('a.test', 'resolve_object')].statuses,
+                         {'error': 1})
+
+    def test_merge(self):
+        """Merged stats add up with the collector's own."""
+        metrics, other = Metrics(), Metrics()
+        metrics.record('a.test', 'site', 200, 0.2)
+        other.record('a.test', 'site', 503, 3.0, retries=2)
+        other.record('b.test', 'site', 200, 0.01)
+        metrics.merge(other.snapshot(), started=metrics.started - 5)
+        calls = metrics.snapshot()
+        site = calls[('a.test', 'site')]
+        self.assertEqual((site.count, site.errors, site.retries), (2, 1, 2))
+        self.assertEqual(site.statuses, {'200': 1, '503': 1})
+        self.assertEqual(site.max_latency, 3.0)
+        self.assertEqual(sum(site.buckets), 2)
+        self.assertEqual(calls[('b.test', 'site')].count, 1)
+        self.assertGreaterEqual(metrics.to_dict()['duration'], 5)
+
+    def test_reset(self):
+        """A reset starts a new run with no calls."""
+        metrics = Metrics()
+        metrics.started -= 60
+        metrics.record('a.test', 'site', 200, 0.2)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {})
+        self.assertLess(metrics.to_dict()['duration'], 60)
+
+    def test_exports(self):
+        """The JSON and Prometheus files have every call."""
+        metrics = Metrics()
+        metrics.record('a.test', 'site', 200, 0.2, size=100)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = Path(tmp_dir, 'metrics.json')
+            prom_path = Path(tmp_dir, 'metrics.prom')
+            metrics.write_json(json_path)
+            metrics.write_prometheus(prom_path)
+            data = json.loads(json_path.read_text(encoding='utf-8'))
+            text = prom_path.read_text(encoding='utf-8')
+        self.assertEqual(data['calls'][0]['endpoint'], 'site')
+        self.assertEqual(data['calls'][0]['latency']['max'], 0.2)
+        self.assertIn('lemmy_sync_requests_total{host="a.test",'
+                      'endpoint="site",status="200"} 1', text)
+        self.assertIn('lemmy_sync_request_duration_seconds_bucket{'
+                      'host="a.test",endpoint="site",le="+Inf"} 1', text)
+
+    def test_instance_records_calls(self):
+        """A call and its retries are recorded once."""
+        metrics = Metrics()
+        instance = Instance(
+            Account('Test', 'https://metrics.test', 'user', 'password'),
+            retry_policy=RetryPolicy(RetryOptions(base_delay=0)),
+            metrics=metrics)
+        instance.session = FakeSession([requests.Timeout(), 503, 200])
+        instance._request('GET', 'site')
+        site = metrics.snapshot()[('metrics.test', 'site')]
+        self.assertEqual((site.count, site.retries, site.bytes), (1, 2, 12))
+        self.assertEqual(site.statuses, {'200': 1})
@@ -0,0 +1,49 @@
+"""Unit tests for pipeline.py"""
+import unittest
+from time import monotonic, sleep
+
+from pipeline import run_pipeline
+
+
+class TestRunPipeline(unittest.TestCase):
+    """run_pipeline test case."""
+
+    def test_results_in_order(self):
+        """Every item is acted on in order, unresolved ones are False."""
+        acted = []
+
+        def act(item, local_id):
+            acted.append((item, local_id))
+            return True
+
+        results = run_pipeline(['a', 'bb', 'ccc', 'x'],
+                               lambda item: None if item == 'x' else len(item),
+                               act, queue_size=1)
+
+        self.assertEqual(acted, [('a', 1), ('bb', 2), ('ccc', 3)])
+        self.assertEqual(results, {'a': True, 'bb': True, 'ccc': True,
+                                   'x': False})
+
+    def test_stages_overlap(self):
+        """Resolving runs at the same time as the actions."""
+        def slow_resolve(_item):
+            sleep(0.05)
+            return 1
+
+        def slow_act(_item, _local_id):
+            sleep(0.05)
+            return True
+
+        start = monotonic()
+        run_pipeline([str(i) for i in range(10)], slow_resolve, slow_act)
+        # One after another would take a full second.
+        self.assertLess(monotonic() - start, 0.85)
+
+    def test_action_error_stops_resolving(self):
+        """An error in the action stage doesn't leave the resolver hanging."""
+        def act(_item, _local_id):
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            run_pipeline([str(i) for i in range(100)], lambda _item: 1, act,
+                         queue_size=2)
@@ -0,0 +1,107 @@
+"""Unit tests for rate_limiter.py"""
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from time import monotonic
+
+from rate_limiter import (RateLimitOptions, SharedTokenBucket, TokenBucket,
+                          get_bucket, parse_retry_after)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """TokenBucket test case."""
+
+    def test_burst_is_not_delayed(self):
+        """Tokens up to the burst are handed out right away."""
+        bucket = TokenBucket(rate=1, burst=5)
+        start = monotonic()
+        for _ in range(5):
+            self.assertEqual(bucket.acquire(), 0.0)
+        self.assertLess(monotonic() - start, 0.1)
+
+    def test_empty_bucket_waits_for_rate(self):
+        """Once empty, tokens come at the configured rate."""
+        bucket = TokenBucket(rate=20, burst=1)
+        bucket.acquire()
+        self.assertGreater(bucket.acquire(), 0.0)
+
+    def test_pause_holds_tokens(self):
+        """Pausing holds every request until the pause is over."""
+        bucket = TokenBucket(rate=1000, burst=10)
+        bucket.pause(0.1)
+        self.assertGreaterEqual(bucket.acquire(), 0.09)
+
+    def test_bucket_shared_per_host(self):
+        """The same host always gets the same bucket."""
+        options = RateLimitOptions()
+        self.assertIs(get_bucket('lemmy.test', options),
+                      get_bucket('lemmy.test', options))
+        self.assertIsNot(get_bucket('lemmy.test', options),
+                         get_bucket('other.test', options))
+
+    def test_bucket_follows_options(self):
+        """A different rate or burst for the same host isn't ignored."""
+        bucket = get_bucket('options.test', RateLimitOptions(rate=2, burst=3))
+        faster = get_bucket('options.test', RateLimitOptions(rate=50, burst=3))
+        self.assertIsNot(faster, bucket)
+        self.assertEqual((faster.rate, faster.burst), (50, 3))
+
+
+class TestSharedTokenBucket(unittest.TestCase):
+    """SharedTokenBucket test case."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name, 'rate_limits.sqlite3')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_tokens_shared_through_file(self):
+        """Buckets for the same host in the same file share their tokens."""
+        first = SharedTokenBucket(self.path, 'lemmy.test', rate=20, burst=2)
+        second = SharedTokenBucket(self.path, 'lemmy.test', rate=20, burst=2)
+        other = SharedTokenBucket(self.path, 'other.test', rate=20, burst=2)
+        self.assertEqual(first.acquire(), 0.0)
+        self.assertEqual(second.acquire(), 0.0)
+        self.assertEqual(other.acquire(), 0.0)
+        self.assertGreater(first.acquire(), 0.0)
+
+    def test_pause_is_shared(self):
+        """A pause from one bucket holds the others too."""
+        first = SharedTokenBucket(self.path, 'lemmy.test', rate=1000,
+                                  burst=10)
+        second = SharedTokenBucket(self.path, 'lemmy.test', rate=1000,
+                                   burst=10)
+        first.pause(0.1)
+        self.assertGreaterEqual(second.acquire(), 0.09)
+
+    def test_get_bucket_with_shared_path(self):
+        """A shared path gives a bucket backed by that file."""
+        options = RateLimitOptions(shared_path=self.path)
+        bucket = get_bucket('shared.test', options)
+        self.assertIsInstance(bucket, SharedTokenBucket)
+        self.assertIs(get_bucket('shared.test', options), bucket)
+        self.assertIsInstance(get_bucket('shared.test', RateLimitOptions()),
+                              TokenBucket)
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    """parse_retry_after test case."""
+
+    def test_seconds(self):
+        """Plain seconds are returned as a float."""
+        self.assertEqual(parse_retry_after('30'), 30.0)
+
+    def test_http_date(self):
+        """HTTP dates are turned into seconds from now."""
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+        seconds = parse_retry_after(format_datetime(retry_at, usegmt=True))
+        self.assertAlmostEqual(seconds, 60, delta=2)
+
+    def test_invalid(self):
+        """Missing or garbage values give None."""
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
@@ -0,0 +1,66 @@
+"""Unit tests for resolve_cache.py"""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from resolve_cache import ResolveCache
+
+
+class TestResolveCache(unittest.TestCase):
+    """ResolveCache test case."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name, 'cache.sqlite3')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hit_and_miss(self):
+        """Stored IDs are found again and counted."""
+        cache = ResolveCache(self.path)
+        self.assertIsNone(cache.get('lemmy.test', 'https://a.test/c/x'))
+        cache.set('lemmy.test', 'https://a.test/c/x', 42)
+        self.assertEqual(cache.get('lemmy.test', 'https://a.test/c/x'), 42)
+        self.assertIsNone(cache.get('other.test', 'https://a.test/c/x'))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        cache.close()
+
+    def test_persists_between_runs(self):
+        """Entries are still there after reopening the file."""
+        cache = ResolveCache(self.path)
+        cache.set('lemmy.test', 'https://a.test/u/y', 7)
+        cache.close()
+        cache = ResolveCache(self.path)
+        self.assertEqual(cache.get('lemmy.test', 'https://a.test/u/y'), 7)
+        cache.close()
+        self.assertTrue(os.path.isfile(self.path))
+
+    def test_remove(self):
+        """Removed entries are gone and no longer counted."""
+        cache = ResolveCache(self.path)
+        cache.set('lemmy.test', 'https://a.test/c/x', 42)
+        cache.remove('lemmy.test', 'https://a.test/c/x')
+        cache.remove('lemmy.test', 'https://a.test/c/missing')
+        self.assertIsNone(cache.get('lemmy.test', 'https://a.test/c/x'))
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_ttl(self):
+        """Expired entries count as misses."""
+        cache = ResolveCache(self.path, ttl=-1)
+        cache.set('lemmy.test', 'https://a.test/c/x', 42)
+        self.assertIsNone(cache.get('lemmy.test', 'https://a.test/c/x'))
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_size_eviction(self):
+        """The oldest entries are dropped once over max_entries."""
+        cache = ResolveCache(self.path, max_entries=10)
+        for i in range(11):
+            cache.set('lemmy.test', f'https://a.test/c/{i}', i)
+        self.assertLessEqual(len(cache), 10)
+        self.assertEqual(cache.get('lemmy.test', 'https://a.test/c/10'), 10)
+        self.assertIsNone(cache.get('lemmy.test', 'https://a.test/c/0'))
+        cache.close()
@@ -0,0 +1,43 @@
+"""Unit tests for response_cache.py"""
+import unittest
+
+from response_cache import CachedResponse, content_hash, parse_cache_control
+
+
+class TestResponseCache(unittest.TestCase):
+    """CachedResponse and helpers test case."""
+
+    def test_content_hash(self):
+        """The hash ignores key order but not values."""
+        self.assertEqual(content_hash({'a': 1, 'b': [1, 2]}),
+                         content_hash({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(content_hash({'a': 1}), content_hash({'a': 2}))
+
+    def test_parse_cache_control(self):
+        """Directives are lower cased, with or without values."""
+        self.assertEqual(parse_cache_control('Private, max-age="60"'),
+                         {'private': None, 'max-age': '60'})
+        self.assertEqual(parse_cache_control(None), {})
+
+    def test_validators(self):
+        """ETag and Last-Modified become conditional request headers."""
+        cached = CachedResponse.from_headers(
+            {'ETag': '"abc"', 'Last-Modified': 'Wed, 21 Oct 2026 07:28:00'
+                                                ' GMT'})
+        self.assertFalse(cached.is_fresh)
+        self.assertEqual(cached.conditional_headers(),
+                         {'If-None-Match': '"abc"',
+                          'If-Modified-Since': 'Wed, 21 Oct 2026 07:28:00'
+                                               ' GMT'})
+        self.assertEqual(CachedResponse().conditional_headers(), {})
+
+    def test_freshness(self):
+        """max-age minus Age is fresh, no-cache and no-store never are."""
+        self.assertTrue(CachedResponse.from_headers(
+            {'Cache-Control': 'max-age=60', 'Age': '30'}).is_fresh)
+        self.assertFalse(CachedResponse.from_headers(
+            {'Cache-Control': 'max-age=60', 'Age': '90'}).is_fresh)
+        self.assertFalse(CachedResponse.from_headers(
+            {'Cache-Control': 'no-cache, max-age=60'}).is_fresh)
+        self.assertIsNone(CachedResponse.from_headers(
+            {'Cache-Control': 'no-store'}))
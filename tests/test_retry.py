@@ -0,0 +1,65 @@
+"""Unit tests for retry.py and the retries in Instance._request"""
+import unittest
+
+import requests
+
+from account import Account
+from instance import Instance
+from retry import RetryOptions, RetryPolicy
+from tests.fakes import FakeSession
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """RetryPolicy test case."""
+
+    def test_max_attempts(self):
+        """No retries once max_attempts is reached."""
+        policy = RetryPolicy(RetryOptions(max_attempts=3))
+        self.assertTrue(policy.should_retry(1))
+        self.assertTrue(policy.should_retry(2))
+        self.assertFalse(policy.should_retry(3))
+
+    def test_budget(self):
+        """The budget is shared and caps the total retries."""
+        policy = RetryPolicy(RetryOptions(budget=2))
+        self.assertTrue(policy.should_retry(1))
+        self.assertTrue(policy.should_retry(1))
+        self.assertFalse(policy.should_retry(1))
+        self.assertEqual(policy.budget_left, 0)
+
+    def test_delay(self):
+        """Delays stay under the exponential cap."""
+        policy = RetryPolicy(RetryOptions(base_delay=1, max_delay=5))
+        for attempt in range(1, 6):
+            self.assertLessEqual(policy.delay(attempt),
+                                 min(5, 2 ** (attempt - 1)))
+
+
+class TestInstanceRetries(unittest.TestCase):
+    """Instance._request retry test case."""
+
+    def make_instance(self, results: list) -> Instance:
+        """Makes an Instance whose session returns the given results."""
+        instance = Instance(
+            Account('Test', 'https://retry.test', 'user', 'password'),
+            retry_policy=RetryPolicy(RetryOptions(base_delay=0)))
+        instance.session = FakeSession(results)
+        return instance
+
+    def test_retries_transient_errors(self):
+        """Timeouts and 5xx responses are retried until a real answer."""
+        instance = self.make_instance([requests.Timeout(), 502, 200])
+        self.assertEqual(instance._request('GET', 'site').status_code, 200)
+        self.assertEqual(instance.session.calls, 3)
+
+    def test_gives_up(self):
+        """The last response is returned once attempts run out."""
+        instance = self.make_instance([500, 500, 500, 500, 200])
+        self.assertEqual(instance._request('GET', 'site').status_code, 500)
+        self.assertEqual(instance.session.calls, 4)
+
+    def test_no_retry_for_client_errors(self):
+        """4xx answers other than 429 are not retried."""
+        instance = self.make_instance([404, 200])
+        self.assertEqual(instance._request('GET', 'site').status_code, 404)
+        self.assertEqual(instance.session.calls, 1)
@@ -0,0 +1,69 @@
+"""Unit tests for scheduler.py"""
+import unittest
+
+from actor_index import COMMUNITY_BLOCKS, FOLLOWS, PERSON_BLOCKS
+from scheduler import action_key, plan_actions, schedule
+from sync_plan import ActionBudget, InstancePlan
+
+
+def make_plan(name: str, follows: list[str] = (),
+              person_blocks: list[str] = (),
+              settings: dict | None = None) -> InstancePlan:
+    """Makes a plan for a made up account."""
+    return InstancePlan(account=name, host='a.test', follows=list(follows),
+                        person_blocks=list(person_blocks),
+                        settings=settings or {})
+
+
+class TestScheduler(unittest.TestCase):
+    """plan_actions and schedule test case."""
+
+    def setUp(self):
+        # Only used as keys, like the Instances they stand in for.
+        self.main, self.alt = object(), object()
+
+    def test_plan_actions_in_priority_order(self):
+        """Blocks come before settings, which come before follows."""
+        plan = make_plan('main', follows=['https://a.test/c/one'],
+                         person_blocks=['https://a.test/u/troll'],
+                         settings={'theme': 'darkly'})
+        plan.community_blocks = ['https://a.test/c/spam']
+        self.assertEqual(plan_actions(plan),
+                         [(PERSON_BLOCKS, 'https://a.test/u/troll'),
+                          (COMMUNITY_BLOCKS, 'https://a.test/c/spam'),
+                          ('settings', None),
+                          (FOLLOWS, 'https://a.test/c/one')])
+
+    def test_no_limit(self):
+        """Without a limit the plans are sent as they are."""
+        plans = {self.main: make_plan('main', follows=['https://a.test/c/1'])}
+        self.assertEqual(schedule(plans, ActionBudget()), (plans, 0))
+
+    def test_budget_by_priority(self):
+        """Blocks of every instance fit before anyone's follows."""
+        plans = {self.main: make_plan('main',
+                                      follows=['https://a.test/c/1',
+                                               'https://a.test/c/2',
+                                               'https://a.test/c/3']),
+                 self.alt: make_plan('alt', follows=['https://a.test/c/4'],
+                                     person_blocks=['https://a.test/u/x'])}
+        chosen, deferred = schedule(plans, ActionBudget(max_actions=3))
+        self.assertEqual(deferred, 2)
+        self.assertEqual(chosen[self.alt].person_blocks,
+                         ['https://a.test/u/x'])
+        # One follow each before a second one for the same account.
+        self.assertEqual(chosen[self.main].follows, ['https://a.test/c/1'])
+        self.assertEqual(chosen[self.alt].follows, ['https://a.test/c/4'])
+        self.assertEqual(plans[self.main].actions, 3)
+
+    def test_oldest_first(self):
+        """Actions left over from earlier runs go before new ones."""
+        plans = {self.main: make_plan('main',
+                                      follows=['https://a.test/c/1',
+                                               'https://a.test/c/2'])}
+        waiting = {self.main: {action_key(FOLLOWS,
+                                          'https://a.test/c/2'): 100.0}}
+        chosen, deferred = schedule(plans, ActionBudget(max_actions=1),
+                                    waiting)
+        self.assertEqual(chosen[self.main].follows, ['https://a.test/c/2'])
+        self.assertEqual(deferred, 1)
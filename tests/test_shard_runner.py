@@ -0,0 +1,62 @@
+"""Unit tests for shard_runner.py"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from account import Account
+from metrics import Metrics
+from shard_runner import RunReport, ShardResult, run_shards, split_groups
+from sync_config import SyncGroup
+
+
+def make_group(name: str, accounts: int) -> SyncGroup:
+    """Makes a group with some made up accounts."""
+    return SyncGroup(name, [Account(f'{name} {number}', 'https://a.test',
+                                    f'user{number}', 'password')
+                            for number in range(accounts)])
+
+
+def count_accounts(shard: int, groups: list[SyncGroup]) -> ShardResult:
+    """Shard function that only counts, run in the worker processes."""
+    if any(group.name == 'broken' for group in groups):
+        raise RuntimeError('boom')
+    metrics = Metrics()
+    metrics.record('a.test', 'site', 200, 0.1)
+    return ShardResult(shard=shard, groups=[group.name for group in groups],
+                       accounts=sum(len(group.accounts) for group in groups),
+                       actions=shard + 1, calls=metrics.snapshot())
+
+
+class TestShardRunner(unittest.TestCase):
+    """split_groups, run_shards and RunReport test case."""
+
+    def test_split_groups(self):
+        """Groups stay whole and shards get about as many accounts."""
+        groups = [make_group(name, size)
+                  for name, size in (('a', 5), ('b', 4), ('c', 3), ('d', 2))]
+        shards = split_groups(groups, 2)
+        self.assertEqual([sum(len(group.accounts) for group in shard)
+                          for shard in shards], [7, 7])
+        self.assertEqual(len(split_groups(groups[:1], 4)), 1)
+
+    def test_run_shards(self):
+        """Each shard runs in a process and crashes only fail that shard."""
+        shards = [[make_group('a', 2)], [make_group('broken', 1)],
+                  [make_group('c', 3)]]
+        results = run_shards(count_accounts, shards)
+        self.assertEqual([result.shard for result in results], [0, 1, 2])
+        self.assertIn('boom', results[1].error)
+        self.assertEqual(results[1].accounts, 1)
+
+        report = RunReport(results, wall_time=2.0)
+        self.assertEqual(report.failed, [1])
+        self.assertEqual(report.actions, 4)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir, 'report.json')
+            report.write(path)
+            data = json.loads(path.read_text(encoding='utf-8'))
+        self.assertEqual((data['accounts'], data['api_calls']), (6, 2))
+        self.assertEqual(data['calls'][0]['count'], 2)
+        self.assertEqual(len(data['by_shard']), 3)
+        self.assertEqual(len(report.summary()), 4)
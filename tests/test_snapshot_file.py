@@ -0,0 +1,62 @@
+"""Unit tests for snapshot_file.py"""
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+
+from actor_index import COMMUNITY_BLOCKS, FOLLOWS, PERSON_BLOCKS
+from snapshot_file import (SnapshotError, SnapshotReader, export_snapshot,
+                           import_snapshot)
+from tests.fakes import make_instance
+
+TROLL = 'https://a.test/u/troll'
+
+
+class TestSnapshotFile(unittest.TestCase):
+    """Snapshot export and import test case."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name, 'main.jsonl.gz')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Everything exported is read back, without auth or images."""
+        instance = make_instance('main', follows=['https://a.test/c/two',
+                                                  'https://a.test/c/one'],
+                                 person_blocks=[TROLL],
+                                 avatar='https://a.test/me.png')
+        self.assertEqual(export_snapshot(instance, self.path), 3)
+        with SnapshotReader(self.path) as reader:
+            self.assertEqual(reader.header['account'], 'main')
+            self.assertEqual(reader.settings, {'theme': 'darkly'})
+            self.assertEqual(list(reader),
+                             [(FOLLOWS, 'https://a.test/c/one'),
+                              (FOLLOWS, 'https://a.test/c/two'),
+                              (PERSON_BLOCKS, TROLL)])
+
+    def test_import_plan(self):
+        """Importing only plans what the instance is missing."""
+        export_snapshot(make_instance('main',
+                                      follows=['https://a.test/c/one'],
+                                      person_blocks=[TROLL]),
+                        self.path)
+        other = make_instance('other', person_blocks=[TROLL], theme='litely')
+        plan = import_snapshot(other, self.path, dry_run=True)
+        self.assertEqual(plan.follows, ['https://a.test/c/one'])
+        self.assertEqual(plan.person_blocks, [])
+        self.assertEqual(plan.community_blocks, [])
+        self.assertEqual(plan.settings, {'theme': 'darkly'})
+        self.assertFalse(other.actor_index.get(COMMUNITY_BLOCKS))
+
+    def test_bad_files(self):
+        """Files that aren't snapshots raise a SnapshotError."""
+        self.path.write_bytes(b'not gzip')
+        with self.assertRaises(SnapshotError):
+            SnapshotReader(self.path)
+        with gzip.open(self.path, 'wt', encoding='utf-8') as file:
+            file.write('{"format": "other", "version": 1}\n{"settings": {}}\n')
+        with self.assertRaises(SnapshotError):
+            SnapshotReader(self.path)
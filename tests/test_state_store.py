@@ -0,0 +1,67 @@
+"""Unit tests for state_store.py"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from actor_index import FOLLOWS, PERSON_BLOCKS, ActorIndex
+from lem_types import SaveUserSettings
+from state_store import SyncState, settings_hash
+
+
+class TestSyncState(unittest.TestCase):
+    """SyncState test case."""
+
+    def test_round_trip(self):
+        """A saved state loads back the same."""
+        index = ActorIndex()
+        index.add(FOLLOWS, 'https://a.test/c/one', 1)
+        index.add(PERSON_BLOCKS, 'https://a.test/u/troll', 2)
+        state = SyncState(settings_hash='abc')
+        state.synced[FOLLOWS] = {'https://a.test/c/one'}
+        state.record('Main Account', index, SaveUserSettings(auth='x'))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir, 'state.json')
+            state.save(path)
+            loaded = SyncState.load(path)
+
+        self.assertEqual(loaded, state)
+
+    def test_missing_file(self):
+        """A missing file gives an empty state."""
+        self.assertEqual(SyncState.load(Path('does', 'not', 'exist.json')),
+                         SyncState())
+
+    def test_settings_hash(self):
+        """The hash ignores auth but not the compared settings."""
+        self.assertEqual(settings_hash(SaveUserSettings(auth='a', theme='x')),
+                         settings_hash(SaveUserSettings(auth='b', theme='x')))
+        self.assertNotEqual(
+            settings_hash(SaveUserSettings(auth='a', theme='x')),
+            settings_hash(SaveUserSettings(auth='a', theme='y')))
+        self.assertIsNone(settings_hash(None))
+
+    def test_pending_keeps_age(self):
+        """Pending actions keep when they were first left over."""
+        state = SyncState()
+        state.update_pending('Main', ['follows one', 'follows two'], now=1)
+        state.update_pending('Main', ['follows two', 'settings'], now=5)
+        self.assertEqual(state.pending['Main'],
+                         {'follows two': 1, 'settings': 5})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir, 'state.json')
+            state.save(path)
+            self.assertEqual(SyncState.load(path).pending, state.pending)
+        state.update_pending('Main', [])
+        self.assertEqual(state.pending, {})
+
+    def test_tombstones_expire(self):
+        """Tombstones are dropped once older than the ttl."""
+        state = SyncState()
+        removed = {kind: set() for kind in state.tombstones}
+        removed[FOLLOWS] = {'https://a.test/c/one'}
+        nothing = {kind: set() for kind in state.tombstones}
+        state.update_tombstones(nothing, removed, ttl=10, now=100)
+        self.assertEqual(state.removals()[FOLLOWS], {'https://a.test/c/one'})
+        state.update_tombstones(nothing, nothing, ttl=10, now=111)
+        self.assertEqual(state.removals()[FOLLOWS], set())
@@ -0,0 +1,81 @@
+"""Unit tests for sync_config.py"""
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from sync_config import ConfigError, load_groups, read_ini_group
+
+REPO_DIR = Path(os.path.dirname(os.path.dirname(__file__)))
+
+
+class TestLoadGroups(unittest.TestCase):
+    """load_groups test case."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_ini_group(self):
+        """An ini file is one group with "Main Account" as the source."""
+        group = read_ini_group(Path(REPO_DIR, 'exampleconfig.ini'))
+        self.assertEqual(group.name, 'exampleconfig')
+        self.assertEqual(group.source, 'Main Account')
+        self.assertEqual([a.account for a in group.accounts],
+                         ['Main Account', 'Account 2'])
+
+    def test_ini_source_key(self):
+        """"Source = yes" picks another source account."""
+        path = Path(self.dir, 'someone.ini')
+        path.write_text('[Home]\nSite = a.test\nUser = me\nPassword = pw\n'
+                        'Source = yes\n\n'
+                        '[Other]\nSite = b.test\nUser = me\nPassword = pw\n',
+                        encoding='utf-8')
+        self.assertEqual(read_ini_group(path).source, 'Home')
+
+    def test_toml_groups(self):
+        """A TOML file can hold several groups."""
+        groups = load_groups(Path(REPO_DIR, 'exampleconfig.toml'))
+        self.assertEqual([g.name for g in groups],
+                         ['Imauser', 'Someoneelse'])
+        self.assertEqual(groups[1].source, 'Home')
+        self.assertEqual(groups[1].accounts[1].site, 'https://lemmy.ml')
+
+    def test_folder(self):
+        """Every config file in a folder is loaded."""
+        shutil.copy(Path(REPO_DIR, 'exampleconfig.ini'), self.dir)
+        shutil.copy(Path(REPO_DIR, 'exampleconfig.toml'), self.dir)
+        Path(self.dir, 'notes.txt').write_text('ignored', encoding='utf-8')
+        self.assertEqual([g.name for g in load_groups(self.dir)],
+                         ['exampleconfig', 'Imauser', 'Someoneelse'])
+
+    def test_duplicate_names(self):
+        """Two groups with the same name are reported."""
+        shutil.copy(Path(REPO_DIR, 'exampleconfig.toml'), self.dir)
+        shutil.copy(Path(REPO_DIR, 'exampleconfig.ini'),
+                    Path(self.dir, 'Imauser.ini'))
+        with self.assertRaises(ConfigError):
+            load_groups(self.dir)
+
+    def test_incomplete_account(self):
+        """Accounts missing a password are reported."""
+        path = Path(self.dir, 'broken.ini')
+        path.write_text('[Home]\nSite = a.test\nUser = me\n',
+                        encoding='utf-8')
+        with self.assertRaises(ConfigError):
+            load_groups(path)
+
+    def test_no_groups(self):
+        """A file or folder without any groups is reported."""
+        path = Path(self.dir, 'empty.toml')
+        path.write_text('# No groups yet.\n', encoding='utf-8')
+        with self.assertRaises(ConfigError):
+            load_groups(path)
+        path.unlink()
+        Path(self.dir, 'notes.txt').write_text('', encoding='utf-8')
+        with self.assertRaises(ConfigError):
+            load_groups(self.dir)
@@ -0,0 +1,208 @@
+"""Unit tests for sync_plan.py"""
+import unittest
+from time import sleep
+
+from actor_index import FOLLOWS, ActorIndex
+from state_store import SyncState
+from sync_plan import (ActionBudget, InstancePlan, SyncPlan, build_plan,
+                       compute_changes, compute_target, execute_plan)
+from tests.fakes import make_instance
+
+
+class TestBuildPlan(unittest.TestCase):
+    """build_plan test case."""
+
+    def test_plan_contains_only_missing(self):
+        """Each instance only gets what it doesn't already have."""
+        main = make_instance('main',
+                             follows=['https://a.test/c/one',
+                                      'https://a.test/c/two'],
+                             person_blocks=['https://a.test/u/troll'])
+        other = make_instance('other',
+                              follows=['https://a.test/c/two',
+                                       'https://a.test/c/three'],
+                              community_blocks=['https://a.test/c/spam'],
+                              theme='litely')
+
+        plan = build_plan([main, other], main.user_settings)
+        main_plan, other_plan = plan.instances
+
+        self.assertEqual(main_plan.follows, ['https://a.test/c/three'])
+        self.assertEqual(main_plan.community_blocks,
+                         ['https://a.test/c/spam'])
+        self.assertEqual(main_plan.person_blocks, [])
+        self.assertEqual(main_plan.settings, {})
+
+        self.assertEqual(other_plan.follows, ['https://a.test/c/one'])
+        self.assertEqual(other_plan.person_blocks, ['https://a.test/u/troll'])
+        self.assertEqual(other_plan.settings, {'theme': 'darkly'})
+
+        self.assertEqual(plan.actions, 5)
+        self.assertEqual(plan.to_dict()['instances'][1]['settings'],
+                         ['theme'])
+        self.assertEqual(plan.settings_counts(), {'theme': 1})
+
+    def test_synced_instances_need_nothing(self):
+        """Instances that already match plan no actions."""
+        first = make_instance('first', follows=['https://a.test/c/one'])
+        second = make_instance('second', follows=['https://a.test/c/one/'])
+        self.assertEqual(build_plan([first, second]).actions, 0)
+
+
+class TestIncrementalPlan(unittest.TestCase):
+    """compute_changes and compute_target test case."""
+
+    def sync(self, instances: list, state: SyncState) -> SyncPlan:
+        """Plans a sync and records the state as if it all succeeded."""
+        changes = compute_changes(instances, state)
+        state.update_tombstones(changes.added, changes.removed, ttl=60)
+        target = compute_target(state, changes)
+        plan = build_plan(instances, target=target, remove=state.removals())
+        state.synced = target
+        for instance in instances:
+            state.record(instance.account.account, instance.actor_index, None)
+        return plan
+
+    def test_steady_state_does_nothing(self):
+        """Nothing changed since the snapshot means nothing to do."""
+        first = make_instance('first', follows=['https://a.test/c/one'])
+        second = make_instance('second', follows=['https://a.test/c/one'])
+        state = SyncState()
+        self.sync([first, second], state)
+
+        changes = compute_changes([first, second], state)
+        self.assertEqual(changes.count, 0)
+        self.assertEqual(self.sync([first, second], state).actions, 0)
+
+    def test_only_new_follows_are_synced(self):
+        """A new follow on one account is added to the others."""
+        first = make_instance('first', follows=['https://a.test/c/one'])
+        second = make_instance('second', follows=['https://a.test/c/one'])
+        state = SyncState()
+        self.sync([first, second], state)
+
+        first.actor_index.add(FOLLOWS, 'https://a.test/c/two', 2)
+        plan = self.sync([first, second], state)
+        self.assertEqual(plan.instances[1].follows, ['https://a.test/c/two'])
+        self.assertEqual(plan.actions, 1)
+
+    def test_unfollow_is_propagated(self):
+        """An unfollow on one account is removed from the others."""
+        first = make_instance('first', follows=['https://a.test/c/one'])
+        second = make_instance('second', follows=['https://a.test/c/one'])
+        state = SyncState()
+        self.sync([first, second], state)
+
+        first.actor_index.remove(FOLLOWS, 'https://a.test/c/one')
+        changes = compute_changes([first, second], state)
+        self.assertEqual(changes.removed[FOLLOWS], {'https://a.test/c/one'})
+        plan = self.sync([first, second], state)
+        self.assertEqual(plan.instances[0].follows, [])
+        self.assertEqual(plan.instances[1].unfollows,
+                         ['https://a.test/c/one'])
+        self.assertEqual(plan.actions, 1)
+
+    def test_tombstone_until_removed_everywhere(self):
+        """Accounts that failed to unfollow are tried again next run."""
+        first = make_instance('first', follows=['https://a.test/c/one'])
+        second = make_instance('second', follows=['https://a.test/c/one'])
+        state = SyncState()
+        self.sync([first, second], state)
+
+        first.actor_index.remove(FOLLOWS, 'https://a.test/c/one')
+        self.sync([first, second], state)
+        # The unfollow on the second account failed, try it again.
+        plan = self.sync([first, second], state)
+        self.assertEqual(plan.instances[1].unfollows,
+                         ['https://a.test/c/one'])
+
+    def test_refollow_clears_tombstone(self):
+        """Following something again after removing it syncs it again."""
+        first = make_instance('first', follows=['https://a.test/c/one'])
+        second = make_instance('second')
+        state = SyncState()
+        self.sync([first, second], state)
+        first.actor_index.remove(FOLLOWS, 'https://a.test/c/one')
+        self.sync([first, second], state)
+
+        first.actor_index.add(FOLLOWS, 'https://a.test/c/one', 1)
+        plan = self.sync([first, second], state)
+        self.assertEqual(plan.instances[1].follows, ['https://a.test/c/one'])
+        self.assertEqual(state.tombstones[FOLLOWS], {})
+
+    def test_failed_action_is_retried(self):
+        """Something that failed to sync is planned again next run."""
+        first = make_instance('first', follows=['https://a.test/c/one'])
+        second = make_instance('second')
+        state = SyncState()
+        # The follow on the second account never happened.
+        self.assertEqual(self.sync([first, second], state).actions, 1)
+
+        plan = self.sync([first, second], state)
+        self.assertEqual(plan.instances[1].follows, ['https://a.test/c/one'])
+
+
+class RecordingInstance:
+    """Instance stand-in that records the actions sent to it."""
+
+    def __init__(self) -> None:
+        self.actor_index = ActorIndex()
+        self.sent: list[str] = list()
+
+    def resolve_community_id(self, url: str) -> int:
+        """Every community resolves."""
+        return 1
+
+    resolve_person_id = resolve_community_id
+
+    def follow_community_id(self, url: str, _local_id: int) -> bool:
+        """Records a follow."""
+        self.sent.append(f'follow {url}')
+        return True
+
+    def block_person_id(self, url: str, _local_id: int) -> bool:
+        """Records a block."""
+        self.sent.append(f'block {url}')
+        return True
+
+    block_community_id = block_person_id
+
+    def unsubscribe_from_community(self, url: str) -> bool:
+        """Records a removal."""
+        self.sent.append(f'remove {url}')
+        return True
+
+    unblock_community = unblock_person = unsubscribe_from_community
+
+    def save_settings_changes(self, changes: dict) -> bool:
+        """Records a settings change."""
+        self.sent.append('settings')
+        return True
+
+
+class TestExecutePlan(unittest.TestCase):
+    """execute_plan and ActionBudget test case."""
+
+    def test_priority_and_budget(self):
+        """Blocks are sent first and nothing past the budget is sent."""
+        instance = RecordingInstance()
+        plan = InstancePlan(account='main', host='a.test',
+                            follows=['https://a.test/c/1',
+                                     'https://a.test/c/2'],
+                            person_blocks=['https://a.test/u/troll'],
+                            settings={'theme': 'darkly'})
+        budget = ActionBudget(max_actions=3)
+        execute_plan(instance, plan, budget=budget)
+        self.assertEqual(instance.sent, ['block https://a.test/u/troll',
+                                         'settings',
+                                         'follow https://a.test/c/1'])
+        self.assertTrue(budget.exhausted)
+        self.assertEqual(budget.used, 3)
+
+    def test_deadline(self):
+        """Nothing is taken from a budget past its deadline."""
+        budget = ActionBudget(deadline=0.01)
+        self.assertTrue(budget.take())
+        sleep(0.02)
+        self.assertFalse(budget.take())
+        self.assertTrue(ActionBudget().take())
@@ -0,0 +1,103 @@
+"""Unit tests for token_cache.py"""
+import base64
+import json
+import multiprocessing
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from time import time
+
+from account import Account
+from token_cache import TokenCache, jwt_expired
+
+
+def make_jwt(claims: dict) -> str:
+    """Makes an unsigned JWT with the given claims."""
+    def encode(data: dict) -> str:
+        raw = base64.urlsafe_b64encode(json.dumps(data).encode())
+        return raw.decode().rstrip('=')
+    return f'{encode({"alg": "HS256"})}.{encode(claims)}.signature'
+
+
+def save_tokens(path: str, number: int) -> None:
+    """Saves tokens for accounts of its own, run in another process."""
+    cache = TokenCache(path)
+    for account in range(20):
+        cache.set(Account(f'{number}-{account}', 'https://lemmy.test',
+                          'user', 'password'), make_jwt({'sub': account}))
+
+
+class TestTokenCache(unittest.TestCase):
+    """TokenCache test case."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name, 'tokens.json')
+        self.account = Account('Main Account', 'https://lemmy.test',
+                               'user', 'password')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Tokens are saved and found again by a new cache."""
+        token = make_jwt({'sub': 1, 'iat': int(time())})
+        TokenCache(self.path).set(self.account, token)
+        self.assertEqual(TokenCache(self.path).get(self.account), token)
+
+    def test_owner_only_permissions(self):
+        """The cache file can only be read by its owner."""
+        TokenCache(self.path).set(self.account, make_jwt({'sub': 1}))
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+    def test_changed_account_misses(self):
+        """A different site for the same section doesn't reuse the token."""
+        cache = TokenCache(self.path)
+        cache.set(self.account, make_jwt({'sub': 1}))
+        moved = Account('Main Account', 'https://other.test',
+                        'user', 'password')
+        self.assertIsNone(cache.get(moved))
+
+    def test_processes_keep_each_others_tokens(self):
+        """Processes saving at the same time don't drop any tokens."""
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=save_tokens,
+                                     args=(str(self.path), number))
+                     for number in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        tokens = json.loads(self.path.read_text(encoding='utf-8'))
+        self.assertEqual(len(tokens), 80)
+
+    def test_remove(self):
+        """Removed tokens are gone."""
+        cache = TokenCache(self.path)
+        cache.set(self.account, make_jwt({'sub': 1}))
+        cache.remove(self.account)
+        self.assertIsNone(TokenCache(self.path).get(self.account))
+
+    def test_other_processes_tokens_kept(self):
+        """Saving doesn't drop tokens another cache saved in the meantime."""
+        first, second = TokenCache(self.path), TokenCache(self.path)
+        other = Account('Alt', 'https://lemmy.test', 'alt', 'password')
+        first.set(self.account, make_jwt({'sub': 1}))
+        second.set(other, make_jwt({'sub': 2}))
+        cache = TokenCache(self.path)
+        self.assertIsNotNone(cache.get(self.account))
+        self.assertIsNotNone(cache.get(other))
+
+
+class TestJwtExpired(unittest.TestCase):
+    """jwt_expired test case."""
+
+    def test_expiry(self):
+        """Only malformed or expired tokens count as expired."""
+        self.assertFalse(jwt_expired(make_jwt({'sub': 1})))
+        self.assertFalse(jwt_expired(make_jwt({'exp': time() + 3600})))
+        self.assertTrue(jwt_expired(make_jwt({'exp': time() - 1})))
+        self.assertTrue(jwt_expired('not a jwt'))